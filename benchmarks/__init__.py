@@ -0,0 +1,10 @@
+"""epically-powerful benchmark suite.
+
+Run every benchmark and write the results to a JSON file with:
+
+    python -m benchmarks.run_all --output results.json
+
+Each ``bench_*`` module can also be run on its own, e.g.
+``python -m benchmarks.bench_codecs``. All benchmarks run on a virtual CAN
+bus or canned data, so no hardware is needed.
+"""
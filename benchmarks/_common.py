@@ -0,0 +1,189 @@
+"""Shared helpers for the epically-powerful benchmark suite: timing, result
+records, and the machine-readable results file.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from importlib import metadata
+from typing import Callable, Optional
+
+
+def time_per_call(func: Callable[[], object], number: int, repeat: int=5) -> dict:
+    """Times ``func`` in ``repeat`` batches of ``number`` calls each, with garbage collection disabled.
+
+    Args:
+        func (Callable): Function to time, called with no arguments.
+        number (int): Calls per batch.
+        repeat (int, optional): Number of batches. Defaults to 5.
+
+    Returns:
+        dict: Nanoseconds per call as ``min``, ``median``, and ``mean`` across batches, and calls per second from the fastest batch as ``ops_per_sec``.
+    """
+    batches = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter_ns()
+            for _ in range(number):
+                func()
+            batches.append((time.perf_counter_ns() - t0) / number)
+    finally:
+        if gc_was_enabled: gc.enable()
+
+    return {
+        'min': min(batches),
+        'median': statistics.median(batches),
+        'mean': statistics.fmean(batches),
+        'ops_per_sec': 1e9 / min(batches),
+    }
+
+
+def summarize(samples: list[float]) -> dict:
+    """Summary statistics of a list of samples.
+
+    Args:
+        samples (list[float]): Samples to summarize.
+
+    Returns:
+        dict: ``count``, ``mean``, ``std``, ``min``, ``p50``, ``p99``, and ``max`` of the samples.
+    """
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered),
+        'std': statistics.pstdev(ordered),
+        'min': ordered[0],
+        'p50': ordered[len(ordered) // 2],
+        'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        'max': ordered[-1],
+    }
+
+
+def result(suite: str, name: str, unit: str, value: float, params: Optional[dict]=None, stats: Optional[dict]=None) -> dict:
+    """Creates one result record.
+
+    Args:
+        suite (str): Benchmark module the result comes from, e.g. 'codecs'.
+        name (str): Name of the measured operation.
+        unit (str): Unit of ``value``.
+        value (float): Headline value used to compare runs.
+        params (dict, optional): Parameters of the measurement, e.g. the number of actuators. Defaults to None.
+        stats (dict, optional): Additional statistics. Defaults to None.
+
+    Returns:
+        dict: The result record.
+    """
+    return {
+        'suite': suite,
+        'name': name,
+        'params': params or {},
+        'unit': unit,
+        'value': value,
+        'stats': stats or {},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment() -> dict:
+    """Describes the machine and software the benchmarks ran on, so results can be compared across releases and boards."""
+    try:
+        version = metadata.version('epicallypowerful')
+    except metadata.PackageNotFoundError:
+        version = None
+
+    try:
+        from epicallypowerful.toolbox._clocking import TimedLoopC
+        compiled_clocking = True
+    except ImportError:
+        compiled_clocking = False
+
+    uname = platform.uname()
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'hostname': socket.gethostname(),
+        'machine': uname.machine,
+        'system': uname.system,
+        'release': uname.release,
+        'processor': uname.processor,
+        'cpu_count': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'python_implementation': platform.python_implementation(),
+        'epicallypowerful_version': version,
+        'git_commit': _git_commit(),
+        'compiled_clocking': compiled_clocking,
+    }
+
+
+def write_results(results: list[dict], output: str) -> None:
+    """Writes results and the environment description to a JSON file.
+
+    Args:
+        results (list[dict]): Result records from :py:func:`result`.
+        output (str): Path of the JSON file. '-' writes to standard output.
+    """
+    document = {'environment': environment(), 'results': results}
+    if output == '-':
+        json.dump(document, sys.stdout, indent=2)
+        print()
+        return
+
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Wrote {len(results)} results to {output}")
+
+
+def default_output(suite: str) -> str:
+    """Default results path, ``benchmarks/results/<suite>-<hostname>-<date>.json``."""
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', f'{suite}-{socket.gethostname()}-{stamp}.json')
+
+
+def print_results(results: list[dict]) -> None:
+    """Prints results as a table."""
+    for r in results:
+        params = ', '.join(f'{k}={v}' for k, v in r['params'].items())
+        print(f"{r['suite']:<10} {r['name']:<45} {params:<30} {r['value']:>14.3f} {r['unit']}")
+
+
+def main(suite: str, run: Callable[[bool], list[dict]], argv: Optional[list[str]]=None) -> list[dict]:
+    """Command line entry point shared by the benchmark modules.
+
+    Args:
+        suite (str): Name of the benchmark module.
+        run (Callable[[bool], list[dict]]): Function running the benchmarks, taking whether to run a quick pass.
+        argv (list[str], optional): Command line arguments. Defaults to ``sys.argv``.
+
+    Returns:
+        list[dict]: The result records.
+    """
+    parser = argparse.ArgumentParser(description=f'Run the epically-powerful {suite} benchmarks.')
+    parser.add_argument('--output', '-o', default=None, help="JSON file to write results to, or '-' for standard output. Defaults to benchmarks/results/.")
+    parser.add_argument('--quick', action='store_true', help='Run fewer iterations, e.g. for CI smoke tests.')
+    args = parser.parse_args(argv)
+
+    results = run(args.quick)
+    print_results(results)
+    write_results(results, args.output or default_output(suite))
+    return results
@@ -0,0 +1,64 @@
+"""Encode and decode throughput of every actuator driver's CAN codec."""
+
+import can
+
+from epicallypowerful.actuation.cubemars import CubeMars, CubeMarsV3
+from epicallypowerful.actuation.robstride import Robstride
+from epicallypowerful.actuation.motor_data import MotorData
+import epicallypowerful.actuation.decoding as decoding
+import epicallypowerful.actuation.cubemars.cubemars_driver as tmd
+import epicallypowerful.actuation.cubemars.cubemars_v3 as v3
+import epicallypowerful.actuation.cubemars.cubemars_servo as servo
+import epicallypowerful.actuation.robstride.robstride_driver as rsd
+from benchmarks._common import main, result, time_per_call
+
+SUITE = 'codecs'
+
+
+def run(quick: bool=False) -> list[dict]:
+    number = 2000 if quick else 50000
+    cubemars_data = MotorData(1, 'AK80-9')
+    v3_data = MotorData(1, 'AK80-9-V3')
+    robstride_data = MotorData(1, 'RS02')
+    mit_decoder = decoding.MITReplyDecoder(cubemars_data)
+    status_decoder = decoding.StatusReplyDecoder(v3_data)
+    robstride_decoder = decoding.RobstrideMotionDecoder(robstride_data)
+    # Compiled decoders from the _decoding extension, or their pure Python fallback
+    decoder_impl = 'compiled' if decoding.COMPILED else 'python'
+    # Complete receive path of each actuator, including its RMS torque monitor
+    cubemars_motor = CubeMars(1, 'AK80-9')
+    v3_motor = CubeMarsV3(1, 'AK80-9-V3')
+    robstride_motor = Robstride(1, 'RS02')
+
+    # Replies captured from the simulated actuators
+    cubemars_reply = can.Message(arbitration_id=0, data=[1, 0x80, 0x00, 0x7F, 0xF8, 0x00, 70, 0], is_extended_id=False)
+    status_reply = can.Message(arbitration_id=(0x29 << 8) | 1, data=[0x01, 0x2C, 0x00, 0x0A, 0x00, 0x64, 30, 0], is_extended_id=True)
+    robstride_reply = can.Message(arbitration_id=(2 << 24) | (2 << 22) | (1 << 8), data=[0x80, 0x00, 0x7F, 0xFF, 0x80, 0x10, 0x01, 0x2C], is_extended_id=True)
+
+    cases = {
+        'cubemars.encode_mit': lambda: tmd._pack_motor_message(0.5, 0.1, 10.0, 0.5, 1.0, cubemars_data),
+        'cubemars.decode_mit': lambda: tmd._unpack_motor_message(cubemars_reply, cubemars_data),
+        'cubemars_v3.encode_mit': lambda: v3._create_mit_message(1, 0.5, 0.1, 10.0, 0.5, 1.0, v3_data),
+        'cubemars_v3.decode_status': lambda: v3._read_cubemars_message(status_reply),
+        'cubemars_servo.encode_current': lambda: servo.make_current_loop_message(1, 2.5),
+        'cubemars_servo.encode_position': lambda: servo.make_position_mode_message(1, 45.0),
+        'cubemars_servo.decode_status': lambda: servo.read_servo_message(status_reply),
+        'robstride.encode_motion': lambda: rsd.create_motion_message(1, 0.5, 0.1, 10.0, 0.5, 1.0, 'RS02'),
+        'robstride.decode_motion': lambda: rsd.parse_motion_response(robstride_reply, 'RS02'),
+        f'decoding.mit_reply[{decoder_impl}]': lambda: mit_decoder.decode(cubemars_reply.arbitration_id, cubemars_reply.data),
+        f'decoding.status_reply[{decoder_impl}]': lambda: status_decoder.decode(status_reply.arbitration_id, status_reply.data),
+        f'decoding.robstride_motion[{decoder_impl}]': lambda: robstride_decoder.decode(robstride_reply.arbitration_id, robstride_reply.data),
+        f'cubemars.receive[{decoder_impl}]': lambda: cubemars_motor.on_message_received(cubemars_reply),
+        f'cubemars_v3.receive[{decoder_impl}]': lambda: v3_motor.on_message_received(status_reply),
+        f'robstride.receive[{decoder_impl}]': lambda: robstride_motor.on_message_received(robstride_reply),
+    }
+
+    results = []
+    for name, func in cases.items():
+        stats = time_per_call(func, number)
+        results.append(result(SUITE, name, 'ns/op', stats['min'], stats=stats))
+    return results
+
+
+if __name__ == '__main__':
+    main(SUITE, run)
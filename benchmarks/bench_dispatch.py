@@ -0,0 +1,51 @@
+"""ActuatorGroup commands per second and age of the latest reply against actuator count, using the actuator simulator on a virtual bus."""
+
+import time
+
+from epicallypowerful.actuation import ActuatorGroup
+from epicallypowerful.simulation import ActuatorSimulator
+from benchmarks._common import main, result, summarize
+
+SUITE = 'dispatch'
+ACTUATOR_TYPES = ('AK80-9', 'AK80-9-V3', 'RS02')
+ACTUATOR_COUNTS = (1, 2, 4, 8)
+
+
+def _run_group(actuator_type: str, n_actuators: int, duration: float) -> tuple[int, float, list[float]]:
+    motors = {can_id: actuator_type for can_id in range(1, n_actuators + 1)}
+    simulator = ActuatorSimulator.from_dict(dict(motors), channel=f'bench-{actuator_type}-{n_actuators}')
+    group = ActuatorGroup.from_dict(dict(motors), can_args=simulator.can_args, exit_manually=True)
+    try:
+        reply_ages = []
+        n_commands = 0
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < duration:
+            for can_id in motors:
+                group.set_torque(can_id, 0.0)
+                n_commands += 1
+            now = time.perf_counter()
+            for can_id in motors:
+                reply_ages.append((now - group.get_data(can_id).timestamp) * 1e6)
+        elapsed = time.perf_counter() - t0
+    finally:
+        group._release_bus()
+        simulator.stop()
+    return n_commands, elapsed, reply_ages
+
+
+def run(quick: bool=False) -> list[dict]:
+    duration = 0.5 if quick else 3.0
+    results = []
+    for actuator_type in ACTUATOR_TYPES:
+        for n_actuators in ACTUATOR_COUNTS:
+            n_commands, elapsed, reply_ages = _run_group(actuator_type, n_actuators, duration)
+            params = {'actuator_type': actuator_type, 'actuators': n_actuators}
+            results.append(result(SUITE, 'actuator_group.set_torque', 'commands/s', n_commands / elapsed, params=params))
+            # Time since each actuator's latest reply, sampled after every round of commands
+            stats = summarize(reply_ages)
+            results.append(result(SUITE, 'actuator_group.reply_age', 'us', stats['p50'], params=params, stats=stats))
+    return results
+
+
+if __name__ == '__main__':
+    main(SUITE, run)
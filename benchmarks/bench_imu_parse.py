@@ -0,0 +1,59 @@
+"""Parse cost of OpenIMU CAN frames and MPU9250 I2C register blocks, from canned data."""
+
+import can
+
+from epicallypowerful.sensing.open_imu.open_imu import OpenIMUs, ACCELEROMETER_PGN, GYROSCOPE_PGN, MAGNETOMETER_PGN
+from epicallypowerful.sensing.mpu9250.mpu9250_imu import MPU9250IMUs
+from benchmarks._common import main, result, time_per_call
+
+SUITE = 'imu_parse'
+
+
+class _CannedI2CBus():
+    """Returns fixed register blocks in place of an SMBus, so only the conversion is timed."""
+    def __init__(self, block: list[int]) -> None:
+        self.block = block
+
+    def read_i2c_block_data(self, i2c_addr: int, register: int, length: int) -> list[int]:
+        return self.block[:length]
+
+    def read_byte_data(self, i2c_addr: int, register: int) -> int:
+        return 0
+
+
+def _open_imu_frame(pgn: int, source: int) -> can.Message:
+    return can.Message(arbitration_id=(0x18 << 24) | (pgn << 8) | source, data=[0x10, 0x80, 0x20, 0x7F, 0x30, 0x81, 0, 0], is_extended_id=True)
+
+
+def run(quick: bool=False) -> list[dict]:
+    number = 2000 if quick else 50000
+    results = []
+
+    # Disabled, so no bus is opened. Frames are decoded by the listener callback as on the receive thread.
+    imus = OpenIMUs([0x80, 0x81], components=['acc', 'gyro', 'mag'], disabled=True)
+    frames = {
+        'open_imu.decode_acc': _open_imu_frame(ACCELEROMETER_PGN, 0x80),
+        'open_imu.decode_gyro': _open_imu_frame(GYROSCOPE_PGN, 0x80),
+        'open_imu.decode_mag': _open_imu_frame(MAGNETOMETER_PGN, 0x81),
+        'open_imu.ignore_unsubscribed_source': _open_imu_frame(ACCELEROMETER_PGN, 0x90),
+    }
+    for name, frame in frames.items():
+        stats = time_per_call(lambda: imus.on_message_received(frame), number)
+        results.append(result(SUITE, name, 'ns/frame', stats['min'], stats=stats))
+
+    stats = time_per_call(lambda: imus.get_all_array(), number)
+    results.append(result(SUITE, 'open_imu.get_all_array', 'ns/call', stats['min'], params={'imus': 2}, stats=stats))
+
+    mpu = MPU9250IMUs.__new__(MPU9250IMUs) # conversion only, no I2C setup
+    mpu6050_bus = _CannedI2CBus([0x10, 0x80, 0xF0, 0x7F, 0x40, 0x00, 0x0A, 0x00, 0x00, 0x12, 0xFF, 0xEE, 0x00, 0x01])
+    ak8963_bus = _CannedI2CBus([0x10, 0x01, 0xF0, 0x02, 0x40, 0x03, 0x00])
+    stats = time_per_call(lambda: mpu.get_MPU6050_data(bus=mpu6050_bus, acc_range=8, gyro_range=1000), number)
+    results.append(result(SUITE, 'mpu9250.decode_acc_gyro', 'ns/read', stats['min'], stats=stats))
+    stats = time_per_call(lambda: mpu.get_AK8963_data(bus=ak8963_bus, mag_coeffs=[4912.0, 4912.0, 4912.0]), number)
+    results.append(result(SUITE, 'mpu9250.decode_mag', 'ns/read', stats['min'], stats=stats))
+
+    return results
+
+
+if __name__ == '__main__':
+    main(SUITE, run)
@@ -0,0 +1,59 @@
+"""Period jitter of the loop timers at several loop rates."""
+
+import time
+
+from epicallypowerful.toolbox.clocking import LoopTimer
+from benchmarks._common import main, result, summarize
+
+SUITE = 'loop_timing'
+RATES = (200, 500, 1000)
+
+
+def _timed_loop_periods(rate: float, n_loops: int) -> list[float]:
+    from epicallypowerful.toolbox._clocking import TimedLoopC
+    loop = TimedLoopC(rate, verbose=False)
+    periods = []
+    prev = time.perf_counter()
+    for _ in range(n_loops):
+        loop.sleep()
+        now = time.perf_counter()
+        periods.append(now - prev)
+        prev = now
+    return periods
+
+
+def _loop_timer_periods(rate: float, n_loops: int) -> list[float]:
+    loop = LoopTimer(rate)
+    periods = []
+    prev = None
+    while len(periods) < n_loops:
+        if loop.continue_loop():
+            now = time.perf_counter()
+            if prev is not None: periods.append(now - prev)
+            prev = now
+    return periods
+
+
+def run(quick: bool=False) -> list[dict]:
+    duration = 0.5 if quick else 5.0
+    timers = {'LoopTimer': _loop_timer_periods}
+    try:
+        import epicallypowerful.toolbox._clocking
+        timers['TimedLoopC'] = _timed_loop_periods
+    except ImportError:
+        print('TimedLoopC is not compiled, skipping it. Build the package to include it.')
+
+    results = []
+    for timer_name, measure in timers.items():
+        for rate in RATES:
+            period = 1 / rate
+            periods = measure(rate, int(duration * rate))
+            errors_us = [abs(p - period) * 1e6 for p in periods]
+            stats = summarize(errors_us)
+            stats['mean_rate_hz'] = len(periods) / sum(periods)
+            results.append(result(SUITE, f'{timer_name}.period_error', 'us', stats['p99'], params={'rate_hz': rate}, stats=stats))
+    return results
+
+
+if __name__ == '__main__':
+    main(SUITE, run)
@@ -0,0 +1,31 @@
+"""Cost per row of DataRecorder.save against the number of columns."""
+
+import os
+import tempfile
+
+from epicallypowerful.toolbox.data_recorder import DataRecorder
+from benchmarks._common import main, result, time_per_call
+
+SUITE = 'recording'
+COLUMN_COUNTS = (1, 8, 32, 128)
+
+
+def run(quick: bool=False) -> list[dict]:
+    number = 2000 if quick else 20000
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_columns in COLUMN_COUNTS:
+            recorder = DataRecorder(
+                os.path.join(directory, f'bench_{n_columns}.csv'),
+                [f'column_{i}' for i in range(n_columns)],
+                overwrite=True,
+            )
+            row = [i * 0.123456 for i in range(n_columns)]
+            stats = time_per_call(lambda: recorder.save(row), number)
+            recorder.finalize()
+            results.append(result(SUITE, 'data_recorder.save', 'ns/row', stats['min'], params={'columns': n_columns}, stats=stats))
+    return results
+
+
+if __name__ == '__main__':
+    main(SUITE, run)
@@ -0,0 +1,20 @@
+"""Runs every benchmark module and writes all results to one JSON file."""
+
+import sys
+
+from benchmarks import bench_codecs, bench_dispatch, bench_imu_parse, bench_loop_timing, bench_recording
+from benchmarks._common import main
+
+SUITES = (bench_codecs, bench_imu_parse, bench_recording, bench_loop_timing, bench_dispatch)
+
+
+def run(quick: bool=False) -> list[dict]:
+    results = []
+    for suite in SUITES:
+        print(f'Running {suite.SUITE} benchmarks...', file=sys.stderr)
+        results.extend(suite.run(quick))
+    return results
+
+
+if __name__ == '__main__':
+    main('all', run)
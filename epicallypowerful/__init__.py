@@ -1,5 +1,7 @@
-# Import management for epicallypowerful modules
-from . import actuation
-from . import toolbox
-from . import sensing
+# Import management for epicallypowerful modules. Subpackages are loaded
+# on first access, so e.g. using only actuation never imports sensing.
+from epicallypowerful._lazy import attach_lazy_loader
 
+__all__ = ['actuation', 'toolbox', 'sensing', 'simulation']
+
+__getattr__, __dir__ = attach_lazy_loader(__name__, globals(), {}, __all__)
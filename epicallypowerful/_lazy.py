@@ -0,0 +1,45 @@
+"""Helpers for lazily loading package attributes on first access (PEP 562).
+
+Heavy optional dependencies (scipy, MSCL, smbus2, python-can) are only
+imported once something that needs them is actually used, which keeps
+startup of scripts and command line entry points fast.
+"""
+
+import importlib
+from typing import Callable, Dict, Iterable
+
+
+def attach_lazy_loader(
+    package_name: str,
+    package_globals: dict,
+    attributes: Dict[str, str],
+    submodules: Iterable[str]=(),
+) -> tuple[Callable, Callable]:
+    """Build module-level ``__getattr__`` and ``__dir__`` functions for a package.
+
+    Args:
+        package_name (str): ``__name__`` of the package.
+        package_globals (dict): ``globals()`` of the package, used to cache attributes once loaded.
+        attributes (dict): public attribute names mapped to the (relative) module that defines them.
+        submodules (iterable of str): submodule names that can be accessed as attributes of the package.
+
+    Returns:
+        __getattr__, __dir__: functions to assign at the package level.
+    """
+    submodules = set(submodules)
+
+    def __getattr__(name: str):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name], package_name), name)
+            package_globals[name] = value
+            return value
+
+        if name in submodules:
+            return importlib.import_module(f".{name}", package_name)
+
+        raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+
+    def __dir__():
+        return sorted(set(package_globals) | set(attributes) | submodules)
+
+    return __getattr__, __dir__
@@ -1,17 +1,33 @@
-# Import management for epicallypowerful actuation modules
-import epicallypowerful.actuation.cubemars
-import epicallypowerful.actuation.cybergear
-import epicallypowerful.actuation.robstride
-import epicallypowerful.actuation.actuator_group
-import epicallypowerful.actuation.motor_data
+# Import management for epicallypowerful actuation modules. Classes are
+# loaded on first access to keep `import epicallypowerful` fast.
+from typing import TYPE_CHECKING
+from epicallypowerful._lazy import attach_lazy_loader
 
-from .actuator_group import ActuatorGroup
-from .cubemars import CubeMars
-from .cubemars import CubeMarsServo
-from .cybergear import CyberGear
-from .robstride import Robstride
-from .motor_data import MotorData
+if TYPE_CHECKING:
+    from .actuator_group import ActuatorGroup
+    from .cubemars import CubeMars
+    from .cubemars import CubeMarsServo
+    from .cybergear import CyberGear
+    from .robstride import Robstride
+    from .motor_data import MotorData
+
+_LAZY_ATTRIBUTES = {
+    'ActuatorGroup': '.actuator_group',
+    'CubeMars': '.cubemars',
+    'CubeMarsServo': '.cubemars',
+    'CyberGear': '.cybergear',
+    'Robstride': '.robstride',
+    'MotorData': '.motor_data',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES.keys()) + ['available_actuator_types']
+
+__getattr__, __dir__ = attach_lazy_loader(
+    __name__, globals(), _LAZY_ATTRIBUTES,
+    submodules=['cubemars', 'cybergear', 'robstride', 'actuator_group', 'actuator_abc', 'motor_data', 'torque_monitor', 'io_process'],
+)
 
 def available_actuator_types():
+    from .motor_data import MOTOR_PARAMS
     print("Available actuator types:")
-    print(list(epicallypowerful.actuation.motor_data.MOTOR_PARAMS.keys()))
+    print(list(MOTOR_PARAMS.keys()))
@@ -0,0 +1,194 @@
+# Compiled receive path for actuator replies: the decoders of epicallypowerful.actuation.decoding and the
+# RMS torque window of epicallypowerful.actuation.torque_monitor, with the same interfaces as their Python versions.
+from posix.time cimport timespec, clock_gettime, CLOCK_MONOTONIC
+from libc.stdint cimport int16_t, uint8_t
+from libc.math cimport M_PI, sqrt
+from libc.stdlib cimport malloc, realloc, free
+from cpython.bytearray cimport PyByteArray_CheckExact, PyByteArray_AS_STRING, PyByteArray_GET_SIZE
+
+from collections import deque
+
+import epicallypowerful.actuation.robstride.robstride_driver as rsd
+
+cdef double DEG2RAD = M_PI / 180.0
+cdef double DEGPERSEC2RPM = 1.0 / 6.0
+cdef unsigned int RESPONSE_MOTION = rsd.RESPONSE_MOTION
+
+# time.perf_counter() reads CLOCK_MONOTONIC on Linux, so timestamps match those set from Python
+cdef inline double perf_counter():
+    cdef timespec ts
+    clock_gettime(CLOCK_MONOTONIC, &ts)
+    return ts.tv_sec + (ts.tv_nsec / 1_000_000_000.0)
+
+cdef inline int16_t be_int16(const uint8_t* p, Py_ssize_t i):
+    return <int16_t>((p[i] << 8) | p[i + 1])
+
+cdef inline int be_uint16(const uint8_t* p, Py_ssize_t i):
+    return (p[i] << 8) | p[i + 1]
+
+
+cdef class MITReplyDecoder:
+    cdef readonly object data
+    cdef readonly unsigned int motor_id
+    cdef readonly double invert
+    cdef double p_scale, p_offset, v_scale, v_offset, t_scale, t_offset
+
+    def __init__(self, data, int invert=1):
+        self.data = data
+        self.motor_id = data.motor_id
+        self.invert = invert
+        self.p_scale = (data.position_limits[1] - data.position_limits[0]) / 65535.0
+        self.p_offset = data.position_limits[0]
+        self.v_scale = (data.velocity_limits[1] - data.velocity_limits[0]) / 4095.0
+        self.v_offset = data.velocity_limits[0]
+        self.t_scale = (data.torque_limits[1] - data.torque_limits[0]) / 4095.0
+        self.t_offset = data.torque_limits[0]
+
+    cpdef bint decode(self, unsigned int arbitration_id, object payload, double timestamp=-1.0):
+        # python-can stores frame data as a bytearray, which is read in place
+        if not PyByteArray_CheckExact(payload): payload = bytearray(payload)
+        cdef Py_ssize_t size = PyByteArray_GET_SIZE(payload)
+        cdef const uint8_t* p = <const uint8_t*>PyByteArray_AS_STRING(payload)
+        if size < 6 or p[0] != self.motor_id: return False
+        data = self.data
+        data.current_position = (be_uint16(p, 1) * self.p_scale + self.p_offset) * self.invert
+        data.current_velocity = (((p[3] << 4) | (p[4] >> 4)) * self.v_scale + self.v_offset) * self.invert
+        data.current_torque = ((((p[4] & 0x0F) << 8) | p[5]) * self.t_scale + self.t_offset) * self.invert
+        data.timestamp = timestamp if timestamp >= 0 else perf_counter()
+        return True
+
+
+cdef class StatusReplyDecoder:
+    cdef readonly object data
+    cdef readonly double invert
+    cdef double p_scale, v_scale
+
+    def __init__(self, data, int invert=1):
+        self.data = data
+        self.invert = invert
+        self.p_scale = 0.1 * DEG2RAD * invert
+        self.v_scale = 10 * invert * data.erpm_to_rpm / DEGPERSEC2RPM * DEG2RAD
+
+    cpdef bint decode(self, unsigned int arbitration_id, object payload, double timestamp=-1.0):
+        # python-can stores frame data as a bytearray, which is read in place
+        if not PyByteArray_CheckExact(payload): payload = bytearray(payload)
+        cdef Py_ssize_t size = PyByteArray_GET_SIZE(payload)
+        cdef const uint8_t* p = <const uint8_t*>PyByteArray_AS_STRING(payload)
+        if size < 8: return False
+        data = self.data
+        data.current_position = be_int16(p, 0) * self.p_scale
+        data.current_velocity = be_int16(p, 2) * self.v_scale
+        data.current_torque = be_int16(p, 4) * 0.01
+        data.current_temperature = p[6]
+        data.error_code = p[7]
+        data.timestamp = timestamp if timestamp >= 0 else perf_counter()
+        return True
+
+
+cdef class RobstrideMotionDecoder:
+    cdef readonly object data
+    cdef readonly unsigned int motor_id
+    cdef readonly double invert
+    cdef double p_scale, p_offset, v_scale, v_offset, t_scale, t_offset
+
+    def __init__(self, data, int invert=1):
+        self.data = data
+        self.motor_id = data.motor_id
+        self.invert = invert
+        model = data.motor_type
+        cdef double full_scale = (1 << rsd.N_BITS) - 1
+        self.p_scale = (rsd.P_MAX[model] - rsd.P_MIN[model]) / full_scale
+        self.p_offset = rsd.P_MIN[model]
+        self.v_scale = (rsd.V_MAX[model] - rsd.V_MIN[model]) / full_scale
+        self.v_offset = rsd.V_MIN[model]
+        self.t_scale = (rsd.T_MAX[model] - rsd.T_MIN[model]) / full_scale
+        self.t_offset = rsd.T_MIN[model]
+
+    cpdef bint decode(self, unsigned int arbitration_id, object payload, double timestamp=-1.0):
+        # python-can stores frame data as a bytearray, which is read in place
+        if not PyByteArray_CheckExact(payload): payload = bytearray(payload)
+        cdef Py_ssize_t size = PyByteArray_GET_SIZE(payload)
+        cdef const uint8_t* p = <const uint8_t*>PyByteArray_AS_STRING(payload)
+        if ((arbitration_id >> 24) & 0x3F) != RESPONSE_MOTION or ((arbitration_id >> 8) & 0xFF) != self.motor_id: return False
+        if size < 8: return False
+        data = self.data
+        data.current_position = (be_uint16(p, 0) * self.p_scale + self.p_offset) * self.invert
+        data.current_velocity = (be_uint16(p, 2) * self.v_scale + self.v_offset) * self.invert
+        data.current_torque = (be_uint16(p, 4) * self.t_scale + self.t_offset) * self.invert
+        data.current_temperature = be_uint16(p, 6) / 10.0
+        data.motor_mode = (arbitration_id >> 22) & 0x3
+        data.timestamp = timestamp if timestamp >= 0 else perf_counter()
+        return True
+
+
+cdef class RMSTorqueMonitor:
+    cdef public double window
+    cdef public double limit
+    cdef readonly double sum_sqr
+    cdef readonly double rms
+    # Ring buffer of (squared value, timestamp), grown as needed to hold one window of samples
+    cdef double* squares
+    cdef double* times
+    cdef Py_ssize_t capacity, head, count
+
+    def __cinit__(self):
+        self.capacity = 1024
+        self.head = 0
+        self.count = 0
+        self.squares = <double*>malloc(self.capacity * sizeof(double))
+        self.times = <double*>malloc(self.capacity * sizeof(double))
+        if self.squares == NULL or self.times == NULL: raise MemoryError()
+
+    def __dealloc__(self):
+        free(self.squares)
+        free(self.times)
+
+    def __init__(self, double limit, double window=20.0):
+        self.window = window
+        self.limit = limit
+        self.sum_sqr = 0.0
+        self.rms = 0.0
+
+    cdef int _grow(self) except -1:
+        cdef Py_ssize_t new_capacity = self.capacity * 2
+        cdef Py_ssize_t i, tail
+        cdef double* squares = <double*>realloc(self.squares, new_capacity * sizeof(double))
+        if squares == NULL: raise MemoryError()
+        self.squares = squares
+        cdef double* times = <double*>realloc(self.times, new_capacity * sizeof(double))
+        if times == NULL: raise MemoryError()
+        self.times = times
+        # Move the wrapped part of the ring after the old end so that it is contiguous again
+        tail = self.head + self.count - self.capacity
+        for i in range(tail if tail > 0 else 0):
+            self.squares[self.capacity + i] = self.squares[i]
+            self.times[self.capacity + i] = self.times[i]
+        self.capacity = new_capacity
+        return 0
+
+    cpdef tuple update(self, double new_val):
+        cdef double now = perf_counter()
+        cdef double sq = new_val * new_val
+        if self.count == self.capacity: self._grow()
+        cdef Py_ssize_t tail = (self.head + self.count) % self.capacity
+        self.squares[tail] = sq
+        self.times[tail] = now
+        self.count += 1
+        self.sum_sqr += sq
+        while self.count and (now - self.times[self.head]) > self.window:
+            self.sum_sqr -= self.squares[self.head]
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+        self.rms = sqrt(self.sum_sqr / self.count) if self.count else 0.0
+        return self.rms, self.rms > self.limit
+
+    @property
+    def vals(self):
+        # Copy of the window as (squared value, timestamp) tuples, oldest first, like the deque of the Python version
+        return deque((self.squares[(self.head + i) % self.capacity], self.times[(self.head + i) % self.capacity]) for i in range(self.count))
+
+    cpdef bint over_limit(self):
+        if self.count == 0: return False
+        if (perf_counter() - self.times[self.head]) < (self.window * 0.8): # Check for sufficient torque values in buffer
+            return False
+        return self.rms > self.limit
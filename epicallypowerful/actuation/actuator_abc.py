@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 from epicallypowerful.actuation.motor_data import MotorData
 
 class Actuator(ABC):
@@ -57,3 +58,9 @@ class Actuator(ABC):
     @abstractmethod
     def _set_zero_torque(self):
         pass
+
+    def _can_filters(self) -> Optional[list[dict]]:
+        """Returns the CAN filters for the frames this actuator listens to, in the format of the ``can_filters`` of :py:class:`can.Bus`.
+        The shared bus only routes matching frames to this actuator. None receives every frame.
+        """
+        return None
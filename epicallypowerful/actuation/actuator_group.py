@@ -1,6 +1,7 @@
 from epicallypowerful.actuation.actuator_abc import Actuator
 from epicallypowerful.actuation.cubemars import CubeMars
 from epicallypowerful.actuation.cubemars import CubeMarsServo
+from epicallypowerful.actuation.cubemars import CubeMarsV3
 from epicallypowerful.actuation.robstride import Robstride
 from epicallypowerful.actuation.motor_data import MotorData, cubemars, robstrides
 import can
@@ -11,48 +12,55 @@ import os
 import sys
 import logging
 from typing_extensions import Self, Optional
-import platform
 import functools
 from typing import Callable, Literal
 import math
+import threading
+from epicallypowerful.toolbox.can_bus import bring_up_can_interface, acquire_can_bus, release_can_bus
+from epicallypowerful.toolbox.diagnostics import RateLimitedReporter, add_queued_handler, get_console_logger
+from epicallypowerful.toolbox.events import FreshStateTrigger
+from epicallypowerful.actuation.io_process import ActuatorIOProcess
 
 # ~~~~~ Logging Setup ~~~~~ #
 motorlog = logging.getLogger('motorlog')
-fh = logging.FileHandler('motorlog.log')
-# fh.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-fh.setFormatter(formatter)
-motorlog.addHandler(fh)
-
-def _load_can_drivers() -> None:
-    """Loads and unload the can drivers, then reloads to ensure fresh driver initialization
-    This will load the CAN drivers, but then remove them and load them again...
-    Trust the process. Loading them alone will not reset the can drivers.
-    If they are not reset, the buffer can fill up due to errors and the buffer
-    will not properly reset.
+_motorlog_configured = False
+_console: Optional[logging.Logger] = None
+_diagnostics: Optional[RateLimitedReporter] = None
+
+def _set_up_motorlog() -> None:
+    """Attaches the motorlog.log file handler. This is done when the first ActuatorGroup is created rather than at import,
+    and the file itself is only opened once something is logged. The file is written by a background thread, and diagnostics
+    that can recur on every control call are rate limited (see :py:mod:`epicallypowerful.toolbox.diagnostics`).
     """
+    global _motorlog_configured, _console, _diagnostics
+    if _motorlog_configured: return
+    fh = logging.FileHandler('motorlog.log', delay=True)
+    # fh.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    fh.setFormatter(formatter)
+    add_queued_handler(motorlog, fh)
+    _console = get_console_logger()
+    _diagnostics = RateLimitedReporter(motorlog)
+    _motorlog_configured = True
+
+class _StateListener(can.Listener):
+    """Checks a :py:class:`~epicallypowerful.toolbox.events.FreshStateTrigger` for every reply frame of its actuators. It is subscribed
+    with the same filters as the actuators and after them, so the shared bus routes each frame to it after the actuator has decoded it.
+
+    :meta private:
+    """
+    def __init__(self, trigger: FreshStateTrigger) -> None:
+        super().__init__()
+        self.trigger = trigger
 
-    dev_uname = platform.uname()
-    if 'aarch64' in dev_uname.machine.lower() and 'tegra' in dev_uname.release.lower():
-        os.system('sudo modprobe can')
-        os.system('sudo modprobe can_raw')
-        os.system('sudo modprobe mttcan')
-
-        os.system('sudo /sbin/ip link set can0 down')
-        os.system('sudo rmmod can_raw')
-        os.system('sudo rmmod can')
-        os.system('sudo rmmod mttcan')
-
-        os.system('sudo modprobe can')
-        os.system('sudo modprobe can_raw')
-        os.system('sudo modprobe mttcan')
-
-        os.system('sudo /sbin/ip link set can0 down')
-        os.system('sudo /sbin/ip link set can0 txqueuelen 1000 up type can bitrate 1000000')
+    def on_message_received(self, msg: can.Message) -> None:
+        self.trigger.check()
 
-    elif 'aarch64' in dev_uname.machine.lower() and ('rpi' in dev_uname.release.lower() or 'raspi' in dev_uname.release.lower() or 'bcm' in dev_uname.release.lower()):
-        os.system('sudo /sbin/ip link set can0 down')
-        os.system('sudo /sbin/ip link set can0 txqueuelen 1000 up type can bitrate 1000000')
+def _load_can_drivers(channel: str='can0') -> None:
+    """Brings up the CAN interface, resetting it only if it is down or in an error state.
+    Kept for backwards compatibility, see :py:func:`epicallypowerful.toolbox.can_bus.bring_up_can_interface`.
+    """
+    bring_up_can_interface(channel)
 
 
 class ActuatorGroup():
@@ -97,11 +105,25 @@ class ActuatorGroup():
     Args:
         actuators (list[Actuator]): A list of the actuators to control
         can_args (Optional[dict], optional): A dictionary of arguments to be passed to the :py:class:`can.Bus` object.
-            This is only needed if your system does not use SocketCAN as described in the tutorials. Defaults to None.
+            This is only needed if your system does not use SocketCAN as described in the tutorials. The bus is shared with any other devices on the same channel (e.g. OpenIMUs),
+            so any arguments other than ``channel`` and ``bustype`` only take effect if this is the first device to open it. Defaults to None.
         enable_on_startup (bool, optional): Whether to attempt to enable the actuators when the object is created. If set False, :py:func:`enable_actuators` needs to be called before any other commands. Defaults to True.
         exit_manually (bool, optional): Whether to handle graceful exit manually. If set to False, the program will attempt to disable the actuators and shutdown the CAN bus on SIGINT or SIGTERM (ex. Ctrl+C). Defaults to False.
         torque_limit_mode (Literal['warn', 'throttle', 'saturate', 'disable', 'silent'], optional): The mode to use when a motor exceeds its torque limits. 'warn' prints a warning to the terminal. 'throttle' drops commanded torque to zero. 'saturate' saturates the torque at the rated torque for the motor type. 'disable' shuts down the motors and will not reinitialize them. Defaults to 'warn'.
         torque_rms_window (float, optional): The window size in seconds to use for torque RMS monitoring. Defaults to 20.0 seconds.
+        response_timeout (float, optional): Time in seconds an actuator can go without replying to commands before it is considered lost.
+            Lost actuators are re-enabled in the background by a supervisor thread, and commands to them are skipped until they reply again,
+            while commands to the other actuators continue. Defaults to 0.25.
+        io_process (bool, optional): Whether to run all CAN sending and receiving in a dedicated process (see :py:class:`~epicallypowerful.actuation.io_process.ActuatorIOProcess`),
+            so that it never waits for the GIL held by the control loop or other threads. The methods of the group are used the same way, and
+            read the state mirrored from the I/O process. Reading the actuators directly (e.g. ``actuators.actuators[1].data``) gives the state
+            as of the last such method call. The I/O process is a new interpreter that builds its own copy of each actuator from its type, CAN ID,
+            motor type, and inversion, and its bus is not shared with other devices in this process.
+            :py:meth:`on_state` is not available in this mode, but the state published by the I/O process after every reply can be read from
+            the ``io_state`` :py:class:`~epicallypowerful.toolbox.shared_state.SharedStateRing`, also from other processes. Defaults to False.
+        io_cpu (Optional[int], optional): CPU core to pin the I/O process to, ideally one isolated with the ``isolcpus`` kernel parameter. Defaults to None (not pinned).
+        io_priority (Optional[int], optional): ``SCHED_FIFO`` real-time priority (1-99) of the I/O process. This needs root or the ``CAP_SYS_NICE`` capability,
+            and a warning is printed without it. Defaults to None (normal scheduling).
     """
     def __init__(self,
         actuators: list[Actuator],
@@ -110,36 +132,61 @@ class ActuatorGroup():
         exit_manually: bool = False,
         torque_limit_mode: Literal['warn', 'throttle', 'saturate', 'disable', 'silent'] = 'warn',
         torque_rms_window: float=20.0,
+        response_timeout: float=0.25,
+        io_process: bool=False,
+        io_cpu: Optional[int]=None,
+        io_priority: Optional[int]=None,
     ) -> None:
-        _load_can_drivers()
+        _set_up_motorlog()
+        self._supervisor = None
+        self._state_listeners = {} # FreshStateTrigger -> _StateListener
+        self._io = None
+        self.io_state = None
+        self._shared_bus = None
         if can_args is None: can_args = {'bustype': 'socketcan', 'channel': 'can0'}
-        self.bus = can.Bus(channel=can_args['channel'], bustype=can_args['bustype'])
-        self.notifier = can.Notifier(self.bus, [])
+        if can_args['bustype'] == 'socketcan': bring_up_can_interface(can_args['channel'])
 
         self.actuators = {}
-        # Add all the actuators to the dictionary where the key is the CAN ID, and set the bus to the same bus as the ActuatorGroup
         for actuator in actuators:
             if actuator.can_id in self.actuators:
-                self.bus.shutdown()
                 raise ValueError(f"Duplicate CAN ID: {actuator.can_id}")
             if not isinstance(actuator, Actuator):
-                self.bus.shutdown()
                 raise ValueError(f"Invalid actuator type: {type(actuator)}")
-
-            actuator._bus = self.bus
             self.actuators[actuator.can_id] = actuator
-            self.notifier.add_listener(actuator)
-            if self.actuators[actuator.can_id].torque_monitor is not None:
-                self.actuators[actuator.can_id].torque_monitor.window = torque_rms_window
+            if actuator.torque_monitor is not None:
+                actuator.torque_monitor.window = torque_rms_window
+
+        if io_process:
+            # The I/O process opens its own bus and takes over sending and receiving for the actuators
+            self._io = ActuatorIOProcess(list(self.actuators.values()), can_args, cpu=io_cpu, priority=io_priority)
+            self.io_state = self._io.state
+            self.bus = self._io.bus
+            self.notifier = None
+        else:
+            # All CAN consumers in the process (e.g. OpenIMUs) share one bus and receive thread per channel
+            self._shared_bus = acquire_can_bus(
+                can_args['channel'], interface=can_args['bustype'],
+                **{k: v for k, v in can_args.items() if k not in ('channel', 'bustype')},
+            )
+            self.bus = self._shared_bus.bus
+            self.notifier = self._shared_bus.notifier
+            # Set the bus of every actuator to the same bus as the ActuatorGroup
+            for actuator in self.actuators.values():
+                actuator._bus = self.bus
+                self._shared_bus.subscribe(actuator, actuator._can_filters())
 
         self._torque_limit_mode = torque_limit_mode
         if torque_limit_mode not in ['warn', 'throttle', 'saturate', 'disable', 'silent']:
-            self.bus.shutdown()
+            self._release_bus()
             raise ValueError("torque_limit_mode must be one of 'warn', 'throttle', 'saturate', 'disable', or 'silent'")
         self._actuators_enabled = False
-        self._priming_reconnection = False
-        self._reconnection_start_time = 0
         self.prev_command_time = time.perf_counter()
+        self.response_timeout = response_timeout
+        self._lost_actuators = {} # CAN ID -> time of the last attempt to re-enable it
+        self._recover_all = False # set when the bus failed or a command was sent while disabled
+        self._state_lock = threading.RLock()
+        self._supervisor_wakeup = threading.Event()
+        self._supervisor_stop = threading.Event()
         
         if not exit_manually:
             signal.signal(signal.SIGINT, self._exit_gracefully)
@@ -148,80 +195,175 @@ class ActuatorGroup():
         time.sleep(0.1)
         self.auto_disabled = False
         if enable_on_startup: self.enable_actuators()
+        self._supervisor = threading.Thread(target=self._supervise, name='ActuatorGroupSupervisor', daemon=True)
+        self._supervisor.start()
 
-    def _guard_connection(func: Callable) -> Callable: # Guard connection decorator, will check if all motors are disconnected from the bus
+    def _guard_connection(func: Callable) -> Callable: # Guard connection decorator, hands recovery from bus failures to the supervisor thread
             @functools.wraps(func)
             def wrapper(self, *args, **kw):
                 if self.auto_disabled: return
+                if self._io is not None: self._sync_io_state()
                 self.prev_command_time = time.perf_counter()
-                if self._actuators_enabled == False and not self._priming_reconnection:
-                    try:
-                        print(f'\rNo actuators detected or actuators not enabled, please check all connections/emergency stop.', end="")
-                        self.enable_actuators()
-                    except CanOperationError as e:
-                        self._actuators_enabled = False
-                    else:
-                        self._priming_reconnection = True
-                        self._reconnection_start_time = time.perf_counter()
-                        print(f'\nActuator detected')
-                    return
-                if self._priming_reconnection == True:
-                    print(f'\rPreparing to reconnect to actuators - Operating loop frequency will likely be unstable.', end="")
-                    if time.perf_counter() - self._reconnection_start_time >= 0.5:
-                        self._priming_reconnection = False
-                        self.enable_actuators()
-                        print(f'\nReestablished connection to actuators')
+                if self._actuators_enabled == False:
+                    self._request_recovery()
                     return
 
                 try:
                     res = func(self, *args, **kw)
                 except CanOperationError as e:
-                    self._actuators_enabled = False
-                    for ids, acts in self.actuators.items():
-                        acts.data.responding = False
-                    print(f'\rNo actuators detected or actuators not enabled, please check all connections/emergency stop.', end="")
+                    self._request_recovery()
                     return
                 return res
             return wrapper
 
-    def enable_actuators(self) -> None:
-        """Enables control of the actuators. This will send the appropriate enable command and set torques to zero.
-        """
-        for can_id, actuator in self.actuators.items():
-            actuator._enable()
-            time.sleep(0.01)
-            actuator._set_zero_torque()
+    def enable_actuators(self, timeout: float=0.5) -> bool:
+        """Enables control of the actuators. This sends the enable command and then a zero torque command to every actuator back-to-back,
+        and waits until each actuator has confirmed with a reply frame, or until ``timeout`` seconds have passed. Actuators that did not
+        reply are marked as not responding.
 
-        time.sleep(0.5)
-        self._actuators_enabled = True
+        Args:
+            timeout (float, optional): Maximum time in seconds to wait for the replies. Defaults to 0.5.
 
-    def disable_actuators(self) -> None:
-        """Disables control of the actuators. This will set the torque to 0 and disable the motors.
+        Returns:
+            bool: True if every actuator replied, False otherwise.
         """
-        for can_id, actuator in self.actuators.items():
-            actuator._set_zero_torque()
-            actuator._disable()
-            time.sleep(0.05)
+        with self._state_lock:
+            self._recover_all = False
+            start = time.perf_counter()
+            for actuator in self.actuators.values():
+                actuator._enable()
+            for actuator in self.actuators.values():
+                actuator._set_zero_torque()
+
+            missing = self._wait_for_replies(start, timeout)
+            # The supervisor keeps retrying the actuators that did not reply
+            self._lost_actuators = {can_id: start for can_id in missing}
+            self._actuators_enabled = True
+        if missing: motorlog.warning(f"Actuators {missing} did not reply within {timeout} s of enabling")
+        return not missing
+
+    def disable_actuators(self, timeout: float=0.1) -> bool:
+        """Disables control of the actuators. This sends a zero torque command and then the disable command to every actuator back-to-back,
+        and waits until each actuator has confirmed with a reply frame, or until ``timeout`` seconds have passed.
 
-        time.sleep(0.1)
-        self._actuators_enabled = False
+        Args:
+            timeout (float, optional): Maximum time in seconds to wait for the replies. Defaults to 0.1.
 
-    def _check_disconnect(self, can_id):
-        """Checks if the actuator with the given CAN ID is disconnected.
+        Returns:
+            bool: True if every actuator replied, False otherwise.
+        """
+        with self._state_lock:
+            self._recover_all = False
+            self._actuators_enabled = False
+            self._lost_actuators = {}
+            start = time.perf_counter()
+            for actuator in self.actuators.values():
+                actuator._set_zero_torque()
+            for actuator in self.actuators.values():
+                actuator._disable()
+
+            missing = self._wait_for_replies(start, timeout)
+        if missing: motorlog.warning(f"Actuators {missing} did not reply within {timeout} s of disabling")
+        return not missing
+
+    def _wait_for_replies(self, since: float, timeout: float) -> list[int]:
+        """Waits until every actuator has received a reply stamped after ``since``, or until ``timeout`` seconds after ``since``,
+        and updates whether each actuator is responding.
 
         Args:
-            can_id (int): CAN ID of the actuator. This should be set by the appropriate manufacturer software.
+            since (float): ``time.perf_counter()`` time from which replies count.
+            timeout (float): Maximum time in seconds after ``since`` to wait.
 
         Returns:
-            bool: True if the actuator is disconnected, False otherwise.
+            list[int]: CAN IDs of the actuators that did not reply.
         """
-        if self.actuators[can_id].call_response_latency() > 0.25:
-            motorlog.error(f'Latency for motor {can_id} is too high, skipping command and attempting to enable')
-            self.actuators[can_id].data.responding = False
-            self.actuators[can_id].data.last_command_time = time.perf_counter()
-            self.actuators[can_id]._enable()
-            return -1
-        return 1
+        deadline = since + timeout
+        pending = list(self.actuators)
+        while True:
+            if self._io is not None: self._io.sync()
+            pending = [can_id for can_id in pending if self.actuators[can_id].data.timestamp < since]
+            if not pending or time.perf_counter() >= deadline: break
+            time.sleep(0.001)
+
+        for can_id, actuator in self.actuators.items():
+            actuator.data.responding = can_id not in pending
+        return pending
+
+    def _request_recovery(self) -> None:
+        """Asks the supervisor thread to re-enable all actuators, after a bus failure or a command sent while they are disabled.
+        """
+        if not self._recover_all:
+            self._recover_all = True
+            for actuator in self.actuators.values():
+                actuator.data.responding = False
+            _console.warning('No actuators detected or actuators not enabled, please check all connections/emergency stop. Reconnecting in the background.')
+            motorlog.warning('Actuators not enabled or CAN bus failed, re-enabling all actuators')
+        self._supervisor_wakeup.set()
+
+    def _supervise(self, period: float=0.01) -> None:
+        """Supervisor thread. Tracks the liveness of each actuator from its reply timestamps and re-enables lost actuators, so that
+        recovery never blocks the control loop.
+
+        Args:
+            period (float, optional): Time in seconds between checks. Defaults to 0.01.
+        """
+        while not self._supervisor_stop.is_set():
+            self._supervisor_wakeup.wait(period)
+            self._supervisor_wakeup.clear()
+            if self._supervisor_stop.is_set() or self.auto_disabled: continue
+            try:
+                if self._recover_all:
+                    with self._state_lock:
+                        if not self._recover_all: continue # disabled or enabled in the meantime
+                        if self.enable_actuators(): _console.info('Reestablished connection to actuators')
+                elif self._actuators_enabled:
+                    self._check_liveness()
+            except CanOperationError:
+                time.sleep(self.response_timeout) # bus still down, retry later
+            except Exception as e:
+                motorlog.error(f'Actuator supervisor error: {e}')
+
+    def _check_liveness(self) -> None:
+        """Marks actuators that stopped replying to commands as lost and re-enables them, retrying every ``response_timeout`` seconds,
+        until they reply again.
+        """
+        if self._io is not None: self._sync_io_state()
+        now = time.perf_counter()
+        with self._state_lock:
+            if not self._actuators_enabled: return
+            for can_id, actuator in self.actuators.items():
+                last_attempt = self._lost_actuators.get(can_id)
+                if last_attempt is None:
+                    if actuator.call_response_latency() <= self.response_timeout: continue
+                    actuator.data.responding = False
+                    _console.warning(f'Actuator {can_id} is not responding, re-enabling it in the background')
+                    motorlog.error(f'Latency for motor {can_id} is too high, skipping commands and attempting to enable')
+                elif actuator.data.timestamp > last_attempt:
+                    del self._lost_actuators[can_id]
+                    actuator.data.responding = True
+                    _console.info(f'Reestablished connection to actuator {can_id}')
+                    motorlog.info(f'Motor {can_id} is responding again')
+                    continue
+                elif now - last_attempt < self.response_timeout:
+                    continue
+
+                self._lost_actuators[can_id] = now
+                actuator._enable()
+                actuator._set_zero_torque()
+
+    def _sync_io_state(self) -> None:
+        """Updates the state of the actuators from the I/O process, and hands recovery to the supervisor thread if the I/O process failed
+        to send frames, as a failed send does in this process.
+        """
+        if self._io.sync(): self._request_recovery()
+
+    def _warn_over_limit(self, can_id: int) -> None:
+        """Reports that an actuator is over its torque limit, at most once per second with a count of the calls in between.
+        """
+        _diagnostics.report(
+            f'actuator {can_id} over torque limit',
+            f"WARNING: Motor CAN ID {can_id} exceeded torque limits ({self.actuators[can_id].torque_monitor.limit} Nm). Halt operation or decrease load.",
+        )
 
     def _check_torque_limits(self, can_id, expected_torque_command):
         """Checks if the actuator with the given CAN ID is over torque limits.
@@ -235,10 +377,9 @@ class ActuatorGroup():
         """
         if self.actuators[can_id]._over_limit:
             if self._torque_limit_mode == 'warn':
-                print(f"WARNING: Motor CAN ID {can_id} exceeded torque limits ({self.actuators[can_id].torque_monitor.limit} Nm). Halt operation or decrease load.")
+                self._warn_over_limit(can_id)
                 return 1
             elif self._torque_limit_mode == 'throttle':
-                self.actuators[can_id].data.responding = True
                 self.actuators[can_id].data.last_command_time = time.perf_counter()
                 self.actuators[can_id].set_torque(0.0)
                 return -1
@@ -247,7 +388,6 @@ class ActuatorGroup():
                 if abs(saturated_torque) < abs(expected_torque_command):
                     torque_to_use = saturated_torque
                     self.actuators[can_id].set_torque(torque_to_use)
-                    self.actuators[can_id].data.responding = True
                     self.actuators[can_id].data.last_command_time = time.perf_counter()
                     return -1
                 else:
@@ -276,16 +416,11 @@ class ActuatorGroup():
             degrees (bool, optional): Whether the position and velocity are in degrees or radians. Defaults to False.
         """
         expected_torque_command = torque + kp * (pos - self.actuators[can_id].get_position(degrees=degrees)) + kd * (vel - self.actuators[can_id].get_velocity(degrees=degrees))
-        if self.actuators[can_id].call_response_latency() > 0.25:
-            motorlog.error(f'Latency for motor {can_id} is too high, skipping command and attempting to enable')
-            self.actuators[can_id].data.responding = False
-            self.actuators[can_id].data.last_command_time = time.perf_counter()
-            self.actuators[can_id]._enable()
-            return -1
+        if can_id in self._lost_actuators: return -1 # being re-enabled by the supervisor
         
         if self.actuators[can_id]._over_limit:
             if self._torque_limit_mode == 'warn':
-                print(f"WARNING: Motor CAN ID {can_id} exceeded torque limits ({self.actuators[can_id].torque_monitor.limit} Nm). Halt operation or decrease load.")
+                self._warn_over_limit(can_id)
             elif self._torque_limit_mode == 'throttle':
                 self.actuators[can_id].set_torque(0.0)
                 return
@@ -294,7 +429,6 @@ class ActuatorGroup():
                 if abs(saturated_torque) < abs(expected_torque_command):
                     torque_to_use = saturated_torque
                     self.actuators[can_id].set_torque(torque_to_use)
-                    self.actuators[can_id].data.responding = True
                     self.actuators[can_id].data.last_command_time = time.perf_counter()
                     return
                 else:
@@ -310,7 +444,6 @@ class ActuatorGroup():
 
         self.actuators[can_id].data.last_command_time = time.perf_counter()
         self.actuators[can_id].set_control(pos, vel, torque, kp, kd, degrees)
-        self.actuators[can_id].data.responding = True
 
         return 1
 
@@ -324,16 +457,11 @@ class ActuatorGroup():
             torque (float): Torque to set the actuator to in Newton-meters.
         """
         expected_torque_command = torque
-        if self.actuators[can_id].call_response_latency() > 0.25:
-            motorlog.error(f'Latency for motor {can_id} is too high, skipping command and attempting to enable')
-            self.actuators[can_id].data.responding = False
-            self.actuators[can_id].data.last_command_time = time.perf_counter()
-            self.actuators[can_id]._enable()
-            return -1
+        if can_id in self._lost_actuators: return -1 # being re-enabled by the supervisor
         
         if self.actuators[can_id]._over_limit:
             if self._torque_limit_mode == 'warn':
-                print(f"WARNING: Motor CAN ID {can_id} exceeded torque limits ({self.actuators[can_id].torque_monitor.limit} Nm). Halt operation or decrease load.")
+                self._warn_over_limit(can_id)
             elif self._torque_limit_mode == 'throttle':
                 self.actuators[can_id].set_torque(0.0)
                 return
@@ -342,7 +470,6 @@ class ActuatorGroup():
                 if abs(saturated_torque) < abs(expected_torque_command):
                     torque_to_use = saturated_torque
                     self.actuators[can_id].set_torque(torque_to_use)
-                    self.actuators[can_id].data.responding = True
                     self.actuators[can_id].data.last_command_time = time.perf_counter()
                     return
                 else:
@@ -358,7 +485,6 @@ class ActuatorGroup():
 
         self.actuators[can_id].data.last_command_time = time.perf_counter()
         self.actuators[can_id].set_torque(torque)
-        self.actuators[can_id].data.responding = True
 
         return 1
 
@@ -374,16 +500,11 @@ class ActuatorGroup():
             degrees (bool): Whether the position is in degrees or radians.
         """
         expected_torque_command = kp * (position - self.actuators[can_id].get_position(degrees=degrees)) - kd * (self.actuators[can_id].get_velocity(degrees=degrees))
-        if self.actuators[can_id].call_response_latency() > 0.25:
-            motorlog.error(f'Latency for motor {can_id} is too high, skipping command and attempting to enable')
-            self.actuators[can_id].data.responding = False
-            self.actuators[can_id].data.last_command_time = time.perf_counter()
-            self.actuators[can_id]._enable()
-            return -1
+        if can_id in self._lost_actuators: return -1 # being re-enabled by the supervisor
         
         if self.actuators[can_id]._over_limit:
             if self._torque_limit_mode == 'warn':
-                print(f"WARNING: Motor CAN ID {can_id} exceeded torque limits ({self.actuators[can_id].torque_monitor.limit} Nm). Halt operation or decrease load.")
+                self._warn_over_limit(can_id)
             elif self._torque_limit_mode == 'throttle':
                 self.actuators[can_id].set_torque(0.0)
                 return
@@ -392,7 +513,6 @@ class ActuatorGroup():
                 if abs(saturated_torque) < abs(expected_torque_command):
                     torque_to_use = saturated_torque
                     self.actuators[can_id].set_torque(torque_to_use)
-                    self.actuators[can_id].data.responding = True
                     self.actuators[can_id].data.last_command_time = time.perf_counter()
                     return
                 else:
@@ -407,7 +527,6 @@ class ActuatorGroup():
 
         self.actuators[can_id].data.last_command_time = time.perf_counter()
         self.actuators[can_id].set_position(position, kp, kd, degrees)
-        self.actuators[can_id].data.responding = True
         return 1
 
     @_guard_connection
@@ -423,16 +542,11 @@ class ActuatorGroup():
         
         expected_torque_command = kd * (velocity - self.actuators[can_id].get_velocity(degrees=degrees))
         
-        if self.actuators[can_id].call_response_latency() > 0.25:
-            motorlog.error(f'Latency for motor {can_id} is too high, skipping command and attempting to enable')
-            self.actuators[can_id].data.responding = False
-            self.actuators[can_id].data.last_command_time = time.perf_counter()
-            self.actuators[can_id]._enable()
-            return -1
+        if can_id in self._lost_actuators: return -1 # being re-enabled by the supervisor
         
         if self.actuators[can_id]._over_limit:
             if self._torque_limit_mode == 'warn':
-                print(f"WARNING: Motor CAN ID {can_id} exceeded torque limits ({self.actuators[can_id].torque_monitor.limit} Nm). Halt operation or decrease load.")
+                self._warn_over_limit(can_id)
             elif self._torque_limit_mode == 'throttle':
                 self.actuators[can_id].set_torque(0.0)
                 return
@@ -441,7 +555,6 @@ class ActuatorGroup():
                 if abs(saturated_torque) < abs(expected_torque_command):
                     torque_to_use = saturated_torque
                     self.actuators[can_id].set_torque(torque_to_use)
-                    self.actuators[can_id].data.responding = True
                     self.actuators[can_id].data.last_command_time = time.perf_counter()
                     return
                 else:
@@ -457,7 +570,6 @@ class ActuatorGroup():
 
         self.actuators[can_id].data.last_command_time = time.perf_counter()
         self.actuators[can_id].set_velocity(velocity, kd, degrees)
-        self.actuators[can_id].data.responding = True
         return 1
 
     def is_connected(self, can_id: int) -> bool:
@@ -481,6 +593,7 @@ class ActuatorGroup():
         Returns:
             MotorData: Data from the actuator. Contains most up-to-date information from the actuator.
         """
+        if self._io is not None: self._sync_io_state()
         return self.actuators[can_id].get_data()
 
     def get_torque(self, can_id: int) -> float:
@@ -492,6 +605,7 @@ class ActuatorGroup():
         Returns:
             float: Torque from the actuator in Newton-meters.
         """
+        if self._io is not None: self._sync_io_state()
         return self.actuators[can_id].get_torque()
 
     def get_position(self, can_id: int, degrees: bool = False) -> float:
@@ -503,6 +617,7 @@ class ActuatorGroup():
         Returns:
             float: Position from the actuator in radians.
         """
+        if self._io is not None: self._sync_io_state()
         return self.actuators[can_id].get_position(degrees = degrees)
 
     def get_velocity(self, can_id: int, degrees: bool = False) -> float:
@@ -514,10 +629,11 @@ class ActuatorGroup():
         Returns:
             float: Position from the actuator in radians.
         """
+        if self._io is not None: self._sync_io_state()
         return self.actuators[can_id].get_velocity(degrees = degrees)
 
     def get_temperature(self, can_id: int) -> float:
-        """Returns the temperature from the actuator with the given CAN ID. Functionally equivalent to ``actuators.get_data(can_id).temperature``.
+        """Returns the temperature from the actuator with the given CAN ID. Functionally equivalent to ``actuators.get_data(can_id).current_temperature``.
 
         Args:
             can_id (int): CAN ID of the actuator. This should be set by the appropriate manufacturer software.
@@ -525,14 +641,74 @@ class ActuatorGroup():
         Returns:
             float: Temperature from the actuator in degrees Celsius.
         """
+        if self._io is not None: self._sync_io_state()
         return self.actuators[can_id].get_temperature()
 
+    def on_state(self, callback: Callable[[dict[int, MotorData]], None], ids: Optional[list[int]] = None, worker: bool = False) -> FreshStateTrigger:
+        """Calls a function as soon as every actuator in ``ids`` has replied since the previous call, i.e. once the replies to a round of
+        commands have all arrived. This reacts to new data without waiting for the next iteration of a polling loop, and the function can
+        send the next commands directly. If an actuator stops replying, the function is not called until it replies again.
+
+        By default the function runs on the CAN receive thread, right after the reply that completes the set is decoded. This gives the
+        lowest latency, but holds up receiving further frames, so it should only compute and send the next commands. With ``worker=True``
+        it runs on a dedicated thread instead.
+
+        Example:
+            .. code-block:: python
+
+
+                actuators = ActuatorGroup.from_dict({1: 'AK80-9', 2: 'AK80-9'})
+
+                def reflex(states):
+                    for can_id, data in states.items():
+                        actuators.set_torque(can_id, -2.0 * data.current_velocity)
+
+                trigger = actuators.on_state(reflex)
+                actuators.set_torque(1, 0.0) # replies to the first commands start the cycle
+                actuators.set_torque(2, 0.0)
+                # ...
+                trigger.cancel()
+
+        Args:
+            callback (Callable[[dict[int, MotorData]], None]): Function called with the :py:class:`MotorData` of each actuator in ``ids``, by CAN ID.
+            ids (Optional[list[int]], optional): CAN IDs of the actuators to wait for. Defaults to None (all actuators).
+            worker (bool, optional): Whether to call ``callback`` on a dedicated worker thread instead of the CAN receive thread. Defaults to False.
+
+        Returns:
+            FreshStateTrigger: The trigger calling ``callback``. Call its ``cancel()`` method to stop.
+        """
+        if self._io is not None:
+            raise NotImplementedError('on_state is not available with io_process=True. Read the state published by the I/O process from io_state instead')
+        ids = list(self.actuators) if ids is None else list(ids)
+        for can_id in ids:
+            if can_id not in self.actuators:
+                raise ValueError(f"Invalid CAN ID: {can_id}")
+
+        filters = []
+        for can_id in ids:
+            actuator_filters = self.actuators[can_id]._can_filters()
+            if actuator_filters is None:
+                filters = None
+                break
+            filters.extend(actuator_filters)
+
+        trigger = FreshStateTrigger(ids, lambda can_id: self.actuators[can_id].data, callback, worker=worker, on_cancel=self._remove_state_listener)
+        listener = _StateListener(trigger)
+        self._state_listeners[trigger] = listener
+        self._shared_bus.subscribe(listener, filters)
+        return trigger
+
+    def _remove_state_listener(self, trigger: FreshStateTrigger) -> None:
+        listener = self._state_listeners.pop(trigger, None)
+        if listener is not None: self._shared_bus.unsubscribe(listener)
+
     @classmethod
     def from_dict(cls: Self, actuators: dict[int, str],
                 invert: list=[], enable_on_startup:bool = True,
                 can_args: dict[str,str]=None, exit_manually: bool = False,
                 torque_limit_mode: Literal['warn', 'throttle', 'saturate', 'disable', 'silent'] = 'warn',
-                torque_rms_window: float=20.0,) -> Self:
+                torque_rms_window: float=20.0,
+                io_process: bool=False, io_cpu: Optional[int]=None, io_priority: Optional[int]=None,) -> Self:
         """Creates an ActuatorGroup from a dictionary where the key is the CAN ID and the value is the actuator type.
         For CubeMars, you can append "-servo" to the actuator type to create a CubeMarsServo instead of a CubeMars. This controls the device in "servo mode"
         which can allow for higher output torques as direct current control can be used. Please see the :py:class:`~epicallypowerful.actuation.CubeMarsServo` class for more information.
@@ -573,6 +749,9 @@ class ActuatorGroup():
             exit_manually (bool, optional): Whether to handle graceful exit manually. If set to False, the program will attempt to disable the actuators and shutdown the CAN bus on SIGINT or SIGTERM (ex. Ctrl+C). Defaults to False.
             torque_limit_mode (Literal['warn', 'throttle', 'saturate', 'disable', 'silent'], optional): The mode to use when a motor exceeds its torque limits. Defaults to 'warn'.
             torque_rms_window (float, optional): The window size in seconds to use for torque RMS monitoring. Defaults to 20.0 seconds.
+            io_process (bool, optional): Whether to run all CAN sending and receiving in a dedicated process, see :py:class:`ActuatorGroup`. Defaults to False.
+            io_cpu (Optional[int], optional): CPU core to pin the I/O process to. Defaults to None (not pinned).
+            io_priority (Optional[int], optional): ``SCHED_FIFO`` real-time priority (1-99) of the I/O process. Defaults to None (normal scheduling).
         Raises:
             ValueError: If the actuator type is not recognized or supported.
 
@@ -613,7 +792,8 @@ class ActuatorGroup():
             else:
                 raise ValueError(f"Invalid actuator type: {actuators[a]}")
 
-        return cls(actuators=act_list, can_args=can_args, enable_on_startup=enable_on_startup, exit_manually=exit_manually, torque_limit_mode=torque_limit_mode, torque_rms_window=torque_rms_window)
+        return cls(actuators=act_list, can_args=can_args, enable_on_startup=enable_on_startup, exit_manually=exit_manually, torque_limit_mode=torque_limit_mode, torque_rms_window=torque_rms_window,
+                   io_process=io_process, io_cpu=io_cpu, io_priority=io_priority)
 
     def __getitem__(self, idx: int) -> Actuator:
         """Returns the actuator with the given CAN ID. This method is better used for bracket indexing the ActuatorGroup object.
@@ -635,8 +815,28 @@ class ActuatorGroup():
         Returns:
             Actuator: The actuator with the given CAN ID
         """
+        if self._io is not None: self._sync_io_state()
         return self.actuators[idx]
 
+    def _release_bus(self) -> None:
+        """Stops the supervisor thread, and unsubscribes the actuators from the shared CAN bus and releases it, shutting it down if no other
+        devices are using it.
+        """
+        if self._supervisor is not None:
+            self._supervisor_stop.set()
+            self._supervisor_wakeup.set()
+            if self._supervisor is not threading.current_thread(): self._supervisor.join()
+            self._supervisor = None
+        for trigger in list(self._state_listeners):
+            trigger.cancel()
+        if self._io is not None:
+            self._io.stop()
+            return
+        if self._shared_bus is None: return
+        for actuator in self.actuators.values():
+            self._shared_bus.unsubscribe(actuator)
+        release_can_bus(self._shared_bus)
+
     def _exit_gracefully(self, signum, frame) -> None:
         """Exits the program gracefully. This will disable the motors and shutdown the CAN bus.
 
@@ -651,8 +851,7 @@ class ActuatorGroup():
             except:
                 sys.exit("Failed to disable motors, please ensure power is safely disconnected\n")
             finally:
-                self.notifier.stop()
-                self.bus.shutdown()
+                self._release_bus()
         os.write(sys.stdout.fileno(), b"Shutdown finished\n")
         sys.exit(0)
 
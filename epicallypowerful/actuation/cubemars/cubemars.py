@@ -1,8 +1,9 @@
 import can
-import time
 from epicallypowerful.actuation.motor_data import MotorData
 from epicallypowerful.actuation.actuator_abc import Actuator
 import epicallypowerful.actuation.cubemars.cubemars_driver as tmd
+import epicallypowerful.actuation.decoding as decoding
+from epicallypowerful.toolbox.timebase import can_receive_time
 from epicallypowerful.actuation.torque_monitor import RMSTorqueMonitor
 import logging
 import math
@@ -67,6 +68,7 @@ class CubeMars(can.Listener, Actuator):
             kp=0, kd=0, timestamp=-1,
             running_torque=(), rms_torque=0, rms_time_prev=0
         )
+        self._decoder = decoding.MITReplyDecoder(self.data, self.invert)
         self.torque_monitor = RMSTorqueMonitor(limit=abs(self.data.rated_torque_limits[1]), window=20.0)
         self._over_limit = False
 
@@ -84,22 +86,19 @@ class CubeMars(can.Listener, Actuator):
             msg (can.Message): the most recent message received on the bus
         """
         if msg.arbitration_id != 0 and msg.arbitration_id != self.can_id: return # ignore messages not for the host (0x0) or the motor (can_id)
-        
-        motor_id = msg.data[0]
-        if motor_id != self.can_id: return # ignore messages not from this motor
-
-        _, pos, vel, torque = tmd._unpack_motor_message(msg, motor=self.data)
-
-        self.data.current_position = pos * self.invert
-        self.data.current_velocity = vel * self.invert
-        self.data.current_torque = torque * self.invert
-        self.data.timestamp = time.perf_counter()
+        if not self._decoder.decode(msg.arbitration_id, msg.data, can_receive_time(msg)): return # ignore messages not from this motor
 
         rms_torque, over_limit = self.torque_monitor.update(self.data.current_torque)
         self.data.rms_torque = rms_torque
         self._over_limit = self.torque_monitor.over_limit()
         return
 
+    def _can_filters(self) -> list[dict]:
+        return [
+            {'can_id': 0, 'can_mask': 0x7FF, 'extended': False},
+            {'can_id': self.can_id, 'can_mask': 0x7FF, 'extended': False},
+        ]
+
     def call_response_latency(self) -> float:
         return self.data.last_command_time - self.data.timestamp
     
@@ -2,6 +2,8 @@ import can
 from epicallypowerful.actuation.actuator_abc import Actuator
 from epicallypowerful.actuation.motor_data import MotorData
 from epicallypowerful.actuation.torque_monitor import RMSTorqueMonitor
+import epicallypowerful.actuation.decoding as decoding
+from epicallypowerful.toolbox.timebase import can_receive_time
 
 # Servo Mode Functions
 DUTY_CYCLE_MODE = 0
@@ -254,6 +256,7 @@ class CubeMarsServo(can.Listener, Actuator):
         self._reconnection_start_time = 0
         self.prev_command_time = 0
         self._over_limit = False
+        self._decoder = decoding.StatusReplyDecoder(self.data, self.invert)
         self.torque_monitor = RMSTorqueMonitor(limit=abs(self.data.rated_torque_limits[1]), window=20)
 
     def on_message_received(self, msg: can.Message):
@@ -265,13 +268,10 @@ class CubeMarsServo(can.Listener, Actuator):
             msg (can.Message): The received CAN message.
         """
         if msg.arbitration_id == ((0x29 << 8) | (self.can_id)):
-            [pos, vel, cur, temp, err] = read_servo_message(msg)
-            self.data.current_position = pos * self.invert
-            self.data.current_velocity = vel * self.invert * self.data.erpm_to_rpm / DEGPERSEC2RPM * DEG2RAD
-            self.data.current_torque = cur
-            self.data.temperature = temp
-            self.data.error_code = err
-            self.data.timestamp = msg.timestamp
+            self._decoder.decode(msg.arbitration_id, msg.data, can_receive_time(msg))
+
+    def _can_filters(self) -> list[dict]:
+        return [{'can_id': (0x29 << 8) | self.can_id, 'can_mask': 0x1FFFFFFF, 'extended': True}]
 
     def call_response_latency(self):
         return self.data.last_command_time - self.data.timestamp
@@ -391,7 +391,7 @@ class CubeMarsServo(can.Listener, Actuator):
         Returns:
             float: The current temperature of the motor in degrees Celsius.
         """
-        return self.data.temperature
+        return self.data.current_temperature
     
     def zero_encoder(self):
         """Zeros the encoder position to the current position.
@@ -2,8 +2,9 @@ import can
 from epicallypowerful.actuation.actuator_abc import Actuator
 from epicallypowerful.actuation.motor_data import MotorData
 from epicallypowerful.actuation.torque_monitor import RMSTorqueMonitor
+import epicallypowerful.actuation.decoding as decoding
+from epicallypowerful.toolbox.timebase import can_receive_time
 import math
-import time
 
 RAD2DEG = 180.0 / math.pi
 DEG2RAD = math.pi / 180.0
@@ -128,24 +129,22 @@ class CubeMarsV3(can.Listener, Actuator):
         self._connection_established = False
         self._reconnection_start_time = 0
         self.prev_command_time = 0
+        self._decoder = decoding.StatusReplyDecoder(self.data, self.invert)
         self.torque_monitor = RMSTorqueMonitor(limit=abs(self.data.rated_torque_limits[1]), window=20)
         self._over_limit = False
 
 
     def on_message_received(self, msg: can.Message) -> None:
         if msg.arbitration_id == ((0x29 << 8) | (self.can_id)):
-            pos, vel, cur, temp, err = _read_cubemars_message(msg)
-            self.data.current_position = pos * self.invert
-            self.data.current_velocity = vel * self.invert * self.data.erpm_to_rpm / DEGPERSEC2RPM * DEG2RAD
-            self.data.current_torque = cur
-            self.data.temperature = temp
-            self.data.error_code = err
-            self.data.timestamp = time.perf_counter()
+            if not self._decoder.decode(msg.arbitration_id, msg.data, can_receive_time(msg)): return
             rms_torque, _ = self.torque_monitor.update(self.data.current_torque)
             self.data.rms_torque = rms_torque
             self._over_limit = self.torque_monitor.over_limit()
             return
 
+    def _can_filters(self) -> list[dict]:
+        return [{'can_id': (0x29 << 8) | self.can_id, 'can_mask': 0x1FFFFFFF, 'extended': True}]
+
     def call_response_latency(self):
         return self.data.last_command_time - self.data.timestamp
     
@@ -231,7 +230,7 @@ class CubeMarsV3(can.Listener, Actuator):
         return self.data.current_velocity
     
     def get_temperature(self) -> float:
-        return self.data.temperature
+        return self.data.current_temperature
     
     def zero_encoder(self):
         msg = _create_set_origin_message(self.can_id)
@@ -265,8 +264,8 @@ class CubeMarsV3(can.Listener, Actuator):
         self._bus.send(msg)
 
 if __name__ == '__main__':
-    from epicallypowerful.actuation.actuator_group import _load_can_drivers
-    _load_can_drivers()
+    from epicallypowerful.toolbox.can_bus import bring_up_can_interface
+    bring_up_can_interface()
     can_id = 67
     motor_data = MotorData(can_id, 'AKE-60-8')
     msg = _create_mit_message(can_id, 0, 0, 2, 0.1, 0, motor_data)
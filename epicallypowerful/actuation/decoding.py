@@ -0,0 +1,152 @@
+"""epically-powerful module for decoding actuator replies.
+
+This module contains the decoders that turn the reply frames of each actuator
+protocol into the actuator's :py:class:`~epicallypowerful.actuation.motor_data.MotorData`.
+Each decoder precomputes the scale factors for its motor model once, and
+writes the decoded values straight into the state instead of building
+intermediate lists. Replies are decoded on the CAN receive thread for every
+frame, so the compiled versions of these decoders from the ``_decoding``
+extension are used when it is available, with the pure Python versions below
+(``_PyMITReplyDecoder`` etc.) as the fallback.
+"""
+
+import math
+import time
+
+from epicallypowerful.actuation.motor_data import MotorData
+import epicallypowerful.actuation.robstride.robstride_driver as rsd
+
+DEG2RAD = math.pi / 180.0
+DEGPERSEC2RPM = 1.0 / 6.0
+
+
+def _span_scale(limits: tuple, num_bits: int) -> tuple[float, float]:
+    return (limits[1] - limits[0]) / ((1 << num_bits) - 1), float(limits[0])
+
+
+class _PyMITReplyDecoder():
+    """Decodes the MIT mode replies of CubeMars actuators: a 16 bit position, and 12 bit velocity and torque, each scaled to the
+    motor model's limits. The first data byte is the ID of the replying motor.
+
+    Args:
+        data (MotorData): State to decode into. The scale factors are taken from its limits.
+        invert (int, optional): 1, or -1 to invert the position, velocity, and torque. Defaults to 1.
+    """
+    def __init__(self, data: MotorData, invert: int=1) -> None:
+        self.data = data
+        self.motor_id = data.motor_id
+        self.invert = invert
+        self.p_scale, self.p_offset = _span_scale(data.position_limits, 16)
+        self.v_scale, self.v_offset = _span_scale(data.velocity_limits, 12)
+        self.t_scale, self.t_offset = _span_scale(data.torque_limits, 12)
+
+    def decode(self, arbitration_id: int, payload: bytes, timestamp: float=-1.0) -> bool:
+        """Decodes a reply into the state, and stamps it with its receive time.
+
+        Args:
+            arbitration_id (int): Arbitration ID of the reply.
+            payload (bytes): Data bytes of the reply.
+            timestamp (float, optional): Receive time of the reply on the ``time.perf_counter()`` clock (see
+                :py:func:`~epicallypowerful.toolbox.timebase.can_receive_time`), or negative to use the current time. Defaults to -1.0.
+
+        Returns:
+            bool: True if the reply was from this motor and was decoded, False otherwise.
+        """
+        if len(payload) < 6 or payload[0] != self.motor_id: return False
+        data = self.data
+        invert = self.invert
+        data.current_position = ((payload[1] << 8 | payload[2]) * self.p_scale + self.p_offset) * invert
+        data.current_velocity = ((payload[3] << 4 | payload[4] >> 4) * self.v_scale + self.v_offset) * invert
+        data.current_torque = (((payload[4] & 0x0F) << 8 | payload[5]) * self.t_scale + self.t_offset) * invert
+        data.timestamp = timestamp if timestamp >= 0 else time.perf_counter()
+        return True
+
+
+class _PyStatusReplyDecoder():
+    """Decodes the periodic status replies of CubeMars actuators in servo mode, which the V3 firmware also sends in MIT mode:
+    signed 16 bit position [0.1 deg], speed [10 ERPM], and current [0.01 A], followed by the temperature and error code.
+
+    Args:
+        data (MotorData): State to decode into. The speed is converted to output velocity with its ``erpm_to_rpm``.
+        invert (int, optional): 1, or -1 to invert the position and velocity. Defaults to 1.
+    """
+    def __init__(self, data: MotorData, invert: int=1) -> None:
+        self.data = data
+        self.invert = invert
+        self.p_scale = 0.1 * DEG2RAD * invert
+        self.v_scale = 10 * invert * data.erpm_to_rpm / DEGPERSEC2RPM * DEG2RAD
+
+    def decode(self, arbitration_id: int, payload: bytes, timestamp: float=-1.0) -> bool:
+        """Decodes a reply into the state, and stamps it with its receive time.
+
+        Args:
+            arbitration_id (int): Arbitration ID of the reply.
+            payload (bytes): Data bytes of the reply.
+            timestamp (float, optional): Receive time of the reply on the ``time.perf_counter()`` clock (see
+                :py:func:`~epicallypowerful.toolbox.timebase.can_receive_time`), or negative to use the current time. Defaults to -1.0.
+
+        Returns:
+            bool: True if the reply was decoded, False if it was too short.
+        """
+        if len(payload) < 8: return False
+        data = self.data
+        data.current_position = int.from_bytes(payload[0:2], 'big', signed=True) * self.p_scale
+        data.current_velocity = int.from_bytes(payload[2:4], 'big', signed=True) * self.v_scale
+        data.current_torque = int.from_bytes(payload[4:6], 'big', signed=True) * 0.01
+        data.current_temperature = payload[6]
+        data.error_code = payload[7]
+        data.timestamp = timestamp if timestamp >= 0 else time.perf_counter()
+        return True
+
+
+class _PyRobstrideMotionDecoder():
+    """Decodes the motion replies of Robstride and CyberGear actuators: 16 bit position, velocity, and torque scaled to the motor
+    model's limits, and the temperature [0.1 C]. The arbitration ID carries the ID of the replying motor and its mode.
+
+    Args:
+        data (MotorData): State to decode into. The scale factors are taken from its motor type.
+        invert (int, optional): 1, or -1 to invert the position, velocity, and torque. Defaults to 1.
+    """
+    def __init__(self, data: MotorData, invert: int=1) -> None:
+        self.data = data
+        self.motor_id = data.motor_id
+        self.invert = invert
+        model = data.motor_type
+        self.p_scale, self.p_offset = _span_scale((rsd.P_MIN[model], rsd.P_MAX[model]), rsd.N_BITS)
+        self.v_scale, self.v_offset = _span_scale((rsd.V_MIN[model], rsd.V_MAX[model]), rsd.N_BITS)
+        self.t_scale, self.t_offset = _span_scale((rsd.T_MIN[model], rsd.T_MAX[model]), rsd.N_BITS)
+
+    def decode(self, arbitration_id: int, payload: bytes, timestamp: float=-1.0) -> bool:
+        """Decodes a reply into the state, and stamps it with its receive time.
+
+        Args:
+            arbitration_id (int): Arbitration ID of the reply.
+            payload (bytes): Data bytes of the reply.
+            timestamp (float, optional): Receive time of the reply on the ``time.perf_counter()`` clock (see
+                :py:func:`~epicallypowerful.toolbox.timebase.can_receive_time`), or negative to use the current time. Defaults to -1.0.
+
+        Returns:
+            bool: True if the reply was a motion reply from this motor and was decoded, False otherwise.
+        """
+        if ((arbitration_id >> 24) & 0x3F) != rsd.RESPONSE_MOTION or ((arbitration_id >> 8) & 0xFF) != self.motor_id: return False
+        if len(payload) < 8: return False
+        data = self.data
+        invert = self.invert
+        data.current_position = ((payload[0] << 8 | payload[1]) * self.p_scale + self.p_offset) * invert
+        data.current_velocity = ((payload[2] << 8 | payload[3]) * self.v_scale + self.v_offset) * invert
+        data.current_torque = ((payload[4] << 8 | payload[5]) * self.t_scale + self.t_offset) * invert
+        data.current_temperature = (payload[6] << 8 | payload[7]) / 10.0
+        data.motor_mode = (arbitration_id >> 22) & 0x3
+        data.timestamp = timestamp if timestamp >= 0 else time.perf_counter()
+        return True
+
+
+# The public names are bound to the compiled decoders when the extension is built, and to the Python versions otherwise
+try:
+    from epicallypowerful.actuation._decoding import MITReplyDecoder, StatusReplyDecoder, RobstrideMotionDecoder
+    COMPILED = True
+except ImportError:
+    MITReplyDecoder = _PyMITReplyDecoder
+    StatusReplyDecoder = _PyStatusReplyDecoder
+    RobstrideMotionDecoder = _PyRobstrideMotionDecoder
+    COMPILED = False
@@ -0,0 +1,404 @@
+"""epically-powerful module for running actuator CAN I/O in a dedicated process.
+
+This module contains the I/O process behind ``ActuatorGroup(..., io_process=True)``.
+The process owns the CAN bus and the receive thread, and can be pinned to an
+isolated CPU core with real-time scheduling, so that sending and decoding
+frames never waits for the GIL held by the control loop, logging, or other
+threads of the main process. The two processes only share memory and a pipe:
+
+- Frames sent by the actuators in the main process are written to a command
+  :py:class:`~epicallypowerful.toolbox.shared_state.SharedStateRing`, and the
+  I/O process is woken through the pipe to send them in order. If the I/O
+  process falls a full ring behind, sending fails instead of overwriting
+  frames it has not sent yet.
+- The I/O process decodes the replies and publishes the state of every actuator
+  to a state :py:class:`~epicallypowerful.toolbox.shared_state.SharedStateRing`
+  after each reply, from which the main process updates its
+  :py:class:`~epicallypowerful.actuation.motor_data.MotorData` when it is read.
+
+The I/O process is a new interpreter running this module, so it neither inherits
+the threads and locks of the main process nor imports the main script again. It
+builds its own copy of each actuator from its type, CAN ID, and inversion.
+"""
+
+import atexit
+import importlib
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+import numpy as np
+import can
+from can import CanOperationError
+from epicallypowerful.actuation.actuator_abc import Actuator
+from epicallypowerful.toolbox.can_bus import SharedCANBus
+from epicallypowerful.toolbox.shared_state import SharedStateRing, state_fields
+
+# State of each actuator published by the I/O process. over_limit is the actuator's torque monitor flag, the others are MotorData fields
+IO_STATE_ATTRIBUTES = (
+    'current_position', 'current_velocity', 'current_torque', 'current_temperature',
+    'motor_mode', 'error_code', 'rms_torque', 'timestamp', 'over_limit',
+)
+# Published after the actuators: frames the I/O process failed to send, and frames it has taken from the command ring
+IO_STATUS_FIELDS = ('io.send_errors', 'io.commands_sent')
+COMMAND_FIELDS = ('arbitration_id', 'is_extended_id', 'dlc') + tuple(f'data_{i}' for i in range(8))
+COMMAND_CAPACITY = 1024
+# Time in seconds a send waits for the I/O process to make room in a full command ring before failing
+COMMAND_FULL_TIMEOUT = 0.1
+
+_WAKE = b'w'
+_STOP = b's'
+_ring_ids = itertools.count()
+
+
+def _actuator_spec(actuator: Actuator) -> dict:
+    if not hasattr(actuator, 'motor_type') or not hasattr(actuator, 'invert'):
+        raise ValueError(f'{type(actuator).__name__} actuators can not be run in an I/O process')
+    return {
+        'module': type(actuator).__module__,
+        'class': type(actuator).__qualname__,
+        'can_id': actuator.can_id,
+        'motor_type': actuator.motor_type,
+        'invert': actuator.invert == -1,
+        'torque_rms_window': actuator.torque_monitor.window if actuator.torque_monitor is not None else None,
+    }
+
+
+def _build_actuator(spec: dict) -> Actuator:
+    actuator_type = getattr(importlib.import_module(spec['module']), spec['class'])
+    actuator = actuator_type(spec['can_id'], spec['motor_type'], invert=spec['invert'])
+    if spec['torque_rms_window'] is not None and actuator.torque_monitor is not None:
+        actuator.torque_monitor.window = spec['torque_rms_window']
+    return actuator
+
+
+def _io_process_command(config: dict) -> list[str]:
+    """Returns the command line that starts the I/O process."""
+    return [sys.executable, '-m', 'epicallypowerful.actuation.io_process', json.dumps(config)]
+
+
+class _CommandBus():
+    """Stands in for the CAN bus of the actuators in the main process, writing the frames they send to the command ring and waking
+    the I/O process.
+
+    :meta private:
+    """
+    def __init__(self, io: 'ActuatorIOProcess') -> None:
+        self.io = io
+        self.channel_info = 'actuator I/O process'
+        self._row = np.zeros(len(COMMAND_FIELDS))
+        self._lock = threading.Lock() # the supervisor thread sends too, and the ring has a single writer
+
+    def send(self, msg: can.Message, timeout: Optional[float]=None) -> None:
+        io = self.io
+        with self._lock:
+            if io.commands.count - io.commands_sent >= COMMAND_CAPACITY - 1:
+                io._wait_for_room(COMMAND_FULL_TIMEOUT if timeout is None else timeout)
+            row = self._row
+            dlc = len(msg.data)
+            row[0] = msg.arbitration_id
+            row[1] = msg.is_extended_id
+            row[2] = dlc
+            row[3:3 + dlc] = msg.data
+            io.commands.publish(row)
+            io._wake()
+
+
+class _StatePublisher(can.Listener):
+    """Publishes the state of every actuator in the I/O process. It is subscribed after the actuators, so each reply is published
+    right after it is decoded.
+
+    :meta private:
+    """
+    def __init__(self, actuators: list[Actuator], ring: SharedStateRing) -> None:
+        super().__init__()
+        self.actuators = actuators
+        self.ring = ring
+        self.send_errors = 0
+        self.commands_sent = 0
+        self._row = np.zeros(len(ring.fields))
+        self._lock = threading.Lock()
+
+    def publish(self) -> None:
+        with self._lock:
+            row = self._row
+            i = 0
+            for actuator in self.actuators:
+                data = actuator.data
+                row[i:i + 9] = (
+                    data.current_position, data.current_velocity, data.current_torque, data.current_temperature,
+                    data.motor_mode, data.error_code, data.rms_torque, data.timestamp, actuator._over_limit,
+                )
+                i += 9
+            row[i] = self.send_errors
+            row[i + 1] = self.commands_sent
+            self.ring.publish(row)
+
+    def on_message_received(self, msg: can.Message) -> None:
+        self.publish()
+
+
+def _set_up_scheduling(cpu: Optional[int], priority: Optional[int]) -> None:
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (OSError, AttributeError) as e:
+            print(f'WARNING: Could not pin the actuator I/O process to CPU {cpu}: {e}', flush=True)
+    if priority is not None:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        except (OSError, AttributeError) as e:
+            print(f'WARNING: Could not give the actuator I/O process real-time priority {priority}: {e}. '
+                  'Run as root or grant CAP_SYS_NICE (e.g. an rtprio limit in /etc/security/limits.conf).', flush=True)
+
+
+def _send_commands(bus: can.BusABC, commands: SharedStateRing, count: int, publisher: _StatePublisher) -> int:
+    records, count = commands.read_since(count)
+    for values in records.tolist():
+        dlc = int(values[2])
+        msg = can.Message(arbitration_id=int(values[0]), is_extended_id=values[1] > 0.5, data=bytes(map(int, values[3:3 + dlc])))
+        try:
+            bus.send(msg)
+        except CanOperationError:
+            publisher.send_errors += 1
+    publisher.commands_sent = count
+    publisher.publish()
+    return count
+
+
+def _run_io_process(config: dict, wake_fd: int) -> None:
+    """Main function of the I/O process. Sleeps until the main process writes to the pipe ``wake_fd``, then sends the frames written
+    to the command ring since it last woke, until the main process asks it to stop. If the pipe is closed without a request to stop,
+    the main process has exited unexpectedly, and the actuators are disabled.
+
+    Args:
+        config (dict): Configuration from :py:class:`ActuatorIOProcess`.
+        wake_fd (int): Read end of the pipe from the main process.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Ctrl+C is handled by the main process, which still needs this process to disable the actuators
+    _set_up_scheduling(config['cpu'], config['priority'])
+    actuators = [_build_actuator(spec) for spec in config['actuators']]
+    can_args = config['can_args']
+    commands = SharedStateRing.attach(config['commands'])
+    shared_bus = SharedCANBus(
+        can_args['channel'], can_args['bustype'],
+        **{k: v for k, v in can_args.items() if k not in ('channel', 'bustype')},
+    )
+    bus = shared_bus.bus
+    # Created once the bus is open, which tells the main process that this process is ready
+    state = SharedStateRing.create(
+        config['state'], state_fields([actuator.can_id for actuator in actuators], IO_STATE_ATTRIBUTES) + list(IO_STATUS_FIELDS),
+    )
+    publisher = _StatePublisher(actuators, state)
+    filters = []
+    for actuator in actuators:
+        actuator._bus = bus
+        actuator_filters = actuator._can_filters()
+        shared_bus.subscribe(actuator, actuator_filters)
+        if filters is not None:
+            filters = None if actuator_filters is None else filters + actuator_filters
+    shared_bus.subscribe(publisher, filters)
+
+    count = commands.count
+    publisher.commands_sent = count
+    publisher.publish()
+    stopped = False
+    try:
+        while True:
+            wake = os.read(wake_fd, 4096)
+            count = _send_commands(bus, commands, count, publisher)
+            if not wake: break
+            if _STOP in wake:
+                stopped = True
+                break
+
+        if not stopped:
+            for actuator in actuators:
+                actuator._set_zero_torque()
+                actuator._disable()
+            time.sleep(0.05) # let the frames go out before the bus is shut down
+    finally:
+        shared_bus._shutdown()
+        commands.close()
+        state.close()
+        state.unlink()
+
+
+class ActuatorIOProcess():
+    """Runs the CAN I/O of a set of actuators in a dedicated process, and mirrors their state back into the actuators of the calling
+    process. These are created by :py:class:`~epicallypowerful.actuation.ActuatorGroup` with ``io_process=True`` rather than directly.
+
+    The state ring can also be opened by other processes, e.g. for logging, with
+    :py:meth:`SharedStateRing.attach(io.state.name) <epicallypowerful.toolbox.shared_state.SharedStateRing.attach>`. Its fields are
+    ``'<CAN ID>.<attribute>'`` for each attribute in ``IO_STATE_ATTRIBUTES``, followed by the number of frames the I/O process failed
+    to send, ``'io.send_errors'``, and the number of frames it has taken from the command ring, ``'io.commands_sent'``.
+
+    Args:
+        actuators (list[Actuator]): Actuators to run the I/O of. The I/O process builds its own copy of each from its type, CAN ID, motor type,
+            and inversion, and their ``_bus`` is replaced with one that forwards frames to the I/O process.
+        can_args (dict): Arguments for the :py:class:`can.Bus` opened by the I/O process, with ``channel`` and ``bustype``. They are passed
+            to the I/O process as JSON.
+        cpu (Optional[int], optional): CPU core to pin the I/O process to, ideally one isolated from the scheduler (e.g. with the
+            ``isolcpus`` kernel parameter). Defaults to None (not pinned).
+        priority (Optional[int], optional): ``SCHED_FIFO`` real-time priority (1-99) of the I/O process. This needs root or the
+            ``CAP_SYS_NICE`` capability. Defaults to None (normal scheduling).
+        start_timeout (float, optional): Maximum time in seconds to wait for the I/O process to open the bus. Defaults to 10.0.
+
+    Raises:
+        ValueError: If an actuator can not be built from its type, CAN ID, motor type, and inversion.
+        Exception: If the I/O process failed to open the bus.
+
+    Attributes:
+        commands (SharedStateRing): Ring of the frames sent by the actuators.
+        state (SharedStateRing): Ring of the actuator state published by the I/O process.
+        process (subprocess.Popen): The I/O process.
+        send_errors (int): Number of frames the I/O process failed to send, as of the last :py:meth:`sync`.
+        commands_sent (int): Number of frames the I/O process has taken from the command ring, as of the last :py:meth:`sync`.
+    """
+    def __init__(
+        self,
+        actuators: list[Actuator],
+        can_args: dict,
+        cpu: Optional[int]=None,
+        priority: Optional[int]=None,
+        start_timeout: float=10.0,
+    ) -> None:
+        self.actuators = list(actuators)
+        specs = [_actuator_spec(actuator) for actuator in self.actuators]
+        prefix = f'ep_io_{os.getpid()}_{next(_ring_ids)}'
+        self.commands = SharedStateRing.create(f'{prefix}_commands', COMMAND_FIELDS, COMMAND_CAPACITY)
+        self.state = None
+        self.send_errors = 0
+        self.commands_sent = 0
+        self._reported_send_errors = 0
+        self._synced_count = 0
+        self._record = None
+        self._sync_lock = threading.Lock()
+        self._stopped = False
+
+        config = {
+            'actuators': specs, 'can_args': can_args, 'cpu': cpu, 'priority': priority,
+            'commands': self.commands.name, 'state': f'{prefix}_state',
+        }
+        # The I/O process imports this package from the same place as this process, even if it is not installed
+        env = dict(os.environ)
+        package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, (package_root, env.get('PYTHONPATH'))))
+        read_fd, self._wake_fd = os.pipe()
+        try:
+            self.process = subprocess.Popen(_io_process_command(config), stdin=read_fd, env=env)
+        except Exception:
+            os.close(self._wake_fd)
+            self.commands.close()
+            self.commands.unlink()
+            raise
+        finally:
+            os.close(read_fd)
+        os.set_blocking(self._wake_fd, False)
+
+        deadline = time.perf_counter() + start_timeout
+        while self.state is None or self.state.count == 0:
+            if self.state is None:
+                try:
+                    self.state = SharedStateRing.attach(config['state'])
+                    self._record = np.empty(len(self.state.fields))
+                    continue
+                except FileNotFoundError:
+                    pass
+            if self.process.poll() is not None or time.perf_counter() >= deadline:
+                self.stop()
+                raise Exception(f'Actuator I/O process failed to open CAN channel {can_args["channel"]} (exit code {self.process.returncode})')
+            time.sleep(0.01)
+
+        self.bus = _CommandBus(self)
+        for actuator in self.actuators:
+            actuator._bus = self.bus
+        atexit.register(self.stop)
+        self.sync()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_fd, _WAKE)
+        except BlockingIOError:
+            pass # the pipe is full of wakeups the I/O process has yet to read
+        except OSError as e:
+            raise CanOperationError(f'Actuator I/O process is not running: {e}')
+
+    def _wait_for_room(self, timeout: float) -> None:
+        """Waits for the I/O process to take frames from a full command ring.
+
+        Raises:
+            CanOperationError: If the ring is still full after ``timeout`` seconds.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            self._update()
+            if self.commands.count - self.commands_sent < COMMAND_CAPACITY - 1: return
+            if self.process.poll() is not None:
+                raise CanOperationError(f'Actuator I/O process exited (exit code {self.process.returncode})')
+            if time.perf_counter() >= deadline:
+                raise CanOperationError(f'Actuator I/O process has not sent the last {COMMAND_CAPACITY - 1} frames within {timeout} s')
+            time.sleep(0.0005)
+
+    def _update(self) -> None:
+        state = self.state
+        if self._stopped or state is None or state.count == self._synced_count: return
+        with self._sync_lock:
+            record, count = state._read_latest(self._record, 100)
+            if record is None: return
+            self._synced_count = count
+            values = record.tolist()
+            i = 0
+            for actuator in self.actuators:
+                data = actuator.data
+                (data.current_position, data.current_velocity, data.current_torque, data.current_temperature,
+                    data.motor_mode, error_code, data.rms_torque, data.timestamp, over_limit) = values[i:i + 9]
+                data.error_code = int(error_code)
+                actuator._over_limit = over_limit > 0.5
+                i += 9
+            self.send_errors = int(values[i])
+            self.commands_sent = int(values[i + 1])
+
+    def sync(self) -> bool:
+        """Updates the state of the actuators from the most recent record published by the I/O process.
+
+        Returns:
+            bool: True if the I/O process failed to send frames since the previous call, False otherwise.
+        """
+        self._update()
+        failed = self.send_errors > self._reported_send_errors
+        self._reported_send_errors = self.send_errors
+        return failed
+
+    def stop(self, timeout: float=5.0) -> None:
+        """Stops the I/O process once it has sent the frames already written, and removes the shared memory.
+
+        Args:
+            timeout (float, optional): Maximum time in seconds to wait for the I/O process to exit before terminating it. Stopping its CAN receive thread can take up to a second. Defaults to 5.0.
+        """
+        if self._stopped: return
+        self._stopped = True
+        atexit.unregister(self.stop)
+        try:
+            os.set_blocking(self._wake_fd, True)
+            os.write(self._wake_fd, _STOP)
+        except OSError:
+            pass
+        os.close(self._wake_fd)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.terminate()
+            self.process.wait()
+        if self.state is not None: self.state.close()
+        self.commands.close()
+        self.commands.unlink()
+
+
+if __name__ == '__main__':
+    _run_io_process(json.loads(sys.argv[1]), sys.stdin.fileno())
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 
 """This list of parameters was last updated on: 26 February 2024
 Sites from which information was sourced:
@@ -248,7 +249,10 @@ def cybergears():
 def robstrides():
     return [motor_key for motor_key in MOTOR_PARAMS.keys() if MOTOR_PARAMS[motor_key]['super_type'] == 'Robstride']
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) are only available on Python 3.10+
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class MotorData:
     """Stores the most recent state of the current motor. This data is typically updated by a CAN Listener class.
 
@@ -282,7 +286,8 @@ class MotorData:
     rms_torque: float = 0
     rms_time_prev: float = 0
     motor_mode: float = 0
-    internal_params = {}
+    error_code: int = 0
+    internal_params: dict = field(default_factory=dict)
     erpm_to_rpm: float = None
 
     def __post_init__(self):
@@ -1,10 +1,11 @@
 import can
-import time
 from epicallypowerful.actuation.motor_data import MotorData
 from epicallypowerful.actuation.actuator_abc import Actuator
 from epicallypowerful.actuation.torque_monitor import RMSTorqueMonitor
 import math
 import epicallypowerful.actuation.robstride.robstride_driver as rsd
+import epicallypowerful.actuation.decoding as decoding
+from epicallypowerful.toolbox.timebase import can_receive_time
 
 RAD2DEG = 180.0 / math.pi
 DEG2RAD = math.pi / 180.0
@@ -53,6 +54,7 @@ class Robstride(can.Listener, Actuator):
             kp=0, kd=0, timestamp=-1,
             running_torque=(), rms_torque=0, rms_time_prev=0
         )
+        self._decoder = decoding.RobstrideMotionDecoder(self.data, self.invert)
         self.torque_monitor = RMSTorqueMonitor(limit=self.data.rated_torque_limits[1], window=20.0)
         self._over_limit = False
 
@@ -89,20 +91,17 @@ class Robstride(can.Listener, Actuator):
         if communication_type == rsd.RESPONSE_FAULT: return -1
 
         if communication_type == rsd.RESPONSE_MOTION:
-            pos, vel, trq, temp, can_id, motor_mode, cal_fault, hall_enc_fault, mag_enc_fault, overtemp_fault, overcurr_fault, undervolt_fault = rsd.parse_motion_response(msg, self.data.motor_type)
-            if can_id != self.can_id: return -1
-            self.data.current_position = pos * self.invert
-            self.data.current_velocity = vel * self.invert
-            self.data.current_torque = trq * self.invert
-            self.data.motor_mode = motor_mode
-            self.data.current_temperature = temp
-            self.data.timestamp = time.perf_counter()
+            if not self._decoder.decode(msg.arbitration_id, msg.data, can_receive_time(msg)): return -1
 
             rms_torque, over_limit = self.torque_monitor.update(self.data.current_torque)
             self.data.rms_torque = rms_torque
             self._over_limit = self.torque_monitor.over_limit()
         return
 
+    def _can_filters(self) -> list[dict]:
+        # Replies carry the motor's CAN ID in bits 8-15 of the extended ID
+        return [{'can_id': self.can_id << 8, 'can_mask': 0xFF00, 'extended': True}]
+
     def _ping_actuator(self) -> None:
         self._bus.send(rsd.create_read_device_id_message(self.can_id))
 
@@ -230,7 +229,7 @@ class Robstride(can.Listener, Actuator):
         Returns:
             float: The current temperature of the motor in degrees Celsius.
         """
-        return self.data.temperature
+        return self.data.current_temperature
 
     def _enable(self) -> None:
         """Enables the motor
@@ -1,4 +1,5 @@
 import can
+import struct
 
 MASTER_CAN_ID = 0
 
@@ -170,12 +171,13 @@ def parse_param_response(msg: can.Message) -> list:
     motor_id = (msg.arbitration_id & 0xFF00) >> 8
     param_index = (data[1] << 8) | data[0]
     num_param_bytes = PARAM_NUM_BYTES[param_index]
+    # Values are little-endian: uint8, int16, or float32 depending on the parameter
     if num_param_bytes == 1:
         return param_index, data[4], motor_id
     elif num_param_bytes == 2:
-        return param_index, int.from_bytes(data[4:6]), motor_id
+        return param_index, int.from_bytes(data[4:6], byteorder='little', signed=True), motor_id
     elif num_param_bytes == 4:
-        return param_index, int.from_bytes(data[4:]), motor_id
+        return param_index, struct.unpack('<f', bytes(data[4:8]))[0], motor_id
 
 def parse_motion_response(msg: can.Message, actuator_model) -> list:
     # Core information
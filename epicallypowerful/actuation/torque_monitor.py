@@ -2,7 +2,7 @@ import time
 import math
 from collections import deque
 
-class RMSTorqueMonitor:
+class _PyRMSTorqueMonitor:
     """Object allows for a real-time calculation of RMS torque over a sliding time window. This can be used
     to monitor if the measured torque exceeds a specified limit, per the Acutators specification.
 
@@ -44,7 +44,15 @@ class RMSTorqueMonitor:
         Returns:
             bool: True if the RMS torque is over the limit, False otherwise.
         """
+        if not self.vals: return False
         now = time.perf_counter()
         if (now - self.vals[0][1]) < (self.window*0.8): # Check for sufficient torque values in buffer
             return False
         return self.rms > self.limit
+
+
+# Bound to the compiled monitor when the extension is built, with the same interface as the Python version
+try:
+    from epicallypowerful.actuation._decoding import RMSTorqueMonitor
+except ImportError:
+    RMSTorqueMonitor = _PyRMSTorqueMonitor
@@ -1,9 +1,27 @@
-# Import Mangement for epicallypowerful sensing modules
-import epicallypowerful.sensing.imu_data
-import epicallypowerful.sensing.mpu9250.mpu9250_imu
-import epicallypowerful.sensing.microstrain.microstrain_imu
-import epicallypowerful.sensing.open_imu.open_imu
-from .imu_data import IMUData
-from .microstrain.microstrain_imu import MicroStrainIMUs
-from .mpu9250.mpu9250_imu import MPU9250IMUs
-from .open_imu.open_imu import OpenIMUs
\ No newline at end of file
+# Import Mangement for epicallypowerful sensing modules. Each IMU driver is
+# loaded on first access, so heavy dependencies (scipy, MSCL, smbus2) are
+# only imported for the IMUs actually in use.
+from typing import TYPE_CHECKING
+from epicallypowerful._lazy import attach_lazy_loader
+
+if TYPE_CHECKING:
+    from .imu_data import IMUData
+    from .microstrain.microstrain_imu import MicroStrainIMUs
+    from .mpu9250.mpu9250_imu import MPU9250IMUs
+    from .open_imu.open_imu import OpenIMUs
+    from .orientation import OrientationEstimator
+
+_LAZY_ATTRIBUTES = {
+    'IMUData': '.imu_data',
+    'MicroStrainIMUs': '.microstrain.microstrain_imu',
+    'MPU9250IMUs': '.mpu9250.mpu9250_imu',
+    'OpenIMUs': '.open_imu.open_imu',
+    'OrientationEstimator': '.orientation',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES.keys())
+
+__getattr__, __dir__ = attach_lazy_loader(
+    __name__, globals(), _LAZY_ATTRIBUTES,
+    submodules=['imu_abc', 'imu_data', 'microstrain', 'mpu9250', 'open_imu', 'orientation'],
+)
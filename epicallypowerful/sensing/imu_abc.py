@@ -1,7 +1,22 @@
+import math
+import time
 from abc import ABC, abstractmethod
+from dataclasses import replace
+from typing import Callable
+import numpy as np
 from epicallypowerful.sensing.imu_data import IMUData
+from epicallypowerful.sensing.orientation import average_quaternions
+from epicallypowerful.toolbox.events import FreshStateTrigger
+
+# Largest angle [rad] between a sample's orientation and the average during `tare` before warning that the IMU moved
+TARE_MOTION_TOLERANCE = math.radians(5.0)
 
 class IMU(ABC):
+    """Base class for the IMU drivers. Implementations set `imu_ids`, and initialize `tare_quaternions` (identity) and
+    `gyro_biases` (zeros) for each IMU, which :py:meth:`tare` updates and the implementation applies when reading data.
+    Implementations that receive data in the background also initialize an empty `_data_triggers` list, and check each of its
+    triggers after publishing new data, to support :py:meth:`on_data`.
+    """
     @abstractmethod
     def get_data(self) -> IMUData:
         """Return data from call to IMU."""
@@ -10,4 +25,90 @@ class IMU(ABC):
     @abstractmethod
     def _set_up_connected_imus(self, imu_ids: list) -> None:
         """Initialize all IMUs."""
+        pass
+
+    def on_data(self, callback: Callable[[dict], None], imu_ids=None, worker: bool=False) -> FreshStateTrigger:
+        """Call a function as soon as every IMU in `imu_ids` has new data since the previous call, instead of polling :py:meth:`get_data`.
+        By default the function runs on the thread that received the data, so it should be short. See
+        :py:class:`~epicallypowerful.toolbox.events.FreshStateTrigger`.
+
+        Args:
+            callback (Callable[[dict], None]): function called with the raw IMUData of each IMU in `imu_ids`, by IMU ID.
+            imu_ids: list of IMU IDs to wait for. Default: None (all IMUs).
+            worker (bool): whether to call `callback` on a dedicated worker thread instead of the receiving thread. Default: False.
+
+        Returns:
+            FreshStateTrigger: the trigger calling `callback`. Call its `cancel()` method to stop.
+        """
+        if not hasattr(self, '_data_triggers'):
+            raise NotImplementedError(f"{type(self).__name__} reads data on demand, so new data is only available from get_data.")
+        imu_ids = list(self.imu_ids) if imu_ids is None else list(imu_ids)
+        trigger = FreshStateTrigger(imu_ids, self.get_data, callback, worker=worker, on_cancel=self._data_triggers.remove)
+        self._data_triggers.append(trigger)
+        return trigger
+
+    def tare(self, imu_id=None, zeroing_time: float=0.25) -> None:
+        """Tare IMUs from every sample they provide over a window, while they are held still. The average orientation
+        (quaternion average, see :py:func:`~epicallypowerful.sensing.orientation.average_quaternions`) becomes the reference
+        orientation in `tare_quaternions`, and the average angular velocity is added to the gyroscope bias in `gyro_biases`, which
+        is subtracted from subsequent gyroscope readings.
+
+        Args:
+            imu_id: IMU ID, or a list, set, tuple or dict of IMU IDs. Default: None (all IMUs).
+            zeroing_time (float): length of the window in seconds. Default: 0.25.
+        """
+        if imu_id is None:
+            imu_ids = list(self.imu_ids)
+        elif isinstance(imu_id, (list, set, tuple, dict)):
+            imu_ids = list(imu_id)
+        else:
+            imu_ids = [imu_id]
+
+        samples = self._collect_tare_samples(imu_ids, zeroing_time)
+
+        for imu_id in imu_ids:
+            if len(samples[imu_id]) == 0:
+                raise Exception(f"No data received from IMU {imu_id} while taring.")
+
+            quats = self._tare_orientations(samples[imu_id])
+            ref_quat = average_quaternions(quats)
+            max_deviation = 2 * math.acos(min(1.0, float(np.min(np.abs(quats @ ref_quat)))))
+            if max_deviation > TARE_MOTION_TOLERANCE:
+                print(f"WARNING: IMU {imu_id} moved by up to {math.degrees(max_deviation):.1f} deg while taring. Keep IMUs still while taring.")
+
+            gyro_mean = np.mean([(d.gyro_x, d.gyro_y, d.gyro_z) for d in samples[imu_id]], axis=0)
+            self.tare_quaternions[imu_id] = ref_quat
+            self.gyro_biases[imu_id] = tuple(float(b) for b in np.add(self.gyro_biases[imu_id], gyro_mean))
+            self._apply_tare(imu_id)
+
+    def _collect_tare_samples(self, imu_ids: list, duration: float) -> dict:
+        """Collect every new sample of each IMU for `duration` seconds by polling :py:meth:`get_data`.
+
+        Args:
+            imu_ids (list): IDs of the IMUs to collect samples from.
+            duration (float): time to collect samples for in seconds.
+
+        Returns:
+            samples (dict): list of IMUData samples for each IMU ID.
+        """
+        samples = {imu_id: [] for imu_id in imu_ids}
+        last_timestamps = {imu_id: None for imu_id in imu_ids}
+        t0 = time.perf_counter()
+
+        while time.perf_counter() - t0 < duration:
+            for imu_id in imu_ids:
+                imu_data = self.get_data(imu_id)
+                if imu_data.timestamp > 0 and imu_data.timestamp != last_timestamps[imu_id]:
+                    last_timestamps[imu_id] = imu_data.timestamp
+                    samples[imu_id].append(replace(imu_data)) # some IMUs update their IMUData in place
+            time.sleep(0.001)
+
+        return samples
+
+    def _tare_orientations(self, samples: list) -> np.ndarray:
+        """Orientations of tare samples as an n x 4 array of scalar-last quaternions."""
+        return np.array([(d.quat_x, d.quat_y, d.quat_z, d.quat_w) for d in samples])
+
+    def _apply_tare(self, imu_id) -> None:
+        """Apply the `tare_quaternions` and `gyro_biases` of an IMU to its read path, if it caches them."""
         pass
\ No newline at end of file
@@ -1,7 +1,14 @@
+import sys
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
 import numpy as np
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) are only available on Python 3.10+
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class IMUData:
     """Dataclass for IMU data. This includes fields for 
     measurements from both MicroStrain and MPU9250 units.
@@ -31,7 +38,7 @@ class IMUData:
     ref_m32: float = 0.0
     ref_m33: float = 0.0
 
-    # Orientation (Quaternion) [MICROSTRAIN ONLY]
+    # Orientation (Quaternion) [MICROSTRAIN, or MPU9250 & OPENIMU with an orientation filter]
     quat_x: float = 0.0
     quat_y: float = 0.0
     quat_z: float = 0.0
@@ -42,7 +49,7 @@ class IMUData:
     ef_quat_z: float = 0.0
     ef_quat_w: float = 1.0
 
-    # Orientation (Euler) [MICROSTRAIN ONLY]
+    # Orientation (Euler) [MICROSTRAIN, or MPU9250 & OPENIMU with an orientation filter]
     eul_x: float = 0.0
     eul_y: float = 0.0
     eul_z: float = 0.0
@@ -67,6 +74,26 @@ class IMUData:
 
     timestamp: float = 0.0
 
+    @property
+    def acc(self) -> np.ndarray:
+        """New array with a copy of the linear acceleration (acc_x, acc_y, acc_z). Writing into it does not change this IMUData."""
+        return np.array((self.acc_x, self.acc_y, self.acc_z))
+
+    @property
+    def gyro(self) -> np.ndarray:
+        """New array with a copy of the angular velocity (gyro_x, gyro_y, gyro_z). Writing into it does not change this IMUData."""
+        return np.array((self.gyro_x, self.gyro_y, self.gyro_z))
+
+    @property
+    def mag(self) -> np.ndarray:
+        """New array with a copy of the magnetometer reading (mag_x, mag_y, mag_z). Writing into it does not change this IMUData."""
+        return np.array((self.mag_x, self.mag_y, self.mag_z))
+
+    @property
+    def quat(self) -> np.ndarray:
+        """New array with a copy of the orientation quaternion (quat_x, quat_y, quat_z, quat_w). Writing into it does not change this IMUData."""
+        return np.array((self.quat_x, self.quat_y, self.quat_z, self.quat_w))
+
     @property
     def accelerometer(self):
         return [self.acc_x, self.acc_y, self.acc_z]
@@ -105,4 +132,55 @@ class IMUData:
             [self.ref_m11, self.ref_m12, self.ref_m13],
             [self.ref_m21, self.ref_m22, self.ref_m23],
             [self.ref_m31, self.ref_m32, self.ref_m33],
-        ])
\ No newline at end of file
+        ])
+
+
+# Shorthand names that expand to groups of IMUData fields in `imu_data_to_array`
+FIELD_GROUPS = {
+    'acc': ('acc_x', 'acc_y', 'acc_z'),
+    'gyro': ('gyro_x', 'gyro_y', 'gyro_z'),
+    'mag': ('mag_x', 'mag_y', 'mag_z'),
+    'quat': ('quat_x', 'quat_y', 'quat_z', 'quat_w'),
+    'ef_quat': ('ef_quat_x', 'ef_quat_y', 'ef_quat_z', 'ef_quat_w'),
+    'eul': ('eul_x', 'eul_y', 'eul_z'),
+    'rot_matrix': ('m11', 'm12', 'm13', 'm21', 'm22', 'm23', 'm31', 'm32', 'm33'),
+    'ref_rot_matrix': ('ref_m11', 'ref_m12', 'ref_m13', 'ref_m21', 'ref_m22', 'ref_m23', 'ref_m31', 'ref_m32', 'ref_m33'),
+}
+DEFAULT_ARRAY_FIELDS = ('acc', 'gyro', 'mag', 'quat', 'timestamp')
+
+
+@lru_cache(maxsize=32)
+def _fields_getter(fields: tuple) -> tuple:
+    """Expand field groups and build a single getter returning all requested fields of an IMUData as a tuple."""
+    expanded = tuple(chain.from_iterable(FIELD_GROUPS.get(f, (f,)) for f in fields))
+
+    for f in expanded:
+        if f not in IMUData.__dataclass_fields__:
+            raise ValueError(f"{f} is not an IMUData field or field group. Field groups are: {list(FIELD_GROUPS.keys())}")
+
+    if len(expanded) == 1:
+        return expanded, lambda data, _get=attrgetter(expanded[0]): (_get(data),)
+
+    return expanded, attrgetter(*expanded)
+
+
+def imu_data_to_array(
+    imu_data: list,
+    fields: tuple=DEFAULT_ARRAY_FIELDS,
+) -> np.ndarray:
+    """Pack the requested fields of several IMUData objects into a single (n_imus, n_fields) float array.
+
+    Args:
+        imu_data (list of IMUData): data for each IMU, one per row of the output.
+        fields (tuple of str): IMUData field names or field groups (`acc`, `gyro`, `mag`, `quat`, `ef_quat`, `eul`, `rot_matrix`, `ref_rot_matrix`) to include as columns, in order. Default: ('acc', 'gyro', 'mag', 'quat', 'timestamp').
+
+    Returns:
+        np.ndarray: (n_imus, n_fields) array of float64 values.
+    """
+    expanded, getter = _fields_getter(tuple(fields))
+    values = np.fromiter(
+        chain.from_iterable(map(getter, imu_data)),
+        dtype=np.float64,
+        count=len(imu_data) * len(expanded),
+    )
+    return values.reshape(len(imu_data), len(expanded))
@@ -5,13 +5,19 @@ and reading from Microstrain IMUs using the MSCL package.
 
 """
 
+import math
 import os
 import time
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import replace
+from typing import List, Optional
 import numpy as np
-from scipy.spatial.transform import Rotation as R
-from epicallypowerful.sensing.imu_data import IMUData
+from epicallypowerful.sensing.imu_data import IMUData, imu_data_to_array, DEFAULT_ARRAY_FIELDS
 from epicallypowerful.sensing.imu_abc import IMU
+from epicallypowerful.sensing.orientation import matrix_to_quat, quat_to_matrix
+from epicallypowerful.toolbox.diagnostics import RateLimitedReporter
+from epicallypowerful.toolbox.timebase import ClockMapper
 
 """Try to import mscl 
 (follow instructions from MSCL installation guide: 
@@ -42,6 +48,153 @@ IMU_RATE = 1000 # [Hz]
 G_CONSTANT = 9.80665 # [m*s^-2]
 PI = 3.1415926535897932384
 
+# Columns of the sample arrays returned by `MicroStrainIMUs.get_batch`
+BATCH_FIELDS = (
+    'timestamp', 'device_time',
+    'acc_x', 'acc_y', 'acc_z',
+    'gyro_x', 'gyro_y', 'gyro_z',
+    'mag_x', 'mag_y', 'mag_z',
+    'quat_x', 'quat_y', 'quat_z', 'quat_w',
+    'ef_quat_x', 'ef_quat_y', 'ef_quat_z', 'ef_quat_w',
+    'eul_x', 'eul_y', 'eul_z',
+    'm11', 'm12', 'm13', 'm21', 'm22', 'm23', 'm31', 'm32', 'm33',
+)
+_COLUMN = {name: column for column, name in enumerate(BATCH_FIELDS)}
+_IMU_DATA_COLUMNS = tuple((name, column) for name, column in _COLUMN.items() if name != 'device_time')
+_GYRO_COLUMNS = tuple(_COLUMN[name] for name in ('gyro_x', 'gyro_y', 'gyro_z'))
+
+
+def _columns(*names) -> tuple:
+    return tuple(_COLUMN[name] for name in names)
+
+
+def _scalar_writer(column: int, scale: float=1.0):
+    def write(data_point, row):
+        row[column] = data_point.as_double() * scale
+    return write
+
+
+def _vector_writer(columns: tuple):
+    def write(data_point, row):
+        vector = data_point.as_Vector()
+        for i, column in enumerate(columns):
+            row[column] = vector.as_floatAt(i)
+    return write
+
+
+def _matrix_writer(columns: tuple):
+    def write(data_point, row):
+        matrix = data_point.as_Matrix()
+        for i, column in enumerate(columns):
+            row[column] = matrix.as_floatAt(i // 3, i % 3)
+    return write
+
+
+def _skip(data_point, row):
+    pass
+
+
+def _channel_writer(data_field, data_qualifier):
+    """Get the function that writes a data point of an MSCL channel into a row with the columns of `BATCH_FIELDS`. This is
+    looked up once per packet layout, so decoding a packet does not branch on the channel of each data point.
+
+    Args:
+        data_field: MSCL channel field of the data point.
+        data_qualifier: MSCL channel qualifier of the data point.
+
+    Returns:
+        write: function taking the data point and the row, which does nothing for channels that are not stored.
+    """
+    types = mscl.MipTypes
+
+    if data_field == types.CH_FIELD_SENSOR_ORIENTATION_QUATERNION:
+        return _vector_writer(_columns('quat_w', 'quat_x', 'quat_y', 'quat_z'))
+    if data_field == types.CH_FIELD_ESTFILTER_ESTIMATED_ORIENT_QUATERNION:
+        return _vector_writer(_columns('ef_quat_w', 'ef_quat_x', 'ef_quat_y', 'ef_quat_z'))
+    if data_field == types.CH_FIELD_SENSOR_ORIENTATION_MATRIX:
+        return _matrix_writer(_columns('m11', 'm12', 'm13', 'm21', 'm22', 'm23', 'm31', 'm32', 'm33'))
+
+    if data_field == types.CH_FIELD_SENSOR_EULER_ANGLES:
+        names = {types.CH_ROLL: 'eul_x', types.CH_PITCH: 'eul_y', types.CH_YAW: 'eul_z'}
+    else:
+        prefix = {
+            types.CH_FIELD_SENSOR_SCALED_GYRO_VEC: 'gyro',
+            types.CH_FIELD_SENSOR_SCALED_ACCEL_VEC: 'acc',
+            types.CH_FIELD_SENSOR_SCALED_MAG_VEC: 'mag',
+        }.get(data_field)
+        if prefix is None:
+            return _skip
+        names = {types.CH_X: f'{prefix}_x', types.CH_Y: f'{prefix}_y', types.CH_Z: f'{prefix}_z'}
+
+    if data_qualifier not in names:
+        return _skip
+    scale = G_CONSTANT if data_field == types.CH_FIELD_SENSOR_SCALED_ACCEL_VEC else 1.0
+    return _scalar_writer(_COLUMN[names[data_qualifier]], scale)
+
+
+def _zeroed_orientation(ref_elements: tuple, imu_data: IMUData) -> tuple:
+    """Orientation of a sample relative to a reference, equal to `R.from_matrix(ref) * R.from_matrix(imu_data.rot_matrix.T)` but
+    computed with plain arithmetic, which is several times faster than building scipy Rotation objects for a single IMU.
+
+    Args:
+        ref_elements (tuple): elements of the IMU's reference rotation matrix, in row-major order.
+        imu_data (IMUData): sample with the raw rotation matrix.
+
+    Returns:
+        quaternion (tuple): zeroed orientation as a scalar-last quaternion, with a non-negative scalar part.
+        euler (tuple): zeroed orientation as extrinsic x-y-z (roll, pitch, yaw) Euler angles [rad].
+    """
+    r11, r12, r13, r21, r22, r23, r31, r32, r33 = ref_elements
+    m11, m12, m13 = imu_data.m11, imu_data.m12, imu_data.m13
+    m21, m22, m23 = imu_data.m21, imu_data.m22, imu_data.m23
+    m31, m32, m33 = imu_data.m31, imu_data.m32, imu_data.m33
+
+    # Zeroed rotation matrix z = ref @ rot_matrix.T
+    z11 = r11*m11 + r12*m12 + r13*m13
+    z12 = r11*m21 + r12*m22 + r13*m23
+    z13 = r11*m31 + r12*m32 + r13*m33
+    z21 = r21*m11 + r22*m12 + r23*m13
+    z22 = r21*m21 + r22*m22 + r23*m23
+    z23 = r21*m31 + r22*m32 + r23*m33
+    z31 = r31*m11 + r32*m12 + r33*m13
+    z32 = r31*m21 + r32*m22 + r33*m23
+    z33 = r31*m31 + r32*m32 + r33*m33
+
+    # Quaternion from the largest of the four candidate denominators, for numerical stability
+    trace = z11 + z22 + z33
+    if trace > 0:
+        s = 2.0 * math.sqrt(1.0 + trace)
+        x, y, z, w = (z32 - z23) / s, (z13 - z31) / s, (z21 - z12) / s, 0.25 * s
+    elif z11 > z22 and z11 > z33:
+        s = 2.0 * math.sqrt(1.0 + z11 - z22 - z33)
+        x, y, z, w = 0.25 * s, (z12 + z21) / s, (z13 + z31) / s, (z32 - z23) / s
+    elif z22 > z33:
+        s = 2.0 * math.sqrt(1.0 + z22 - z11 - z33)
+        x, y, z, w = (z12 + z21) / s, 0.25 * s, (z23 + z32) / s, (z13 - z31) / s
+    else:
+        s = 2.0 * math.sqrt(1.0 + z33 - z11 - z22)
+        x, y, z, w = (z13 + z31) / s, (z23 + z32) / s, 0.25 * s, (z21 - z12) / s
+    norm = math.sqrt(x*x + y*y + z*z + w*w)
+    if w < 0:
+        norm = -norm
+
+    euler = (
+        math.atan2(z32, z33),
+        math.asin(max(-1.0, min(1.0, -z31))),
+        math.atan2(z21, z11),
+    )
+    return (x / norm, y / norm, z / norm, w / norm), euler
+
+
+def _device_time(packet) -> float:
+    """Time of an MSCL packet according to the IMU in seconds, or the time MSCL collected it if the IMU does not report one."""
+    try:
+        if packet.hasDeviceTime():
+            return packet.deviceTimestamp().nanoseconds() * 1e-9
+    except AttributeError: # MSCL versions without device timestamps
+        pass
+    return packet.collectedTimestamp().nanoseconds() * 1e-9
+
 
 class MicroStrainIMUs(IMU):
     """Class for receiving data from MicroStrain IMUs. Getting data from each IMU is as simple as calling :py:meth:`get_data` with the respective serial identifier as the argument. The MicroStrain IMUs typically need no special configuration or calibration. The serial number used to identify the IMUs is typically found on top of the IMU, and is the last 6 digits following the period.
@@ -49,7 +202,9 @@ class MicroStrainIMUs(IMU):
     In order to use this functionality, the low-level MSCL drivers need to be installed. Please see the tutorials on installing this, or directly consult the MSCL documentation (https://github.com/LORD-MicroStrain/MSCL).
 
     Many helper functions are included in the :py:class:`IMUData` class to assist with getting data conveniently. Please see that documentation for all options.
-    
+
+    Packets are read from each IMU by its own background thread, which decodes every packet into a buffer of the last ``history_length`` samples. :py:meth:`get_data` returns the most recent sample without waiting, so reading several IMUs in a control loop does not add up their waits. Each sample's ``timestamp`` is the time it was sampled according to the IMU's clock, mapped onto the ``time.perf_counter()`` clock by a :py:class:`~epicallypowerful.toolbox.timebase.ClockMapper` (in ``clock_mappers``), so that samples read together are still evenly spaced. :py:meth:`get_batch` returns every sample received since its previous call as an array, to record the full IMU rate from a slower loop.
+
     Example:
         .. code-block:: python
 
@@ -81,8 +236,17 @@ class MicroStrainIMUs(IMU):
         imu_ids (list): dict of body segments and Microstrain serial numbers.
         rate (int): operational rate to set using internal MSCL library.
         tare_on_startup (bool): boolean for whether to automatically tare on startup. Default: False.
-        verbose (bool): boolean for whether to print out additional information. Default: False.
+        timeout (float): time in seconds that `get_data` waits for the first sample of an IMU, if none has been received yet. Default: 0.0002.
         num_retries (int): number of times to retry connecting to an IMU if it fails the first time. Default: 10.
+        verbose (bool): boolean for whether to print out additional information. Default: False.
+        history_length (int): number of recent samples kept for each IMU, see :py:meth:`get_history` and :py:meth:`get_batch`. Default: 1000.
+        poll_interval (float): time in seconds each reader thread sleeps when no packets are waiting. Default: 0.0002.
+        setup_timeout (float): time in seconds to wait for the IMUs to be configured, which happens concurrently for all IMUs. IMUs that take longer are disconnected and set up again in the next attempt. Default: 10.0.
+
+    Attributes:
+        dropped_samples (dict): number of samples of each IMU that were overwritten before :py:meth:`get_batch` returned them.
+        clock_mappers (dict): :py:class:`~epicallypowerful.toolbox.timebase.ClockMapper` of each IMU, with the estimated offset and drift of its clock.
+        setup_report (dict): outcome of the most recent attempt to set up each IMU, with its serial `port`, `status` ('ok', 'failed', 'timed out' or 'not found'), setup `time` in seconds, and `error` message.
     """
 
     def __init__(
@@ -92,32 +256,59 @@ class MicroStrainIMUs(IMU):
         tare_on_startup: bool=TARE_ON_STARTUP,
         timeout: float=0.0002,
         num_retries: int=10,
-        verbose: bool=False
+        verbose: bool=False,
+        history_length: int=1000,
+        poll_interval: float=0.0002,
+        setup_timeout: float=10.0,
     ) -> None:
         if not MSCL_AVAILABLE:
             raise ModuleNotFoundError("MSCL not found, please install MSCL to use the MicroStrain IMUs. Please see https://github.com/LORD-MicroStrain/MSCL or the included setup script, ep-install-mscl.")
-        
+
+        self.imu_ids = imu_ids
         self.verbose = verbose
         self.timeout = timeout
-        self._imu_ref_rot_matrices = {}
-        
+        self.poll_interval = poll_interval
+        self.setup_timeout = setup_timeout
+        self.setup_report = {}
+        self._ref_elements = {}
+        self.tare_quaternions = {imu_id: np.array([0.0, 0.0, 0.0, 1.0]) for imu_id in imu_ids}
+        self.gyro_biases = {imu_id: (0.0, 0.0, 0.0) for imu_id in imu_ids}
+        self._latest = {}
+        self._samples = {imu_id: np.zeros((history_length, len(BATCH_FIELDS))) for imu_id in imu_ids}
+        self._sample_counts = {imu_id: 0 for imu_id in imu_ids}
+        self._batch_counts = {imu_id: 0 for imu_id in imu_ids}
+        self.dropped_samples = {imu_id: 0 for imu_id in imu_ids}
+        self.clock_mappers = {imu_id: ClockMapper() for imu_id in imu_ids}
+        self._received = {imu_id: threading.Event() for imu_id in imu_ids}
+        self._readers = {}
+        self._data_triggers = []
+        self._stop_readers = threading.Event()
+        self._diagnostics = RateLimitedReporter()
+
         # Enable serial port access
         self._enable_ports()
 
-        # Attempt to connect to IMUs
+        # Attempt to connect to IMUs, retrying only the IMUs that could not be set up
+        self._imu_nodes = {}
+        pending = list(imu_ids)
         for i in range(num_retries):
             try:
-                self._imu_nodes = self._set_up_connected_imus(
-                    imu_ids=imu_ids,
+                imus = self._set_up_connected_imus(
+                    imu_ids=pending,
                     rate=rate
                 )
+                for imu_id in imus:
+                    self._set_reference(imu_id, np.eye(3))
+                self._imu_nodes.update(imus)
+                self._start_readers()
+
+                pending = [imu_id for imu_id in pending if imu_id not in self._imu_nodes]
+                if pending:
+                    raise Exception(f"IMUs not set up: {', '.join(pending)}")
 
-                # Set reference rotation matrices to identity or current rotation matrix
+                # Set reference rotation matrices to current rotation matrix
                 if tare_on_startup:
                     self.tare()
-                else:
-                    for imu_id in imu_ids:
-                        self._imu_ref_rot_matrices[imu_id] = R.from_matrix(np.eye(3))
                 break
 
             except Exception:
@@ -149,7 +340,9 @@ class MicroStrainIMUs(IMU):
 
 
     def _set_up_connected_imus(self, imu_ids: List[str], rate: int) -> dict:
-        """Set up connected IMUs and return a dictionary of MSCL Inertial Nodes
+        """Set up connected IMUs and return a dictionary of MSCL Inertial Nodes. Each IMU is connected to and configured by its own
+        worker thread, so that the serial round trips to different IMUs overlap. The outcome for each IMU is stored in `setup_report`,
+        and IMUs that failed or timed out are disconnected and left out of the returned dictionary.
 
         Args:
             imu_ids (list): list of MSCL Inertial Node IMU IDs to set up.
@@ -159,86 +352,104 @@ class MicroStrainIMUs(IMU):
             imus: Dictionary of MSCL Inertial Nodes with serial numbers as
                 keys, and nodes and dataclasses as a tuple pair.
         """
+        t0 = time.perf_counter()
 
-        # Create a dictionary of MSCL Inertial Nodes
+        # Find the serial port of each IMU to include
         devices = self._check_connected_imus()
-        imus = {}
+        serial_ports = {}
+        for serial_port, device_info in devices.items():
+            imu_id = device_info.serial().split(".")[1]
+            if imu_id in imu_ids:
+                serial_ports[imu_id] = serial_port
 
-        try:
-            # Iterate through IMU IDs detected by device
-            for serial_port, device_info in devices.items():
-                imu_id = device_info.serial().split(".")[1]
+        # Set up active data channels for each node
+        ahrs_channels = mscl.MipChannels()
+        for field in (
+            mscl.MipTypes.CH_FIELD_SENSOR_ORIENTATION_QUATERNION,
+            mscl.MipTypes.CH_FIELD_SENSOR_EULER_ANGLES,
+            mscl.MipTypes.CH_FIELD_SENSOR_SCALED_GYRO_VEC,
+            mscl.MipTypes.CH_FIELD_SENSOR_SCALED_ACCEL_VEC,
+            mscl.MipTypes.CH_FIELD_SENSOR_ORIENTATION_MATRIX,
+            mscl.MipTypes.CH_FIELD_SENSOR_SCALED_MAG_VEC,
+        ):
+            ahrs_channels.append(mscl.MipChannel(field, mscl.SampleRate.Hertz(rate)))
+
+        # Add estimation filter for orientation data with
+        # mscl.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ORIENT_QUATERNION
+        # in the mscl.MipTypes.CLASS_ESTFILTER channel fields
+
+        # Connect to and configure all IMUs at once, one worker per serial port
+        report = {
+            imu_id: {'port': serial_ports.get(imu_id), 'status': 'not found', 'time': 0.0, 'error': ''}
+            for imu_id in imu_ids
+        }
+        imus = {}
+        if serial_ports:
+            connections = {} # serial connection opened by each worker
+            abandoned = set() # IMUs that timed out, whose workers must not keep their connection
+            lock = threading.Lock()
+            pool = ThreadPoolExecutor(max_workers=len(serial_ports), thread_name_prefix="MicroStrainSetup")
+            futures = {
+                pool.submit(self._set_up_imu, imu_id, serial_port, ahrs_channels, connections, abandoned, lock): imu_id
+                for imu_id, serial_port in serial_ports.items()
+            }
+            done, _ = wait(futures, timeout=self.setup_timeout)
+            pool.shutdown(wait=False, cancel_futures=True) # do not wait for IMUs that timed out
+
+            for future, imu_id in futures.items():
+                if future not in done:
+                    # Close the port so that the next attempt can open it, which also interrupts a worker waiting on the IMU
+                    with lock:
+                        abandoned.add(imu_id)
+                        connection = connections.get(imu_id)
+                    if connection is not None:
+                        try:
+                            connection.disconnect()
+                        except Exception:
+                            pass
+                    report[imu_id].update(status='timed out', time=self.setup_timeout)
+                elif future.exception() is not None:
+                    report[imu_id].update(status='failed', time=time.perf_counter() - t0, error=str(future.exception()))
+                else:
+                    node, setup_time = future.result()
+                    imus[imu_id] = (node, IMUData())
+                    report[imu_id].update(status='ok', time=setup_time)
 
-                # If IMU ID is in list of IMU IDs from config, include in dict
-                if imu_id in imu_ids:
-                    node = mscl.InertialNode(mscl.Connection.Serial(serial_port))
-                    node_data = IMUData()
-                    imus[imu_id] = (node, node_data)
+        self.setup_report.update(report)
+        self._print_setup_report(time.perf_counter() - t0)
+        return imus
 
-            if self.verbose:
-                print(f"Connected IMUs: {imus.keys()}")
 
-        except Exception:
-            print("Handling...")
-            print("Tip: check that you set all the serial numbers of the IMUs properly!")
+    def _set_up_imu(self, imu_id: str, serial_port: str, ahrs_channels, connections: dict, abandoned: set, lock: threading.Lock) -> tuple:
+        """Connect to and configure one IMU. Runs on a setup worker thread. The connection is added to `connections` so that it can be
+        closed if the setup times out, and closed by the worker itself if the setup timed out before it was opened.
 
-            for serial_port in devices.keys():
-                tmp_connection = mscl.Connection.Serial(serial_port)
-                tmp_connection.disconnect()
+        Args:
+            imu_id (str): serial number of the MSCL Inertial Node.
+            serial_port (str): serial port the IMU is connected to.
+            ahrs_channels (mscl.MipChannels): data channels to stream.
+            connections (dict): connection of each IMU being set up, shared by the workers.
+            abandoned (set): IMUs whose setup timed out.
+            lock (threading.Lock): lock guarding `connections` and `abandoned`.
 
-        # Set up active data channels for each node
-        ahrs_channels = mscl.MipChannels()
-        est_filter_channels = mscl.MipChannels()
+        Returns:
+            node_obj (mscl.InertialNode): configured and streaming MSCL Inertial Node.
+            setup_time (float): time in seconds it took to set up the IMU.
+        """
+        t0 = time.perf_counter()
+        connection = mscl.Connection.Serial(serial_port)
+        with lock:
+            if imu_id in abandoned:
+                connection.disconnect()
+                raise TimeoutError(f"setup of IMU {imu_id} timed out")
+            connections[imu_id] = connection
 
-        # Set data streams to collect
-        ahrs_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_SENSOR_ORIENTATION_QUATERNION,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
-        ahrs_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_SENSOR_EULER_ANGLES,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
-        ahrs_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_SENSOR_SCALED_GYRO_VEC,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
-        ahrs_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_SENSOR_SCALED_ACCEL_VEC,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
-        ahrs_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_SENSOR_ORIENTATION_MATRIX,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
-        ahrs_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_SENSOR_SCALED_MAG_VEC,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
-        est_filter_channels.append(
-            mscl.MipChannel(
-                mscl.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ORIENT_QUATERNION,
-                mscl.SampleRate.Hertz(rate)
-            )
-        )
+        try:
+            node_obj = mscl.InertialNode(connection)
 
-        for imu_id, imu_node in imus.items():
             # Check connectivity status
-            node_obj = imu_node[0]
             success = node_obj.ping()
-    
+
             if self.verbose:
                 print(f"{imu_id} works: {success}")
 
@@ -248,16 +459,7 @@ class MicroStrainIMUs(IMU):
                 mscl.MipTypes.CLASS_AHRS_IMU,
                 ahrs_channels
             )
-
-            # Add estimation filter for orientation data
-            # node_obj.setActiveChannelFields(
-            #     mscl.MipTypes.CLASS_ESTFILTER,
-            #     est_filter_channels
-            # )
-
             node_obj.enableDataStream(mscl.MipTypes.CLASS_AHRS_IMU)
-            # node_obj.enableDataStream(mscl.MipTypes.CLASS_ESTFILTER) # for estimation filter
-
             node_obj.resume()
 
             # Ensure that sensor is in local frame (not some ref. frame)
@@ -268,7 +470,7 @@ class MicroStrainIMUs(IMU):
             if self.verbose:
                 current_settings = node_obj.getComplementaryFilterSettings()
                 print(
-                    f"Previous complementary filter settings: {current_settings.upCompensationEnabled}, {current_settings.northCompensationEnabled}, {current_settings.upCompensationTimeInSeconds}, {current_settings.northCompensationTimeInSeconds}"
+                    f"{imu_id} previous complementary filter settings: {current_settings.upCompensationEnabled}, {current_settings.northCompensationEnabled}, {current_settings.upCompensationTimeInSeconds}, {current_settings.northCompensationTimeInSeconds}"
                 )
 
             # Set complementary filter parameters
@@ -282,135 +484,200 @@ class MicroStrainIMUs(IMU):
             if self.verbose:
                 current_settings = node_obj.getComplementaryFilterSettings()
                 print(
-                    f"Complementary filter settings: {current_settings.upCompensationEnabled}, {current_settings.northCompensationEnabled}, {current_settings.upCompensationTimeInSeconds}, {current_settings.northCompensationTimeInSeconds}"
+                    f"{imu_id} complementary filter settings: {current_settings.upCompensationEnabled}, {current_settings.northCompensationEnabled}, {current_settings.upCompensationTimeInSeconds}, {current_settings.northCompensationTimeInSeconds}"
                 )
                 print(
-                    f"(roll, pitch, yaw) tare settings: {node_obj.getSensorToVehicleRotation_eulerAngles().roll(), node_obj.getSensorToVehicleRotation_eulerAngles().pitch(), node_obj.getSensorToVehicleRotation_eulerAngles().yaw()}"
+                    f"{imu_id} (roll, pitch, yaw) tare settings: {node_obj.getSensorToVehicleRotation_eulerAngles().roll(), node_obj.getSensorToVehicleRotation_eulerAngles().pitch(), node_obj.getSensorToVehicleRotation_eulerAngles().yaw()}"
                 )
 
-        return imus
+        except Exception:
+            connection.disconnect()
+            raise
 
+        return node_obj, time.perf_counter() - t0
 
-    def get_data(self, imu_id: str, raw=True) -> IMUData:
-        """Get orientation, angular velocity and linear acceleration vector 
-        from MSCL Inertial Node.
+
+    def _print_setup_report(self, total_time: float) -> None:
+        """Print a summary of `setup_report`, listing the IMUs that could not be set up."""
+        n_ok = sum(1 for entry in self.setup_report.values() if entry['status'] == 'ok')
+        n_imus = len(self.setup_report)
+        if self.verbose or n_ok < n_imus:
+            print(f"Set up {n_ok} of {n_imus} MicroStrain IMUs in {total_time:.2f} s")
+
+        for imu_id, entry in self.setup_report.items():
+            if entry['status'] != 'ok':
+                print(f"WARNING: IMU {imu_id} {entry['status']}" + (f": {entry['error']}" if entry['error'] else ""))
+            elif self.verbose:
+                print(f"{imu_id} ({entry['port']}): set up in {entry['time']:.2f} s")
+
+        if any(entry['status'] == 'not found' for entry in self.setup_report.values()):
+            print("Tip: check that you set all the serial numbers of the IMUs properly!")
+
+
+    def _start_readers(self) -> None:
+        """Start a background thread reading packets from each connected IMU, unless it is already running."""
+        self._stop_readers.clear()
+        for imu_id in self._imu_nodes:
+            reader = self._readers.get(imu_id)
+            if reader is not None and reader.is_alive():
+                continue
+            reader = threading.Thread(target=self._read_packets, args=(imu_id,), name=f"MicroStrainReader-{imu_id}", daemon=True)
+            self._readers[imu_id] = reader
+            reader.start()
+
+
+    def _read_packets(self, imu_id: str) -> None:
+        """Reader thread. Decodes every packet of an MSCL Inertial Node into a row of its sample buffer, and publishes the most
+        recent sample as IMUData.
 
         Args:
-            imu_id (str): serial number relating to MSCL Inertial Node containing orientation, angular velocity and linear acceleration.
-            raw (bool): whether to provide IMU values relative to a zeroed (static) reference frame obtained by calling `self.tares()`. Default: True (providing raw values).
+            imu_id (str): serial number relating to MSCL Inertial Node to read from.
+        """
+        imu_node = self._imu_nodes[imu_id][0]
+        samples = self._samples[imu_id]
+        capacity = len(samples)
+        received = self._received[imu_id]
+        clock = self.clock_mappers[imu_id]
+        layouts = {} # writers for the data points of each packet layout, and whether it includes the gyroscope
+        gyro_field = mscl.MipTypes.CH_FIELD_SENSOR_SCALED_GYRO_VEC
+        gx, gy, gz = _GYRO_COLUMNS
+        row = [0.0] * len(BATCH_FIELDS)
+        row[_COLUMN["quat_w"]] = row[_COLUMN["ef_quat_w"]] = 1.0
+
+        while not self._stop_readers.is_set():
+            # Poll without blocking and sleep while there is nothing to read, so that the
+            # reader never holds the GIL while waiting inside MSCL
+            try:
+                packets = imu_node.getDataPackets(0)
+            except Exception as e: # e.g. the IMU was unplugged
+                self._diagnostics.report(f"IMU {imu_id} read error", f"WARNING: Could not read from IMU {imu_id}: {e}")
+                time.sleep(0.1)
+                continue
+
+            if not packets:
+                time.sleep(self.poll_interval)
+                continue
+
+            receive_time = time.perf_counter()
+            bias_x, bias_y, bias_z = self.gyro_biases[imu_id]
+            for packet in packets:
+                data_points = packet.data()
+                layout = (packet.descriptorSet(), len(data_points))
+                writers = layouts.get(layout)
+                if writers is None:
+                    writers = layouts[layout] = (
+                        [_channel_writer(p.field(), p.qualifier()) for p in data_points],
+                        any(p.field() == gyro_field for p in data_points),
+                    )
+
+                for write, data_point in zip(writers[0], data_points):
+                    write(data_point, row)
+                if writers[1]:
+                    row[gx] -= bias_x
+                    row[gy] -= bias_y
+                    row[gz] -= bias_z
+                row[1] = _device_time(packet)
+                row[0] = clock.update(row[1], receive_time)
+
+                n_samples = self._sample_counts[imu_id]
+                samples[n_samples % capacity] = row
+                self._sample_counts[imu_id] = n_samples + 1
+
+            self._latest[imu_id] = self._row_to_imu_data(row, self._ref_elements[imu_id])
+            received.set()
+            for trigger in self._data_triggers:
+                trigger.check()
+
+
+    def _row_to_imu_data(self, row, ref_elements: tuple) -> IMUData:
+        """Convert a sample buffer row to IMUData.
+
+        Args:
+            row (list or np.ndarray): sample with the columns of `BATCH_FIELDS`.
+            ref_elements (tuple): elements of the IMU's reference rotation matrix, in row-major order.
 
         Returns:
             imu_data: IMUData dataclass object with orientation, angular velocity and linear acceleration.
         """
-        # Pre-populate imu_data with values in buffer (in case no new values)
-        imu_node = self._imu_nodes[imu_id][0]
-        imu_data = self._imu_nodes[imu_id][1]
+        imu_data = IMUData(**{name: float(row[column]) for name, column in _IMU_DATA_COLUMNS})
 
-        # Check through mscl Inertial Node collected packets
-        packets = None
-        start = time.perf_counter()
+        # Store ref. orientation (rotation matrix)
+        (
+            imu_data.ref_m11,
+            imu_data.ref_m12,
+            imu_data.ref_m13,
+            imu_data.ref_m21,
+            imu_data.ref_m22,
+            imu_data.ref_m23,
+            imu_data.ref_m31,
+            imu_data.ref_m32,
+            imu_data.ref_m33,
+        ) = ref_elements
 
-        # Reduce dropout when reading in new IMU data
-        while not packets:
-            packets = imu_node.getDataPackets(0)
+        return imu_data
 
-            if time.perf_counter() - start > self.timeout:
-                break
-        
-        # If there is new data in packets, use it
-        if packets is not None and len(packets) > 0:
-            last_packet = packets[-1]
-            imu_data.timestamp = time.perf_counter()
-
-            for data_point in last_packet.data():
-                data_field = data_point.field()
-                data_qualifier = data_point.qualifier()
-
-                # TROUBLESHOOTING: check data qualifiers and channel IDs
-                # if self.verbose:
-                #     print(f"data_field: {data_field}, data_qualifier: {data_qualifier}, data_point.channelName(): {data_point.channelName()}")
-
-                if (
-                    data_field == mscl.MipTypes.CH_FIELD_SENSOR_ORIENTATION_QUATERNION
-                ): # ORIENTATION QUATERNION
-                    quat_vec = data_point.as_Vector()
-                    imu_data.quat_w = quat_vec.as_floatAt(0)
-                    imu_data.quat_x = quat_vec.as_floatAt(1)
-                    imu_data.quat_y = quat_vec.as_floatAt(2)
-                    imu_data.quat_z = quat_vec.as_floatAt(3)
-                elif (
-                    data_field == mscl.MipTypes.CH_FIELD_SENSOR_ORIENTATION_MATRIX
-                ): # ORIENTATION MATRIX
-                    rot_mat = data_point.as_Matrix()
-                    imu_data.m11 = rot_mat.as_floatAt(0, 0)
-                    imu_data.m12 = rot_mat.as_floatAt(0, 1)
-                    imu_data.m13 = rot_mat.as_floatAt(0, 2)
-                    imu_data.m21 = rot_mat.as_floatAt(1, 0)
-                    imu_data.m22 = rot_mat.as_floatAt(1, 1)
-                    imu_data.m23 = rot_mat.as_floatAt(1, 2)
-                    imu_data.m31 = rot_mat.as_floatAt(2, 0)
-                    imu_data.m32 = rot_mat.as_floatAt(2, 1)
-                    imu_data.m33 = rot_mat.as_floatAt(2, 2)
-                elif (
-                    data_field == mscl.MipTypes.CH_FIELD_ESTFILTER_ESTIMATED_ORIENT_QUATERNION
-                ): # EF QUATERNION
-                    ef_quat_vec = data_point.as_Vector()
-                    imu_data.ef_quat_w = ef_quat_vec.as_Vector().as_floatAt(0)
-                    imu_data.ef_quat_x = ef_quat_vec.as_Vector().as_floatAt(1)
-                    imu_data.ef_quat_y = ef_quat_vec.as_Vector().as_floatAt(2)
-                    imu_data.ef_quat_z = ef_quat_vec.as_Vector().as_floatAt(3)
-                elif (
-                    data_field == mscl.MipTypes.CH_FIELD_SENSOR_EULER_ANGLES
-                ): # EULER ORIENTATION (Computed)
-                    if data_qualifier == mscl.MipTypes.CH_ROLL:
-                        imu_data.eul_x = data_point.as_double() # roll
-                    elif data_qualifier == mscl.MipTypes.CH_PITCH:
-                        imu_data.eul_y = data_point.as_double() # pitch
-                    elif data_qualifier == mscl.MipTypes.CH_YAW:
-                        imu_data.eul_z = data_point.as_double() # yaw
-                elif (
-                data_field == mscl.MipTypes.CH_FIELD_SENSOR_SCALED_GYRO_VEC
-                ): # ANGULAR RATE (SCALED)
-                    if data_qualifier == mscl.MipTypes.CH_X:
-                        imu_data.gyro_x = data_point.as_double()
-                    elif data_qualifier == mscl.MipTypes.CH_Y:
-                        imu_data.gyro_y = data_point.as_double()
-                    elif data_qualifier == mscl.MipTypes.CH_Z:
-                        imu_data.gyro_z = data_point.as_double()
-                elif (data_field == mscl.MipTypes.CH_FIELD_SENSOR_SCALED_ACCEL_VEC
-                ): # LINEAR ACCELERATION (SCALED)
-                    if data_qualifier == mscl.MipTypes.CH_X:
-                        imu_data.acc_x = data_point.as_double() * G_CONSTANT
-                    elif data_qualifier == mscl.MipTypes.CH_Y:
-                        imu_data.acc_y = data_point.as_double() * G_CONSTANT
-                    elif data_qualifier == mscl.MipTypes.CH_Z:
-                        imu_data.acc_z = data_point.as_double() * G_CONSTANT
-                elif (
-                data_field == mscl.MipTypes.CH_FIELD_SENSOR_SCALED_MAG_VEC
-                ): # MAGNETOMETER (SCALED)
-                    if data_qualifier == mscl.MipTypes.CH_X:
-                        imu_data.mag_x = data_point.as_double()
-                    if data_qualifier == mscl.MipTypes.CH_Y:
-                        imu_data.mag_y = data_point.as_double()
-                    if data_qualifier == mscl.MipTypes.CH_Z:
-                        imu_data.mag_z = data_point.as_double()
+
+    def _copy_samples(self, imu_id: str, start: int, out: Optional[np.ndarray]=None) -> tuple:
+        """Copy the buffered samples of an IMU from a given sample count onwards, oldest first.
+
+        Args:
+            imu_id (str): serial number relating to MSCL Inertial Node.
+            start (int): number of samples received before the first one to copy.
+            out (np.ndarray): array to copy the samples into. At most `len(out)` samples are copied. Default: None (allocating a new array).
+
+        Returns:
+            samples (np.ndarray): (n_samples, len(BATCH_FIELDS)) array of the copied samples.
+            start (int): sample count of the first copied sample, later than requested if older samples were overwritten.
+        """
+        buffer = self._samples[imu_id]
+        capacity = len(buffer)
+        end = self._sample_counts[imu_id]
+
+        # The slot after the newest sample may be being overwritten, so at most capacity - 1 samples can be copied
+        start = max(start, end - capacity + 1)
+        n_samples = end - start
+        if out is None:
+            out = np.empty((n_samples, buffer.shape[1]))
+        n_samples = min(n_samples, len(out))
+
+        first = start % capacity
+        n_to_end = min(n_samples, capacity - first)
+        out[:n_to_end] = buffer[first:first + n_to_end]
+        out[n_to_end:n_samples] = buffer[:n_samples - n_to_end]
+        return out[:n_samples], start
+
+
+    def get_data(self, imu_id: str, raw=True) -> IMUData:
+        """Get the most recent orientation, angular velocity and linear acceleration
+        from MSCL Inertial Node. This does not wait for new packets, which are read by a background thread. Use the `timestamp` of the returned data to check how recent it is.
+
+        Args:
+            imu_id (str): serial number relating to MSCL Inertial Node containing orientation, angular velocity and linear acceleration.
+            raw (bool): whether to provide IMU values relative to a zeroed (static) reference frame obtained by calling `self.tare()`. Default: True (providing raw values).
+
+        Returns:
+            imu_data: IMUData dataclass object with orientation, angular velocity and linear acceleration. A new object is returned once new data has been received, and returned objects are not modified afterwards.
+
+        Raises:
+            Exception: if the IMU was not set up at startup.
+        """
+        imu_data = self._latest.get(imu_id)
+        if imu_data is None and imu_id not in self._imu_nodes:
+            raise Exception(f"IMU {imu_id} is not connected. Check `setup_report` for why it could not be set up.")
+
+        # Wait briefly for the first sample after startup
+        if imu_data is None:
+            self._received[imu_id].wait(self.timeout)
+            imu_data = self._latest.get(imu_id, self._imu_nodes[imu_id][1])
 
         # Convert quaternion and Euler readings to be with respect to static values
         if not raw:
-            # Get current rotation matrix and multiply it by inverse of
+            imu_data = replace(imu_data)
+            # Multiply the current rotation matrix by the inverse of the
             # rotation matrix from zeroing for current IMU
-            rot_raw = R.from_matrix(imu_data.matrix.T)
-            rot_zeroed = self._imu_ref_rot_matrices[imu_id] * rot_raw
-
-            # Convert orientation (quaternions)
-            imu_data.quat_x, imu_data.quat_y, imu_data.quat_z, imu_data.quat_w = (
-                rot_zeroed.as_quat()
-            )
-
-            # Convert orientation (Euler angles)
-            imu_data.eul_x, imu_data.eul_y, imu_data.eul_z = list(
-                rot_zeroed.as_euler("xyz", degrees=False)
-            )
+            quat, euler = _zeroed_orientation(self._ref_elements[imu_id], imu_data)
+            imu_data.quat_x, imu_data.quat_y, imu_data.quat_z, imu_data.quat_w = quat
+            imu_data.eul_x, imu_data.eul_y, imu_data.eul_z = euler
 
             ######## NOTE: ROTATION MATRIX NOT CONVERTED ########
             # USING THE `raw=False` OPTION DOES NOT CONVERT
@@ -420,50 +687,109 @@ class MicroStrainIMUs(IMU):
             # ROTATION MATRIX CAN STILL BE COMPUTED AFTERWARDS.
             #####################################################
 
-        # Store ref. orientation (rotation matrix)
-        converted_elements = []
+        return imu_data
 
-        for elem in list(self._imu_ref_rot_matrices[imu_id].as_matrix()):
-            for el in elem:
-                converted_elements.append(el)
 
-        (
-            imu_data.ref_m11,
-            imu_data.ref_m12,
-            imu_data.ref_m13,
-            imu_data.ref_m21,
-            imu_data.ref_m22,
-            imu_data.ref_m23,
-            imu_data.ref_m31,
-            imu_data.ref_m32,
-            imu_data.ref_m33,
-        ) = converted_elements
+    def get_history(self, imu_id: str, since: Optional[float]=None) -> List[IMUData]:
+        """Get the recent samples of an IMU, oldest first, e.g. to process every sample received since the last control loop iteration.
 
-        self._imu_nodes[imu_id] = (imu_node, imu_data)
+        Args:
+            imu_id (str): serial number relating to MSCL Inertial Node.
+            since (float): only return samples with a `timestamp` after this `time.perf_counter()` time. Default: None (returning all kept samples).
 
-        return imu_data
+        Returns:
+            samples (list): IMUData dataclass objects, fewer than `history_length` of them.
+        """
+        rows, _ = self._copy_samples(imu_id, 0)
+        if since is not None:
+            rows = rows[rows[:, 0] > since]
+
+        ref_elements = self._ref_elements[imu_id]
+        return [self._row_to_imu_data(row, ref_elements) for row in rows]
 
 
-    def tare(self, imu_id=None, zeroing_time=0.25) -> None:
-        """Manually tare MSCL Inertial Nodes.
+    def get_batch(self, imu_id: str, out: Optional[np.ndarray]=None) -> np.ndarray:
+        """Get every sample of an IMU received since the previous call, one row per sample with the columns of `BATCH_FIELDS`.
+        This gives the full IMU rate regardless of how often it is called, as long as it is called before `history_length` samples arrive.
 
         Args:
-            imu_id (str): MSCL Inertial Node, or a list, set, tuple or dict of MSCL Inertial Nodes.
-            zeroing_time (float): time to get current raw rotation matrix.
+            imu_id (str): serial number relating to MSCL Inertial Node.
+            out (np.ndarray): preallocated (n, len(BATCH_FIELDS)) float64 array to copy the samples into, to avoid allocating one per call.
+                Samples that do not fit are returned by the next call. Default: None (allocating a new array).
+
+        Returns:
+            samples (np.ndarray): (n_samples, len(BATCH_FIELDS)) array, oldest first, which is a view of `out` if it was given. The
+                `device_time` column is the time of each sample according to the IMU in seconds, and the `timestamp` column the same
+                time mapped onto the `time.perf_counter()` clock.
+        """
+        requested = self._batch_counts[imu_id]
+        samples, start = self._copy_samples(imu_id, requested, out)
+        self.dropped_samples[imu_id] += start - requested
+        self._batch_counts[imu_id] = start + len(samples)
+        return samples
+
+
+    def get_all_array(
+        self,
+        fields: tuple=DEFAULT_ARRAY_FIELDS,
+        raw: bool=True,
+    ) -> np.ndarray:
+        """Get a snapshot of all IMUs as a single array, with one row per IMU (in the order of `imu_ids`) and one column per field.
+
+        Args:
+            fields (tuple of str): IMUData field names or field groups (`acc`, `gyro`, `mag`, `quat`, `ef_quat`, `eul`, `rot_matrix`, `ref_rot_matrix`) to include as columns, in order. Default: ('acc', 'gyro', 'mag', 'quat', 'timestamp').
+            raw (bool): whether to provide IMU values relative to a zeroed (static) reference frame obtained by calling `self.tare()`. Default: True (providing raw values).
+
+        Returns:
+            np.ndarray: (n_imus, n_fields) array of IMU data.
+        """
+        return imu_data_to_array([self.get_data(imu_id, raw=raw) for imu_id in self.imu_ids], fields)
+
+
+    def _collect_tare_samples(self, imu_ids: list, duration: float) -> dict:
+        """Collect every sample the reader threads receive from each IMU over `duration` seconds.
+
+        Args:
+            imu_ids (list): serial numbers of the MSCL Inertial Nodes to collect samples from.
+            duration (float): time to collect samples for in seconds, which should be shorter than `history_length` samples.
+
+        Returns:
+            samples (dict): list of IMUData samples for each serial number.
         """
         t0 = time.perf_counter()
+        time.sleep(duration)
+        return {imu_id: self.get_history(imu_id, since=t0) for imu_id in imu_ids}
+
+
+    def _tare_orientations(self, samples: list) -> np.ndarray:
+        """Raw orientations of tare samples as scalar-last quaternions, from their rotation matrices."""
+        return matrix_to_quat(np.array([imu_data.rot_matrix for imu_data in samples]))
+
+
+    def _apply_tare(self, imu_id: str) -> None:
+        """Use the averaged tare orientation of an IMU as its reference rotation matrix."""
+        self._set_reference(imu_id, quat_to_matrix(self.tare_quaternions[imu_id]))
+
+
+    def _set_reference(self, imu_id: str, ref_matrix: np.ndarray) -> None:
+        """Set the reference rotation of an IMU, applied to its data when `raw=False` and stored in the `ref_m` fields of each new sample.
+        It is cached as a plain tuple, so zeroing a sample needs no conversions.
+
+        Args:
+            imu_id (str): serial number relating to MSCL Inertial Node.
+            ref_matrix (np.ndarray): 3x3 inverse of the IMU's orientation in the reference frame. Since the raw orientation is the
+                transpose of the IMU's rotation matrix, this is the rotation matrix of the IMU in its reference pose.
+        """
+        self._ref_elements[imu_id] = tuple(float(el) for el in np.asarray(ref_matrix).flat)
+
+
+    def close(self) -> None:
+        """Stop the background threads reading from the IMUs."""
+        self._stop_readers.set()
+        for reader in self._readers.values():
+            reader.join()
+        self._readers.clear()
 
-        while time.perf_counter() - t0 < zeroing_time:
-            if imu_id is None:
-                for imu_id, imu_node in self._imu_nodes.items():
-                    self._imu_ref_rot_matrices[imu_id] = R.from_matrix(
-                        self.get_data(imu_id, raw=True).rot_matrix.T
-                    ).inv()
-
-            else:
-                self._imu_ref_rot_matrices[imu_id] = R.from_matrix(
-                    self.get_data(imu_id, raw=True).rot_matrix.T
-                ).inv()
 
     def __getitem__(self, index: str) -> IMUData:
         return self.get_data(index)
@@ -15,7 +15,6 @@ import json
 from typing import Dict
 import numpy as np
 from numpy.typing import NDArray
-from scipy.optimize import curve_fit
 import smbus2 as smbus # I2C bus library on Raspberry Pi and NVIDIA Jetson Orin Nano
 from epicallypowerful.toolbox import LoopTimer
 from epicallypowerful.sensing.mpu9250.mpu9250_imu import MPU9250IMUs
@@ -36,78 +35,126 @@ else:
 G = 9.80665 # [m*s^-2]
 
 
-def get_linear_output(
-    data: NDArray[np.float64],
-    m: float,
-    b: float,
-) -> NDArray[np.float64]:
-    return (data * m) + b
+def fit_ellipsoid(
+    samples: NDArray[np.float64],
+    target_norm: float=None,
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """Fit an ellipsoid to 3-axis sensor samples and return the correction that maps it onto a sphere.
 
+    The general quadric ``a*x^2 + b*y^2 + c*z^2 + 2d*xy + 2e*xz + 2f*yz + 2g*x + 2h*y + 2i*z = 1``
+    is solved with a single linear least squares over all samples. The corrected reading is then
+    ``matrix @ (raw - bias)``, which removes offsets (hard iron), per-axis scale errors, and
+    cross-axis misalignment (soft iron) at the same time.
 
-def remove_outliers(
-    data: NDArray[np.float64],
-    std_scaler: float,
-) -> NDArray[np.float64]:
-    inlier_data = data
-    data_diff = np.append(
-        np.zeros(1),
-        np.diff(data),
-    )
+    Args:
+        samples (NDArray): n x 3 array of raw sensor readings collected across many orientations.
+        target_norm (float): radius of the sphere the samples are mapped onto (e.g., 9.80665 m*s^-2 for an accelerometer). If None, the volume of the fitted ellipsoid is preserved so readings stay in their native units. Default: None.
 
-    outlier_idxs = np.abs(data_diff) > np.abs(np.mean(data_diff)) + (std_scaler * np.std(data_diff))
-    inlier_data[outlier_idxs] = np.nan
+    Returns:
+        matrix (NDArray): 3 x 3 symmetric correction matrix.
+        bias (NDArray): 1 x 3 array with the center of the fitted ellipsoid.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    samples = samples[np.all(np.isfinite(samples), axis=1)]
 
-    return inlier_data
+    if samples.shape[0] < 9:
+        raise ValueError(f"At least 9 samples are needed for an ellipsoid fit, got {samples.shape[0]}.")
 
+    x, y, z = samples[:, 0], samples[:, 1], samples[:, 2]
+    design = np.column_stack((x*x, y*y, z*z, 2*x*y, 2*x*z, 2*y*z, 2*x, 2*y, 2*z))
+    v, _, _, _ = np.linalg.lstsq(design, np.ones(samples.shape[0]), rcond=None)
 
-def calibrate_accelerometer(
+    quadric = np.array([
+        [v[0], v[3], v[4]],
+        [v[3], v[1], v[5]],
+        [v[4], v[5], v[2]],
+    ])
+    bias = -np.linalg.solve(quadric, v[6:9])
+
+    # Shift the quadric to the ellipsoid center: (raw - bias)^T Q (raw - bias) = 1
+    quadric = quadric / (1.0 + bias @ quadric @ bias)
+    eigvals, eigvecs = np.linalg.eigh(quadric)
+
+    if np.any(eigvals <= 0):
+        raise ValueError("Samples do not describe an ellipsoid. Collect data across more orientations and try again.")
+
+    matrix = eigvecs @ np.diag(np.sqrt(eigvals)) @ eigvecs.T
+
+    if target_norm is None:
+        target_norm = np.prod(eigvals) ** (-1.0/6.0) # Geometric mean of the ellipsoid radii
+
+    return matrix * target_norm, bias
+
+
+def collect_samples(
     imu_handler: MPU9250IMUs,
     loop_timer: LoopTimer,
+    component: str,
     time_to_calibrate: float=2.5,
-    verbose: bool=False,
-) -> list[list[float]]:
-    acc_offset_coeffs = [[], [], []]
-    directions_to_calibrate = ['face-up', 'face-down', 'perpendicular to gravity']
-    axes_to_calibrate = ['x', 'y', 'z']
+) -> NDArray[np.float64]:
+    """Collect raw 3-axis samples of one IMU component for a fixed amount of time.
 
-    for a, axis_to_cal in enumerate(axes_to_calibrate):
-        axis_offsets = [[], [], []]
+    Args:
+        imu_handler (MPU9250IMUs): IMU handler with the IMU to calibrate at index 0.
+        loop_timer (LoopTimer): loop timer setting the sampling rate.
+        component (str): IMU component to sample. Could be `acc`, `gyro`, or `mag`.
+        time_to_calibrate (float): time to collect samples [s]. Default: 2.5.
 
-        for d, dir_to_cal in enumerate(directions_to_calibrate):
-            input(f"Hold IMU accelerometer {axis_to_cal} axis {dir_to_cal}, then press [ENTER]...")
-            acc_data = []
-            t_start = time.perf_counter()
+    Returns:
+        samples (NDArray): n x 3 array of samples.
+    """
+    samples = []
+    t_start = time.perf_counter()
 
-            while time.perf_counter() - t_start <= time_to_calibrate:
-                if loop_timer.continue_loop():
-                    imu_data = imu_handler.get_data(imu_id=0)
-                    acc_data.append([imu_data.accx, imu_data.accy, imu_data.accz])
+    while time.perf_counter() - t_start <= time_to_calibrate:
+        if loop_timer.continue_loop():
+            imu_data = imu_handler.get_data(imu_id=0)
+            samples.append((
+                getattr(imu_data, f"{component}_x"),
+                getattr(imu_data, f"{component}_y"),
+                getattr(imu_data, f"{component}_z"),
+            ))
 
-                    # Show progress of calibration
-                    print(f"Calibrating: {round(((time.perf_counter() - t_start)/time_to_calibrate) * 100)}%\r", end="")
+            # Show progress of calibration
+            print(f"Calibrating: {round(((time.perf_counter() - t_start)/time_to_calibrate) * 100)}%\r", end="")
+
+    print("")
+
+    return np.array(samples, dtype=np.float64)
 
 
-            axis_offsets[d] = np.array(acc_data)[:, a]
+def calibrate_accelerometer(
+    imu_handler: MPU9250IMUs,
+    loop_timer: LoopTimer,
+    time_to_calibrate: float=2.5,
+    verbose: bool=False,
+) -> dict[str, list]:
+    """Calibrate the accelerometer with an ellipsoid fit. The IMU is held still in 
+    each of its six face-up/face-down poses, then slowly tumbled through as many 
+    orientations as possible to constrain the cross-axis terms.
 
-        optimized_params, _ = curve_fit(
-            f=get_linear_output,
-            xdata=np.array(axis_offsets).flatten(),
-            ydata=np.concatenate([
-                np.ones(np.shape(axis_offsets[0])) * G,  # +9.81 m*s^-2
-                -np.ones(np.shape(axis_offsets[1])) * G, # -9.81 m*s^-2
-                np.zeros(np.shape(axis_offsets[2])) * G, # 0 g
-            ]),
-            maxfev=10000,
-        )
+    Returns:
+        acc_coeffs (dict): 3 x 3 `matrix` and 1 x 3 `bias`, applied as matrix @ (raw - bias).
+    """
+    acc_data = []
+    directions_to_calibrate = ['face-up', 'face-down']
+    axes_to_calibrate = ['x', 'y', 'z']
 
-        acc_offset_coeffs[a] = optimized_params.tolist()
+    for axis_to_cal in axes_to_calibrate:
+        for dir_to_cal in directions_to_calibrate:
+            input(f"Hold IMU accelerometer {axis_to_cal} axis {dir_to_cal}, then press [ENTER]...")
+            acc_data.append(collect_samples(imu_handler, loop_timer, 'acc', time_to_calibrate))
 
+    input("Slowly rotate the IMU through as many orientations as possible, then press [ENTER] and keep rotating...")
+    acc_data.append(collect_samples(imu_handler, loop_timer, 'acc', 4*time_to_calibrate))
+
+    matrix, bias = fit_ellipsoid(np.concatenate(acc_data), target_norm=G)
+    acc_coeffs = {'matrix': matrix.tolist(), 'bias': bias.tolist()}
 
     if verbose:
-        # print(f"acc_offset_coeffs: {[acc:0.2f for acc in acc_offset_coeffs[0]]}")
-        print(f"Calibration complete! acc_offset_coeffs: ({acc_offset_coeffs[0]}, {acc_offset_coeffs[1]}, {acc_offset_coeffs[2]})")
+        print(f"Calibration complete! acc_coeffs: {acc_coeffs}")
 
-    return acc_offset_coeffs
+    return acc_coeffs
 
 
 def calibrate_gyroscope(
@@ -123,7 +170,7 @@ def calibrate_gyroscope(
     while time.perf_counter() - t_start <= time_to_calibrate:
         if loop_timer.continue_loop():
             imu_data = imu_handler.get_data(imu_id=0)
-            gyro_data.append([imu_data.gyrox, imu_data.gyroy, imu_data.gyroz])
+            gyro_data.append([imu_data.gyro_x, imu_data.gyro_y, imu_data.gyro_z])
 
             # Show progress of calibration
             print(f"Calibrating: {round(((time.perf_counter() - t_start)/time_to_calibrate) * 100)}%\r", end="")
@@ -144,52 +191,22 @@ def calibrate_magnetometer(
     loop_timer: LoopTimer,
     time_to_calibrate: float=2.5,
     verbose: bool=False,
-) -> tuple[float]:
-    """.
+) -> dict[str, list]:
+    """Calibrate the magnetometer for hard- and soft-iron distortion with an ellipsoid fit.
 
+    NOTE: this has not been tested on hardware due to Linux kernel issues with the AK8963 I2C device on the MPU9250 IMU (https://forums.raspberrypi.com/viewtopic.php?t=388295).
 
     Returns:
-        mag_coeffs (array): 1 x 3 array 
+        mag_coeffs (dict): 3 x 3 `matrix` and 1 x 3 `bias`, applied as matrix @ (raw - bias).
     """
-    raise NotImplementedError("This function has not been tested due to Linux kernel issues with the AK8693 I2C device on the MPU9250 IMU (https://forums.raspberrypi.com/viewtopic.php?t=388295). This issue may be resolved in a future Linux release, at which point this code will be made functional again.")
-    
-    mag_coeffs = []
-    axis_offsets = [[], [], []]
-    axes_to_calibrate = ['x', 'y', 'z']
-
-    for a, axis_to_cal in enumerate(axes_to_calibrate):
-        input(f"Start rotating IMU about {axis_to_cal} axis, then press [ENTER] and keep rotating to calibrate...")
-        mag_data = []
-        t_start = time.perf_counter()
-
-        while time.perf_counter() - t_start <= time_to_calibrate:
-            if loop_timer.continue_loop():
-                imu_data = imu_handler.get_data(imu_id=0)
-                mag_data.append([imu_data.accx, imu_data.magy, imu_data.magz])
+    input("Start rotating IMU through as many orientations as possible, then press [ENTER] and keep rotating to calibrate...")
+    mag_data = collect_samples(imu_handler, loop_timer, 'mag', 8*time_to_calibrate)
 
-                # Show progress of calibration
-                print(f"Calibrating: {round(((time.perf_counter() - t_start)/time_to_calibrate) * 100)}%\r", end="")
-
-        off_axis_idxs = np.arange(len(axes_to_calibrate))
-        off_axis_data = np.array(mag_data)[:, off_axis_idxs != a] # m x 2 array for axes about which the IMU was not just rotated (e.g., if rotating about z axis, return x, y axis data)
-        offset_pair = []
-
-        for i in range(off_axis_data.shape[1]):
-            off_axis_data[:, i] = remove_outliers(
-                data=off_axis_data[:, i],
-                std_scaler=3,
-            )
-            offset_pair.append((np.nanmax(off_axis_data[:, i]) + np.nanmin(off_axis_data[:, i]))/2.0)
-
-        axis_offsets[a] = offset_pair
-    
-    # (x, y, z) = [[y, z], [x, z], [x, y]]
-    mag_coeffs[0] = (axis_offsets[1][0] + axis_offsets[2][0])/2 # x
-    mag_coeffs[1] = (axis_offsets[0][0] + axis_offsets[2][1])/2 # y
-    mag_coeffs[2] = (axis_offsets[0][1] + axis_offsets[1][1])/2 # z
+    matrix, bias = fit_ellipsoid(mag_data)
+    mag_coeffs = {'matrix': matrix.tolist(), 'bias': bias.tolist()}
 
     if verbose:
-        print(f"Magnetometer calibration complete! mag_coeffs: ({mag_coeffs[0]}, {mag_coeffs[1]}, {mag_coeffs[2]})")
+        print(f"Magnetometer calibration complete! mag_coeffs: {mag_coeffs}")
 
     return mag_coeffs
 
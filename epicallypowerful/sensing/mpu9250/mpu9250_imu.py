@@ -9,10 +9,12 @@ import sys
 import time
 import json
 from typing import Dict
+import numpy as np
 import smbus2 as smbus # I2C bus library on Raspberry Pi and NVIDIA Jetson Orin Nano
 from epicallypowerful.toolbox import LoopTimer
-from epicallypowerful.sensing.imu_data import IMUData
+from epicallypowerful.sensing.imu_data import IMUData, imu_data_to_array, DEFAULT_ARRAY_FIELDS
 from epicallypowerful.sensing.imu_abc import IMU
+from epicallypowerful.sensing.orientation import OrientationEstimator, quat_conjugate, quat_multiply, quat_to_euler
 
 # Unit conversions
 PI = 3.1415926535897932384
@@ -133,6 +135,7 @@ class MPU9250IMUs(IMU):
             2: +/- 1000.0 deg/s
             3: +/- 2000.0 deg/s
         calibration_path (str): path to JSON file with calibration values for IMUs to be connected. NOTE: this file indexes IMUs by which bus, multiplexer channel (if used), and I2C address they are connected to. Be careful not to use the calibration for one IMU connected in this way on another unit by mistake.
+        orientation_filter (str): orientation estimator to run over all IMUs with :py:meth:`update_orientation`. Could be `madgwick`, `mahony`, `complementary`, or None to skip orientation estimation. Default: None.
         verbose (bool): whether to print verbose output from IMU operation. Default: False.
     """
 
@@ -143,6 +146,7 @@ class MPU9250IMUs(IMU):
         acc_range_selector=ACC_RANGE_8G,
         gyro_range_selector=GYRO_RANGE_1000_DEG_PER_S,
         calibration_path='',
+        orientation_filter: str=None,
         verbose: bool=False,
     ) -> None:
         if imu_ids is None:
@@ -159,6 +163,9 @@ class MPU9250IMUs(IMU):
         self.bus = {}
         self.calibration_dict = {}
         self.prev_channel = -1
+        self.tare_quaternions = {imu_id: np.array([0.0, 0.0, 0.0, 1.0]) for imu_id in imu_ids.keys()}
+        self.gyro_biases = {imu_id: (0.0, 0.0, 0.0) for imu_id in imu_ids.keys()}
+        self._tare_inverses = np.tile([0.0, 0.0, 0.0, 1.0], (len(imu_ids), 1)) # inverse of each row of `tare_quaternions`, in the order of `imu_ids`
 
         # Look for existing calibrations for IMUs
         if len(calibration_path) > 0:
@@ -178,10 +185,68 @@ class MPU9250IMUs(IMU):
             if self.verbose:
                 print(f"No calibration path provided. Proceeding with raw values...")
 
+        self._calibrations = {
+            imu_id: self._parse_calibration(self.calibration_dict.get(
+                f"{imu_ids[imu_id]['bus']}_{imu_ids[imu_id]['channel']}_{imu_ids[imu_id]['address']}", {}
+            ))
+            for imu_id in imu_ids.keys()
+        }
+
+        # Set up vectorized orientation estimation across all IMUs
+        if orientation_filter is not None:
+            self.orientation_estimator = OrientationEstimator(
+                num_imus=len(imu_ids),
+                method=orientation_filter,
+                use_magnetometer=any([c for c in self.components if 'mag' in c]),
+            )
+        else:
+            self.orientation_estimator = None
+
         # Initialize all MPU9250 units
         self.imus, self.startup_config_vals = self._set_up_connected_imus(imu_ids=self.imu_ids)
 
 
+    def _parse_calibration(
+        self,
+        calibration: dict,
+    ) -> dict:
+        """Convert one IMU's entry from the calibration file into the affine form applied at read time (calibrated = matrix @ raw + offset).
+
+        Supports both the full 3x3 calibration (`{"matrix": [[...]], "bias": [...]}`, applied as matrix @ (raw - bias)) and the legacy 
+        per-axis formats (`acc`: [[slope, offset], ...], `mag`: [offset_x, offset_y, offset_z]).
+
+        Args:
+            calibration (dict): calibration entry for a single IMU.
+
+        Returns:
+            parsed (dict): `acc` and `mag` as (matrix, offset) tuples and `gyro` as an offset tuple, or None for each uncalibrated component.
+        """
+        parsed = {'acc': None, 'gyro': None, 'mag': None}
+
+        for component in ('acc', 'mag'):
+            coeffs = calibration.get(component, [])
+
+            if isinstance(coeffs, dict):
+                matrix = np.asarray(coeffs['matrix'], dtype=np.float64)
+                offset = -matrix @ np.asarray(coeffs['bias'], dtype=np.float64)
+            elif len(coeffs) > 0 and component == 'acc':
+                coeffs = np.asarray(coeffs, dtype=np.float64)
+                matrix = np.diag(coeffs[:, 0])
+                offset = coeffs[:, 1]
+            elif len(coeffs) > 0:
+                matrix = np.eye(3)
+                offset = -np.asarray(coeffs, dtype=np.float64)
+            else:
+                continue
+
+            parsed[component] = (matrix, offset)
+
+        if len(calibration.get('gyro', [])) > 0:
+            parsed['gyro'] = tuple(calibration['gyro'])
+
+        return parsed
+
+
     def _set_up_connected_imus(
         self,
         imu_ids: dict[int, dict[str, int]],
@@ -375,7 +440,7 @@ class MPU9250IMUs(IMU):
         bus = self.bus[self.imu_ids[imu_id]['bus']]
         channel = self.imu_ids[imu_id]['channel']
         address = self.imu_ids[imu_id]['address']
-        cal_id = f"{self.imu_ids[imu_id]['bus']}_{channel}_{address}"
+        calibration = self._calibrations[imu_id]
         
         # If using multiplexer, switch to proper channel
         if channel in range(0,8):
@@ -387,6 +452,8 @@ class MPU9250IMUs(IMU):
                 )
                 self.prev_channel = channel
 
+        read_start = time.perf_counter()
+
         # Get accelerometer and gyroscope data
         if any([c for c in self.components if (('acc' in c) or ('gyro' in c))]):
             (imu_data.acc_x,
@@ -403,27 +470,25 @@ class MPU9250IMUs(IMU):
                 address=address,
             )
 
-            # If calibrations exist for current IMU, apply them
-            if cal_id in self.calibration_dict.keys():
-                # Calibrate accelerometer readings using a linear fit
-                if len(self.calibration_dict[cal_id]["acc"]) > 0:
-                    m_x = self.calibration_dict[cal_id]["acc"][0][0] # slope
-                    b_x = self.calibration_dict[cal_id]["acc"][0][1] # offset
-                    imu_data.acc_x = m_x * (imu_data.acc_x) + b_x
-
-                    m_y = self.calibration_dict[cal_id]["acc"][1][0] # slope
-                    b_y = self.calibration_dict[cal_id]["acc"][1][1] # offset
-                    imu_data.acc_y = m_y * (imu_data.acc_y) + b_y
-
-                    m_z = self.calibration_dict[cal_id]["acc"][2][0] # slope
-                    b_z = self.calibration_dict[cal_id]["acc"][2][1] # offset
-                    imu_data.acc_z = m_z * (imu_data.acc_z) + b_z
-
-                # Calibrate gyroscope by subtracting an offset from each axis
-                if len(self.calibration_dict[cal_id]["gyro"]) > 0:
-                    imu_data.gyro_x = imu_data.gyro_x - self.calibration_dict[cal_id]["gyro"][0]
-                    imu_data.gyro_y = imu_data.gyro_y - self.calibration_dict[cal_id]["gyro"][1]
-                    imu_data.gyro_z = imu_data.gyro_z - self.calibration_dict[cal_id]["gyro"][2]
+            # Apply accelerometer calibration (matrix @ raw + offset)
+            if calibration['acc'] is not None:
+                matrix, offset = calibration['acc']
+                (imu_data.acc_x,
+                imu_data.acc_y,
+                imu_data.acc_z,
+                ) = (matrix @ (imu_data.acc_x, imu_data.acc_y, imu_data.acc_z) + offset).tolist()
+
+            # Calibrate gyroscope by subtracting an offset from each axis
+            if calibration['gyro'] is not None:
+                imu_data.gyro_x = imu_data.gyro_x - calibration['gyro'][0]
+                imu_data.gyro_y = imu_data.gyro_y - calibration['gyro'][1]
+                imu_data.gyro_z = imu_data.gyro_z - calibration['gyro'][2]
+
+            # Remove the gyroscope bias measured by `tare`
+            bias_x, bias_y, bias_z = self.gyro_biases[imu_id]
+            imu_data.gyro_x -= bias_x
+            imu_data.gyro_y -= bias_y
+            imu_data.gyro_z -= bias_z
 
         # Get magnetometer data
         if any([c for c in self.components if 'mag' in c]):
@@ -439,21 +504,107 @@ class MPU9250IMUs(IMU):
                 ],
             )
 
-            # If calibrations exist for current IMU, apply them
-            if cal_id in self.calibration_dict.keys():
-                # Calibrate gyroscope by subtracting an offset from each axis
-                if len(self.calibration_dict[cal_id]["mag"]) > 0:
-                    imu_data.mag_x = imu_data.mag_x - self.calibration_dict[cal_id]["mag"][0]
-                    imu_data.mag_y = imu_data.mag_y - self.calibration_dict[cal_id]["mag"][1]
-                    imu_data.mag_z = imu_data.mag_z - self.calibration_dict[cal_id]["mag"][2]
-
+            # Apply magnetometer calibration (matrix @ raw + offset)
+            if calibration['mag'] is not None:
+                matrix, offset = calibration['mag']
+                (imu_data.mag_x,
+                imu_data.mag_y,
+                imu_data.mag_z,
+                ) = (matrix @ (imu_data.mag_x, imu_data.mag_y, imu_data.mag_z) + offset).tolist()
+
+        # Carry the latest orientation estimate over to the new sample
+        if self.orientation_estimator is not None:
+            prev_data = self.imus[imu_id]
+            (imu_data.quat_x, imu_data.quat_y, imu_data.quat_z, imu_data.quat_w,
+            imu_data.eul_x, imu_data.eul_y, imu_data.eul_z,
+            ) = (prev_data.quat_x, prev_data.quat_y, prev_data.quat_z, prev_data.quat_w,
+            prev_data.eul_x, prev_data.eul_y, prev_data.eul_z)
+
+        # Stamp the sample with the middle of its I2C reads, rather than when they finished
+        imu_data.timestamp = (read_start + time.perf_counter()) / 2
         # Update IMU data class dictionary
-        imu_data.timestamp = time.perf_counter()
         self.imus[imu_id] = imu_data
 
         return imu_data
 
 
+    def get_all_array(
+        self,
+        fields: tuple=DEFAULT_ARRAY_FIELDS,
+        refresh: bool=True,
+    ) -> np.ndarray:
+        """Get a snapshot of all IMUs as a single array, with one row per IMU (in the order of `imu_ids`) and one column per field.
+
+        Args:
+            fields (tuple of str): IMUData field names or field groups (`acc`, `gyro`, `mag`, `quat`, `ef_quat`, `eul`, `rot_matrix`, `ref_rot_matrix`) to include as columns, in order. Default: ('acc', 'gyro', 'mag', 'quat', 'timestamp').
+            refresh (bool): whether to read new data from every IMU first. If False, the most recent data from :py:meth:`get_data` is used. Default: True.
+
+        Returns:
+            np.ndarray: (n_imus, n_fields) array of IMU data.
+        """
+        if refresh:
+            for imu_id in self.imu_ids:
+                self.get_data(imu_id)
+
+        return imu_data_to_array([self.imus[imu_id] for imu_id in self.imu_ids], fields)
+
+
+    def update_orientation(self, raw: bool=True) -> np.ndarray:
+        """Update the orientation estimate of every IMU from its latest sample in one vectorized step, filling the quaternion and Euler angle fields of each IMU's latest :py:class:`IMUData`. Call this once per loop after reading all IMUs with :py:meth:`get_data`.
+
+        Args:
+            raw (bool): whether to provide orientations in the filter's world frame, rather than relative to the reference orientation obtained by calling `self.tare()`. Default: True (providing raw values).
+
+        Returns:
+            quat (np.ndarray): n_imus x 4 array of scalar-last (x, y, z, w) quaternions, in the order of `imu_ids`.
+        """
+        if self.orientation_estimator is None:
+            raise Exception('No orientation filter configured. Set `orientation_filter` when creating MPU9250IMUs.')
+
+        imu_data = [self.imus[imu_id] for imu_id in self.imu_ids]
+        quat = self.orientation_estimator.update_from_imu_data(imu_data)
+
+        # Rotate the estimates into the tare reference frame, q_ref^-1 * q
+        if not raw:
+            quat = quat_multiply(self._tare_inverses, quat)
+            quat *= np.where(quat[:, 3:4] < 0, -1.0, 1.0)
+            for d, q, e in zip(imu_data, quat.tolist(), quat_to_euler(quat).tolist()):
+                d.quat_x, d.quat_y, d.quat_z, d.quat_w = q
+                d.eul_x, d.eul_y, d.eul_z = e
+
+        return quat
+
+
+    def _collect_tare_samples(self, imu_ids: list, duration: float) -> dict:
+        """Read the IMUs being tared, and update their raw orientation estimates if configured, every millisecond for `duration` seconds.
+
+        Args:
+            imu_ids (list): IMU numbers to collect samples from.
+            duration (float): time to collect samples for in seconds.
+
+        Returns:
+            samples (dict): list of IMUData samples for each IMU number.
+        """
+        samples = {imu_id: [] for imu_id in imu_ids}
+        t0 = time.perf_counter()
+
+        while time.perf_counter() - t0 < duration:
+            for imu_id in imu_ids:
+                self.get_data(imu_id)
+            if self.orientation_estimator is not None:
+                self.update_orientation() # IMUs that were not read have no new sample, so their estimates are left unchanged
+            for imu_id in imu_ids:
+                samples[imu_id].append(self.imus[imu_id])
+            time.sleep(0.001)
+
+        return samples
+
+
+    def _apply_tare(self, imu_id: int) -> None:
+        """Use the averaged tare orientation of an IMU as the reference of :py:meth:`update_orientation` with `raw=False`."""
+        self._tare_inverses[list(self.imu_ids).index(imu_id)] = quat_conjugate(self.tare_quaternions[imu_id])
+
+
     def get_MPU6050_data(
         self,
         bus: smbus.SMBus,
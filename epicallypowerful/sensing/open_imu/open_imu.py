@@ -10,23 +10,25 @@ Reference info:
 - OpenIMU CAN bus usage and breakdown: https://medium.com/@mikehorton/what-can-a-can-bus-imu-do-to-make-an-autonomous-vehicle-safer-e93f748569f6
 """
 
+import threading
 import time
+from dataclasses import replace
 from typing import List, Dict, Set, Optional
 
-import os
-import platform
 import can
 import numpy as np
 
-from epicallypowerful.sensing.open_imu.sae_j1939 import ExtendedID29Bit
 from epicallypowerful.sensing.open_imu.range_converter import (
     acceleration_packer,
     gyroscope_packer,
     magnetometer_packer,
 )
 from epicallypowerful.toolbox.jetson_performance import _rpi_or_jetson
+from epicallypowerful.toolbox.can_bus import bring_up_can_interface, acquire_can_bus, release_can_bus
+from epicallypowerful.toolbox.timebase import can_receive_time
 from epicallypowerful.sensing.imu_abc import IMU
-from epicallypowerful.sensing.imu_data import IMUData
+from epicallypowerful.sensing.imu_data import IMUData, imu_data_to_array, DEFAULT_ARRAY_FIELDS
+from epicallypowerful.sensing.orientation import OrientationEstimator
 
 
 # Set conversion constants
@@ -38,38 +40,7 @@ GYROSCOPE_PGN = 61482 # Angular velocity
 MAGNETOMETER_PGN = 65386 # Magnetometer
 
 
-def _load_can_drivers() -> None:
-    """Loads and unload the can drivers, then reloads to ensure fresh driver initialization
-    This will load the CAN drivers, but then remove them and load them again...
-    Trust the process. Loading them alone will not reset the can drivers.
-    If they are not reset, the buffer can fill up due to errors and the buffer
-    will not properly reset.
-    """
-
-    dev_uname = platform.uname()
-    if 'aarch64' in dev_uname.machine.lower() and 'tegra' in dev_uname.release.lower():
-        os.system('sudo modprobe can')
-        os.system('sudo modprobe can_raw')
-        os.system('sudo modprobe mttcan')
-
-        os.system('sudo /sbin/ip link set can0 down')
-        os.system('sudo rmmod can_raw')
-        os.system('sudo rmmod can')
-        os.system('sudo rmmod mttcan')
-
-        os.system('sudo modprobe can')
-        os.system('sudo modprobe can_raw')
-        os.system('sudo modprobe mttcan')
-
-        os.system('sudo /sbin/ip link set can0 down')
-        os.system('sudo /sbin/ip link set can0 txqueuelen 1000 up type can bitrate 1000000')
-
-    elif 'aarch64' in dev_uname.machine.lower() and ('rpi' in dev_uname.release.lower() or 'raspi' in dev_uname.release.lower() or 'bcm' in dev_uname.release.lower()):
-        os.system('sudo /sbin/ip link set can0 down')
-        os.system('sudo /sbin/ip link set can0 txqueuelen 1000 up type can bitrate 1000000')
-
-
-class OpenIMUs(IMU):
+class OpenIMUs(can.Listener, IMU):
     def __init__(
         self,
         imu_ids: List[int],
@@ -77,25 +48,30 @@ class OpenIMUs(IMU):
         rate: float=100,
         load_drivers: bool=True,
         disabled: bool=False,
+        orientation_filter: str=None,
         verbose: bool=False,
+        channel: str='can0',
     ) -> None:
         """
 
-        A listener to capture data from OpenIMU300RI sensors sent over CAN.
+        A listener to capture data from OpenIMU300RI sensors sent over CAN. Messages are decoded in the background as they
+        arrive, so :py:meth:`get_data` always returns immediately with the most recent data from each IMU. The CAN bus and its
+        receive thread are shared with any other devices on the same channel (e.g. an ActuatorGroup), and only frames from the
+        listed IMUs are routed to this listener. The ``timestamp``
+        of each IMU's :py:class:`IMUData` is the time its latest message was received, which can be used to check for stale data.
 
         Args:
             imu_ids (list[int]): A list containing all device IDs.
             components (list[str]): A list of the components to use. Default: ['acc', 'gyro'].
             rate (float): rate [Hz] at which to sample from IMUs. NOTE: this does not affect the IMU's internal operating frequency, just the rate at which data are sampled from it.
-            load_can_drivers (bool): Whether the can drivers should be loaded. Other processes may have already loaded the drivers (like the actuators).
+            load_drivers (bool): Whether to bring up the CAN interface. The interface is only reset if it is down or in an error state, so this is safe to leave on when other devices (like the actuators) share the bus. Default: True.
             disabled (bool): Whether the listener is disabled.
+            orientation_filter (str): orientation estimator to run over all IMUs with :py:meth:`update_orientation`. Could be `madgwick`, `mahony`, `complementary`, or None to skip orientation estimation. Default: None.
             verbose (bool): Whether to print low-level operating steps to terminal. Default: False.
+            channel (str): CAN interface the IMUs are connected to. Default: 'can0'.
         """
 
         # can id -> order in which the IMU data is stored in the listener.
-        # self.listen_data_length includes 3 channels each for acc, gyro, mag, and 1 for time
-        # self.listen_data_length=len(imu_ids) * 3*len(components) + 1 # TODO: abstract # of components away
-        self.listen_data_length=len(imu_ids) * 9 + 1
         self.disabled = disabled=disabled or not (_rpi_or_jetson() == "jetson")
         self.imu_order: Dict[int, int] = dict()
         self.imu_data: Dict[int, IMUData] = dict()
@@ -119,15 +95,40 @@ class OpenIMUs(IMU):
         if 'mag' in self.components:
             self.packer_dict[MAGNETOMETER_PGN] = magnetometer_packer
 
+        # Fold each unpacker and unit conversion into one (scale, offset) pair per PGN: value = raw * scale + offset
+        self._pgn_conversions = {}
+
+        for pgn, packer in self.packer_dict.items():
+            unit_scale = DEG2RAD if pgn == GYROSCOPE_PGN else 1.0 # gyroscope is reported in [deg/s]
+            self._pgn_conversions[pgn] = (
+                unit_scale * (packer.from_unsigned_int(1) - packer.from_unsigned_int(0)),
+                unit_scale * packer.from_unsigned_int(0),
+            )
+
         # Set IMU IDs and order of data unpacking
         for i, imu_id in enumerate(imu_ids):
             self.imu_order[imu_id] = i
             self.imu_data[imu_id] = IMUData()
+        self.tare_quaternions = {imu_id: np.array([0.0, 0.0, 0.0, 1.0]) for imu_id in imu_ids}
+        self.gyro_biases = {imu_id: (0.0, 0.0, 0.0) for imu_id in imu_ids}
+        self._data_triggers = []
+        self._data_lock = threading.Lock() # guards swapping the IMUData in `imu_data`
+
+        # Set up vectorized orientation estimation across all IMUs
+        if orientation_filter is not None:
+            self.orientation_estimator = OrientationEstimator(
+                num_imus=len(imu_ids),
+                method=orientation_filter,
+                use_magnetometer=('mag' in self.components),
+            )
+        else:
+            self.orientation_estimator = None
 
         if self.disabled:
             print("OpenIMUs instance is disabled.")
 
         self.load_drivers = load_drivers
+        self.channel = channel
         self._set_up_connected_imus()
 
 
@@ -135,10 +136,40 @@ class OpenIMUs(IMU):
         """Set up driver resources for IMUs.
         """
         if self.load_drivers:
-            _load_can_drivers()
+            bring_up_can_interface(self.channel)
+
+        self.shared_bus = None
+        self.bus = None
+        self.notifier = None
+
+        if self.disabled:
+            return
 
-        self.bus = can.Bus(interface="socketcan", bitrate=1000000)
-        self._verify_num_imus()
+        # Decode messages in the background as they arrive, on the receive thread shared by all devices on this channel
+        self.shared_bus = acquire_can_bus(self.channel, interface="socketcan", bitrate=1000000)
+        self.bus = self.shared_bus.bus
+        self.notifier = self.shared_bus.notifier
+        self.shared_bus.subscribe(self, self._can_filters())
+
+        try:
+            self._verify_num_imus()
+        except Exception:
+            self._close_loop_resources()
+            raise
+
+
+    def _can_filters(self) -> List[dict]:
+        """CAN filters matching the messages of the configured components from each IMU.
+
+        Returns:
+            list[dict]: Filters in the format of the ``can_filters`` of :py:class:`can.Bus`.
+        """
+        # SAE J1939: match the 18-bit PGN and 8-bit source address, ignoring the priority bits
+        return [
+            {'can_id': (pgn << 8) | imu_id, 'can_mask': 0x3FFFFFF, 'extended': True}
+            for imu_id in self.imu_ids
+            for pgn in self._pgn_conversions
+        ]
 
 
     def _verify_num_imus(self, timeout_sec: int=2) -> None:
@@ -154,12 +185,9 @@ class OpenIMUs(IMU):
         imu_id_cache: Set[int] = set()
         start = time.perf_counter()
 
+        # Messages are decoded on the shared receive thread, so wait for each IMU's data to be timestamped
         while True:
-            msg = self.bus.recv(timeout=timeout_sec)
-
-            if msg:
-                parsed_id = ExtendedID29Bit(msg.arbitration_id)
-                imu_id_cache.add(parsed_id.source)
+            imu_id_cache = {imu_id for imu_id, imu_data in self.imu_data.items() if imu_data.timestamp >= start}
 
             if len(imu_id_cache) == len(self.imu_order):
                 return
@@ -168,126 +196,108 @@ class OpenIMUs(IMU):
                     f"{len(imu_id_cache)} out of {len(self.imu_order)} IMUs connected. Only the following IMUs are connected: {list(imu_id_cache)}"
                 )
 
+            time.sleep(0.01)
 
-    def _unpack_payload(self, payload: bytes, pgn: int) -> List:
-        """
-        Unpack the payload of a message into the buffer.
 
-        Assumptions:
-        - Only linear acceleration and angular velocity measurements are being unpacked.
+    def on_message_received(self, msg: can.Message) -> None:
+        """Decode a message received from the CAN bus into a new IMUData object instance, which replaces the previous one of that IMU.
 
-        Args:
-            payload (bytes): The payload of the message.
-            pgn (int): The Parameter Group Number (PGN) of the message.
+        :meta private:
 
-        Returns:
-            A list of 3 values representing the (x, y, z) measurements.
+        Args:
+            msg (can.Message): the most recent message received on the bus
         """
+        if (not msg.is_extended_id) or msg.is_error_frame: return
 
-        if self.disabled:
-            return [0, 0, 0]
+        # SAE J1939: 18-bit PGN above the 8-bit source address
+        pgn = (msg.arbitration_id >> 8) & 0x3FFFF
+        conversion = self._pgn_conversions.get(pgn)
+        if conversion is None: return
 
-        # Select the correct unpacker
-        unpacker = self.packer_dict[pgn].from_unsigned_int
+        imu_id = msg.arbitration_id & 0xFF
+        if imu_id not in self.imu_data: return
 
-        # Unpack payload into buffer. X Y Z is the order
-        return [
-            unpacker(payload[0] | payload[1] << 8),
-            unpacker(payload[2] | payload[3] << 8),
-            unpacker(payload[4] | payload[5] << 8),
-        ]
+        scale, offset = conversion
+        payload = msg.data
 
+        # 3 axes: X, Y, Z
+        x = (payload[0] | payload[1] << 8) * scale + offset
+        y = (payload[2] | payload[3] << 8) * scale + offset
+        z = (payload[4] | payload[5] << 8) * scale + offset
 
-    def _get_data_in_loop(self) -> np.ndarray:
-        """
-        Get data in the loop and update corresponding IMUData object instances.
+        timestamp = can_receive_time(msg)
 
-        .. warning::
-            You should only be calling ``get_data()`` to get the data.
+        # Returned IMUData objects are never modified, so build a new one from the previous one with this message's axes
+        with self._data_lock:
+            imu_data = self.imu_data[imu_id]
+            if pgn == ACCELEROMETER_PGN: # [m*s^-2]
+                imu_data = replace(imu_data, acc_x=x, acc_y=y, acc_z=z, timestamp=timestamp)
+            elif pgn == GYROSCOPE_PGN: # [rad/s]
+                bias_x, bias_y, bias_z = self.gyro_biases[imu_id] # measured by `tare`
+                imu_data = replace(imu_data, gyro_x=x - bias_x, gyro_y=y - bias_y, gyro_z=z - bias_z, timestamp=timestamp)
+            else: # [Gauss] # TODO: confirm these units
+                imu_data = replace(imu_data, mag_x=x, mag_y=y, mag_z=z, timestamp=timestamp)
+            self.imu_data[imu_id] = imu_data
 
-        Returns:
-            np.ndarray: Returns a 1D numpy array of length ``len(imu_ids) * (3 * len(components)) + 1``.
-        """
-        data = np.zeros(self.listen_data_length)
-        
-        if not self.disabled:
-            # This set will keep track of what OpenIMU messages we have received so far
-            msg_id_cache = set()
-            tmp_msg_id_cache = set()
-
-            for msg in self.bus:
-                parsed_id = ExtendedID29Bit(msg.arbitration_id)
-
-                # We are only interested in linear acceleration and angular velocity messages
-                if parsed_id.pgn in list(self.packer_dict.keys()):
-                    if parsed_id.pgn == ACCELEROMETER_PGN:
-                        buffer_offset = 0
-                    elif parsed_id.pgn == GYROSCOPE_PGN:
-                        buffer_offset = 3
-                    elif parsed_id.pgn == MAGNETOMETER_PGN:
-                        buffer_offset = 6
-
-                    imu_num = self.imu_order[parsed_id.source]
-                    start = imu_num * len(self.packer_dict.keys()) + buffer_offset
-
-                    # 3 axes: X, Y, Z
-                    data[start:start + 3] = self._unpack_payload(
-                        msg.data, parsed_id.pgn
-                    )
-
-                    # Populate corresponding IMUData object instance with most recent data
-                    imu_id = self.imu_ids[imu_num]
-
-                    if parsed_id.pgn == ACCELEROMETER_PGN: # [m*s^-2]
-                        self.imu_data[imu_id].acc_x = data[start].astype(np.float32)
-                        self.imu_data[imu_id].acc_y = data[start + 1].astype(np.float32)
-                        self.imu_data[imu_id].acc_z = data[start + 2].astype(np.float32)
-                    elif parsed_id.pgn == GYROSCOPE_PGN: # [rad/s]
-                        self.imu_data[imu_id].gyro_x = data[start].astype(np.float32) * DEG2RAD
-                        self.imu_data[imu_id].gyro_y = data[start + 1].astype(np.float32) * DEG2RAD
-                        self.imu_data[imu_id].gyro_z = data[start + 2].astype(np.float32) * DEG2RAD
-                    elif parsed_id.pgn == MAGNETOMETER_PGN: # [Gauss] # TODO: confirm these units
-                        self.imu_data[imu_id].mag_x = data[start].astype(np.float32)
-                        self.imu_data[imu_id].mag_y = data[start + 1].astype(np.float32)
-                        self.imu_data[imu_id].mag_z = data[start + 2].astype(np.float32)
-
-                    self.imu_data[imu_id].timestamp = time.perf_counter()
-
-                    msg_id_cache.add(parsed_id.extended_id)
-
-                    # 3 possible messages per IMU: acceleration, angular velocity, and magnetometer data. Break once we've received all three from unpacker
-                    if len(msg_id_cache) == len(self.imu_order) * len(self.packer_dict.keys()):
-                        break
-
-        data[-1] = time.perf_counter()
-        
-        return data
+        for trigger in self._data_triggers:
+            trigger.check()
 
 
     def get_data(self, imu_id: int | list[int]) -> IMUData:
-        """Get data from all connected IMUs by parsing CAN bus buffer, then return imu data for specified IMU(s) by ID.
+        """Return the most recent data for the specified IMU(s) by ID. This does not wait on the CAN bus, as data are updated in the background as messages arrive.
 
         Args:
-            imu_id (int or list[int]): CAN ID of the OpenIMU from which to update the appropriate IMUData dataclass.
+            imu_id (int or list[int]): CAN ID of the OpenIMU from which to get the appropriate IMUData dataclass.
 
         Returns:
-            IMUData object instance or list of IMUData object instances populated with most recent OpenIMU data. NOTE: some fields in the dataclass will necessarily remain unpopulated as the OpenIMUs do not provide all the information that other IMUs do.
+            IMUData object instance or list of IMUData object instances populated with most recent OpenIMU data. The ``timestamp`` field is the time the latest message from that IMU was received. A new object is returned once new data has been received, and returned objects are not modified afterwards. NOTE: some fields in the dataclass will necessarily remain unpopulated as the OpenIMUs do not provide all the information that other IMUs do.
         """
-
-        # Get data for all IMUs with new messages in CAN bus buffer. This process will update all IMUData object instances with the most recent data
-        _ = self._get_data_in_loop()
-        
         if isinstance(imu_id, int):
             return self.imu_data[imu_id]
         elif isinstance(imu_id, list):
             return [self.imu_data[idx] for idx in imu_id]
 
+
+
+    def get_all_array(
+        self,
+        fields: tuple=DEFAULT_ARRAY_FIELDS,
+    ) -> np.ndarray:
+        """Get a snapshot of all IMUs as a single array, with one row per IMU (in the order of `imu_ids`) and one column per field.
+
+        Args:
+            fields (tuple of str): IMUData field names or field groups (`acc`, `gyro`, `mag`, `quat`, `ef_quat`, `eul`, `rot_matrix`, `ref_rot_matrix`) to include as columns, in order. Default: ('acc', 'gyro', 'mag', 'quat', 'timestamp').
+
+        Returns:
+            np.ndarray: (n_imus, n_fields) array of IMU data.
+        """
+        return imu_data_to_array(self.get_data(list(self.imu_ids)), fields)
+
+
+    def update_orientation(self) -> np.ndarray:
+        """Update the orientation estimate of every IMU from its latest data in one vectorized step. Each IMU's latest :py:class:`IMUData` is replaced by a new one with the quaternion and Euler angle fields filled, so call :py:meth:`get_data` after this to get them.
+
+        Returns:
+            quat (np.ndarray): n_imus x 4 array of scalar-last (x, y, z, w) quaternions, in the order of `imu_ids`.
+        """
+        if self.orientation_estimator is None:
+            raise Exception('No orientation filter configured. Set `orientation_filter` when creating OpenIMUs.')
+
+        with self._data_lock:
+            imu_data = [replace(self.imu_data[imu_id]) for imu_id in self.imu_ids]
+            quat = self.orientation_estimator.update_from_imu_data(imu_data)
+            for imu_id, new_data in zip(self.imu_ids, imu_data):
+                self.imu_data[imu_id] = new_data
+        return quat
+
             
     def _close_loop_resources(self):
         """Close resources opened in the OpenIMUs instance.
         """
-        if not self.disabled:
-            self.bus.shutdown()
+        if self.shared_bus is not None:
+            self.shared_bus.unsubscribe(self)
+            release_can_bus(self.shared_bus)
+            self.shared_bus = None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,403 @@
+"""epically-powerful module for managing IMUs.
+
+This module contains a vectorized orientation estimator for fusing
+gyroscope, accelerometer, and (optionally) magnetometer readings from
+several IMUs at once, along with the quaternion helpers it relies on.
+
+All quaternions are scalar-last (x, y, z, w), matching :py:class:`IMUData`
+and ``scipy.spatial.transform.Rotation``, and rotate vectors from the
+sensor frame into the world frame.
+
+Reference info:
+- Madgwick filter: https://x-io.co.uk/downloads/madgwick_internal_report.pdf
+- Mahony filter: https://hal.science/hal-00488376/document
+"""
+
+from typing import List, Optional, Union
+import numpy as np
+from numpy.typing import NDArray
+from epicallypowerful.sensing.imu_data import IMUData
+
+ORIENTATION_METHODS = ('madgwick', 'mahony', 'complementary')
+
+
+def quat_multiply(q: NDArray, r: NDArray) -> NDArray:
+    """Hamilton product of two (arrays of) scalar-last quaternions.
+
+    Args:
+        q (NDArray): ... x 4 array of quaternions.
+        r (NDArray): ... x 4 array of quaternions.
+
+    Returns:
+        NDArray: ... x 4 array with the product q * r.
+    """
+    qx, qy, qz, qw = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    rx, ry, rz, rw = r[..., 0], r[..., 1], r[..., 2], r[..., 3]
+    return np.stack((
+        qw*rx + qx*rw + qy*rz - qz*ry,
+        qw*ry - qx*rz + qy*rw + qz*rx,
+        qw*rz + qx*ry - qy*rx + qz*rw,
+        qw*rw - qx*rx - qy*ry - qz*rz,
+    ), axis=-1)
+
+
+def quat_conjugate(q: NDArray) -> NDArray:
+    """Conjugate (inverse, for unit quaternions) of scalar-last quaternions."""
+    return q * np.array([-1.0, -1.0, -1.0, 1.0])
+
+
+def quat_to_matrix(q: NDArray) -> NDArray:
+    """Convert scalar-last unit quaternions to rotation matrices.
+
+    Args:
+        q (NDArray): ... x 4 array of quaternions.
+
+    Returns:
+        NDArray: ... x 3 x 3 array of rotation matrices.
+    """
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    return np.stack((
+        np.stack((1 - 2*(y*y + z*z), 2*(x*y - z*w), 2*(x*z + y*w)), axis=-1),
+        np.stack((2*(x*y + z*w), 1 - 2*(x*x + z*z), 2*(y*z - x*w)), axis=-1),
+        np.stack((2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x*x + y*y)), axis=-1),
+    ), axis=-2)
+
+
+def matrix_to_quat(m: NDArray) -> NDArray:
+    """Convert rotation matrices to scalar-last unit quaternions with a positive scalar part.
+
+    Args:
+        m (NDArray): ... x 3 x 3 array of rotation matrices.
+
+    Returns:
+        NDArray: ... x 4 array of quaternions.
+    """
+    m = np.asarray(m, dtype=np.float64)
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+
+    # Use the largest of the four candidate denominators for numerical stability
+    candidates = np.stack((1 + m00 - m11 - m22, 1 - m00 + m11 - m22, 1 - m00 - m11 + m22, 1 + m00 + m11 + m22), axis=-1)
+    choice = np.argmax(candidates, axis=-1)
+    q = np.empty(m.shape[:-2] + (4,))
+
+    x_form = np.stack((candidates[..., 0], m[..., 0, 1] + m[..., 1, 0], m[..., 0, 2] + m[..., 2, 0], m[..., 2, 1] - m[..., 1, 2]), axis=-1)
+    y_form = np.stack((m[..., 0, 1] + m[..., 1, 0], candidates[..., 1], m[..., 1, 2] + m[..., 2, 1], m[..., 0, 2] - m[..., 2, 0]), axis=-1)
+    z_form = np.stack((m[..., 0, 2] + m[..., 2, 0], m[..., 1, 2] + m[..., 2, 1], candidates[..., 2], m[..., 1, 0] - m[..., 0, 1]), axis=-1)
+    w_form = np.stack((m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1], candidates[..., 3]), axis=-1)
+
+    for i, form in enumerate((x_form, y_form, z_form, w_form)):
+        mask = choice == i
+        q[mask] = form[mask]
+
+    q /= np.linalg.norm(q, axis=-1, keepdims=True)
+    q *= np.where(q[..., 3:4] < 0, -1.0, 1.0)
+    return q
+
+
+def quat_to_euler(q: NDArray) -> NDArray:
+    """Convert scalar-last unit quaternions to extrinsic x-y-z (roll, pitch, yaw) Euler angles in radians.
+    This matches ``Rotation.as_euler('xyz')`` from scipy.
+
+    Args:
+        q (NDArray): ... x 4 array of quaternions.
+
+    Returns:
+        NDArray: ... x 3 array of Euler angles [rad].
+    """
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    return np.stack((
+        np.arctan2(2*(w*x + y*z), 1 - 2*(x*x + y*y)),
+        np.arcsin(np.clip(2*(w*y - x*z), -1.0, 1.0)),
+        np.arctan2(2*(w*z + x*y), 1 - 2*(y*y + z*z)),
+    ), axis=-1)
+
+
+def average_quaternions(q: NDArray, weights: Optional[NDArray]=None) -> NDArray:
+    """Average scalar-last unit quaternions with the eigenvector method (Markley et al., 2007). The average is the eigenvector
+    with the largest eigenvalue of the (weighted) sum of the outer products q q^T, which minimizes the summed squared attitude
+    error and is unaffected by the sign ambiguity of quaternions (q and -q are the same orientation).
+
+    Args:
+        q (NDArray): n x 4 array of quaternions.
+        weights (NDArray): n weights, one per quaternion. Default: None (equal weights).
+
+    Returns:
+        NDArray: 4 element average quaternion with a positive scalar part.
+    """
+    q = np.asarray(q, dtype=np.float64).reshape(-1, 4)
+    weighted = q if weights is None else q * np.asarray(weights, dtype=np.float64)[:, None]
+    _, eigenvectors = np.linalg.eigh(weighted.T @ q)
+    average = eigenvectors[:, -1]
+    return average if average[3] >= 0 else -average
+
+
+def _normalize_rows(v: NDArray) -> tuple[NDArray, NDArray]:
+    """Normalize each row of v, returning the normalized rows and a mask of rows with nonzero norm."""
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    valid = norm[..., 0] > 0
+    return v / np.where(norm > 0, norm, 1.0), valid
+
+
+class OrientationEstimator:
+    """Vectorized orientation estimator for several IMUs at once. Each call to :py:meth:`update`
+    advances the orientation of every IMU with a single set of NumPy operations, so the cost of
+    adding more IMUs is negligible compared to running one Python filter per IMU.
+
+    Available ``method`` strings are:
+        * 'madgwick': gradient-descent filter. ``gain`` is the filter's beta (default: 0.1).
+        * 'mahony': nonlinear complementary filter with integral feedback. ``gain`` is Kp (default: 1.0) and ``integral_gain`` is Ki.
+        * 'complementary': gyroscope integration blended toward the accelerometer's tilt. ``gain`` is the blend fraction per second (default: 2.0). Does not use the magnetometer.
+
+    Without a magnetometer, heading (yaw) is only from integrating the gyroscope and will drift.
+
+    Example:
+        .. code-block:: python
+
+            from epicallypowerful.sensing import MPU9250IMUs
+
+            imus = MPU9250IMUs(imu_ids=imu_ids, components=['acc', 'gyro'], orientation_filter='madgwick')
+
+            while True:
+                for imu_id in imu_ids:
+                    imus.get_data(imu_id)
+
+                quats = imus.update_orientation() # n_imus x 4, also written to each IMUData
+
+    Args:
+        num_imus (int): number of IMUs to estimate orientation for.
+        method (str): estimator to use. Default: 'madgwick'.
+        gain (float): main correction gain of the estimator. If None, a default is chosen based on ``method``.
+        integral_gain (float): integral gain, only used by the 'mahony' method. Default: 0.0.
+        use_magnetometer (bool): whether to correct heading with the magnetometer (if provided to :py:meth:`update`). Default: True.
+    """
+
+    def __init__(
+        self,
+        num_imus: int,
+        method: str='madgwick',
+        gain: Optional[float]=None,
+        integral_gain: float=0.0,
+        use_magnetometer: bool=True,
+    ) -> None:
+        method = method.lower()
+
+        if method not in ORIENTATION_METHODS:
+            raise ValueError(f"Orientation method {method} not recognized. Available methods: {ORIENTATION_METHODS}")
+
+        if gain is None:
+            gain = {'madgwick': 0.1, 'mahony': 1.0, 'complementary': 2.0}[method]
+
+        self.num_imus = num_imus
+        self.method = method
+        self.gain = gain
+        self.integral_gain = integral_gain
+        self.use_magnetometer = use_magnetometer
+        self.reset()
+
+
+    def reset(self) -> None:
+        """Reset every IMU's orientation to identity. The next update re-initializes tilt from the accelerometer."""
+        self.quat = np.zeros((self.num_imus, 4))
+        self.quat[:, 3] = 1.0
+        self._integral_error = np.zeros((self.num_imus, 3))
+        self._initialized = np.zeros(self.num_imus, dtype=bool)
+        self._prev_timestamps = np.full(self.num_imus, np.nan)
+
+
+    def update(
+        self,
+        gyro: NDArray,
+        acc: NDArray,
+        mag: Optional[NDArray]=None,
+        dt: Union[float, NDArray]=0.0,
+    ) -> NDArray:
+        """Advance the orientation of all IMUs by one step.
+
+        Args:
+            gyro (NDArray): n_imus x 3 array of angular velocities [rad/s].
+            acc (NDArray): n_imus x 3 array of accelerations (any units). Rows of zeros skip the correction step.
+            mag (NDArray): n_imus x 3 array of magnetic field readings (any units), or None. Default: None.
+            dt (float or NDArray): time step [s], either shared or one per IMU. Rows with dt <= 0 are left unchanged.
+
+        Returns:
+            quat (NDArray): n_imus x 4 array of scalar-last orientation quaternions.
+        """
+        gyro = np.asarray(gyro, dtype=np.float64)
+        acc, acc_valid = _normalize_rows(np.asarray(acc, dtype=np.float64))
+        dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), (self.num_imus,))
+
+        if mag is not None and self.use_magnetometer and self.method != 'complementary':
+            mag, mag_valid = _normalize_rows(np.asarray(mag, dtype=np.float64))
+        else:
+            mag, mag_valid = None, np.zeros(self.num_imus, dtype=bool)
+
+        # Start from the accelerometer's tilt rather than waiting for the filter to converge
+        uninitialized = acc_valid & ~self._initialized
+        if np.any(uninitialized):
+            self.quat[uninitialized] = self._tilt_from_accelerometer(acc[uninitialized])
+            self._initialized |= uninitialized
+
+        step = dt > 0
+        if not np.any(step):
+            return self.quat
+
+        q = self.quat
+        dt = dt[:, None]
+
+        if self.method == 'madgwick':
+            q_dot = 0.5 * quat_multiply(q, np.column_stack((gyro, np.zeros(self.num_imus))))
+            correction = self._madgwick_gradient(q, acc, mag, mag_valid)
+            correction, _ = _normalize_rows(correction)
+            q_dot -= self.gain * correction * acc_valid[:, None]
+            q_new = q + q_dot * dt
+
+        elif self.method == 'mahony':
+            error = self._mahony_error(q, acc, mag, mag_valid) * acc_valid[:, None]
+
+            if self.integral_gain > 0:
+                self._integral_error += np.where(step[:, None], self.integral_gain * error * dt, 0.0)
+
+            omega = gyro + self.gain * error + self._integral_error
+            q_new = q + 0.5 * quat_multiply(q, np.column_stack((omega, np.zeros(self.num_imus)))) * dt
+
+        else:
+            q_pred = q + 0.5 * quat_multiply(q, np.column_stack((gyro, np.zeros(self.num_imus)))) * dt
+            q_pred, _ = _normalize_rows(q_pred)
+
+            # Rotate the predicted orientation a fraction of the way toward the accelerometer's gravity direction (world frame)
+            gravity_world = np.einsum('nij,nj->ni', quat_to_matrix(q_pred), acc)
+            axis = np.cross(gravity_world, np.array([0.0, 0.0, 1.0]))
+            angle = np.arctan2(np.linalg.norm(axis, axis=1), gravity_world[:, 2])
+            axis, _ = _normalize_rows(axis)
+            half_angle = 0.5 * np.clip(self.gain * dt[:, 0], 0.0, 1.0) * angle * acc_valid
+            correction = np.column_stack((axis * np.sin(half_angle)[:, None], np.cos(half_angle)))
+            q_new = quat_multiply(correction, q_pred)
+
+        q_new, _ = _normalize_rows(q_new)
+        self.quat = np.where(step[:, None], q_new, q)
+        return self.quat
+
+
+    def update_from_imu_data(
+        self,
+        imu_data: List[IMUData],
+    ) -> NDArray:
+        """Advance the orientation of all IMUs from their latest :py:class:`IMUData`, then write the resulting
+        quaternion and Euler angle fields back into each one. The time step for each IMU is taken from the
+        change in its ``timestamp``, so IMUs without a new sample are left unchanged.
+
+        Args:
+            imu_data (list of IMUData): latest data for each IMU, in the same order every call.
+
+        Returns:
+            quat (NDArray): n_imus x 4 array of scalar-last orientation quaternions.
+        """
+        readings = np.array([
+            (d.gyro_x, d.gyro_y, d.gyro_z, d.acc_x, d.acc_y, d.acc_z, d.mag_x, d.mag_y, d.mag_z, d.timestamp)
+            for d in imu_data
+        ])
+        timestamps = readings[:, 9]
+        dt = np.nan_to_num(timestamps - self._prev_timestamps, nan=0.0)
+        self._prev_timestamps = timestamps
+
+        quat = self.update(
+            gyro=readings[:, 0:3],
+            acc=readings[:, 3:6],
+            mag=readings[:, 6:9] if np.any(readings[:, 6:9]) else None,
+            dt=dt,
+        )
+        self.fill_imu_data(imu_data)
+        return quat
+
+
+    def fill_imu_data(
+        self,
+        imu_data: List[IMUData],
+    ) -> None:
+        """Write the current quaternion and Euler angle estimates into each :py:class:`IMUData`.
+
+        Args:
+            imu_data (list of IMUData): data for each IMU, in the same order as the estimator's rows.
+        """
+        euler = quat_to_euler(self.quat).tolist()
+
+        for d, q, e in zip(imu_data, self.quat.tolist(), euler):
+            d.quat_x, d.quat_y, d.quat_z, d.quat_w = q
+            d.eul_x, d.eul_y, d.eul_z = e
+
+
+    def _tilt_from_accelerometer(self, acc: NDArray) -> NDArray:
+        """Orientation with zero heading whose gravity direction matches the (normalized) accelerometer rows."""
+        roll = np.arctan2(acc[:, 1], acc[:, 2])
+        pitch = np.arctan2(-acc[:, 0], np.hypot(acc[:, 1], acc[:, 2]))
+        cr, sr = np.cos(roll/2), np.sin(roll/2)
+        cp, sp = np.cos(pitch/2), np.sin(pitch/2)
+        return np.column_stack((sr*cp, cr*sp, -sr*sp, cr*cp))
+
+
+    def _earth_field(self, q: NDArray, mag: NDArray) -> tuple[NDArray, NDArray]:
+        """Magnetic field reference (horizontal and vertical components) in the world frame."""
+        h = np.einsum('nij,nj->ni', quat_to_matrix(q), mag)
+        return np.hypot(h[:, 0], h[:, 1]), h[:, 2]
+
+
+    def _madgwick_gradient(
+        self,
+        q: NDArray,
+        acc: NDArray,
+        mag: Optional[NDArray],
+        mag_valid: NDArray,
+    ) -> NDArray:
+        """Gradient of the Madgwick objective function, in scalar-last order."""
+        x, y, z, w = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+
+        # Gravity objective and its Jacobian (columns in w, x, y, z order)
+        f_g = np.column_stack((
+            2*(x*z - w*y) - acc[:, 0],
+            2*(w*x + y*z) - acc[:, 1],
+            2*(0.5 - x*x - y*y) - acc[:, 2],
+        ))
+        zero = np.zeros_like(w)
+        j_g = np.stack((
+            np.column_stack((-2*y, 2*z, -2*w, 2*x)),
+            np.column_stack((2*x, 2*w, 2*z, 2*y)),
+            np.column_stack((zero, -4*x, -4*y, zero)),
+        ), axis=1)
+        gradient = np.einsum('nij,ni->nj', j_g, f_g)
+
+        if mag is not None and np.any(mag_valid):
+            bx, bz = self._earth_field(q, mag)
+            f_b = np.column_stack((
+                2*bx*(0.5 - y*y - z*z) + 2*bz*(x*z - w*y) - mag[:, 0],
+                2*bx*(x*y - w*z) + 2*bz*(w*x + y*z) - mag[:, 1],
+                2*bx*(w*y + x*z) + 2*bz*(0.5 - x*x - y*y) - mag[:, 2],
+            ))
+            j_b = np.stack((
+                np.column_stack((-2*bz*y, 2*bz*z, -4*bx*y - 2*bz*w, -4*bx*z + 2*bz*x)),
+                np.column_stack((-2*bx*z + 2*bz*x, 2*bx*y + 2*bz*w, 2*bx*x + 2*bz*z, -2*bx*w + 2*bz*y)),
+                np.column_stack((2*bx*y, 2*bx*z - 4*bz*x, 2*bx*w - 4*bz*y, 2*bx*x)),
+            ), axis=1)
+            gradient += np.einsum('nij,ni->nj', j_b, f_b) * mag_valid[:, None]
+
+        # Reorder from (w, x, y, z) to scalar-last
+        return gradient[:, [1, 2, 3, 0]]
+
+
+    def _mahony_error(
+        self,
+        q: NDArray,
+        acc: NDArray,
+        mag: Optional[NDArray],
+        mag_valid: NDArray,
+    ) -> NDArray:
+        """Sensor-frame rotation error between measured and estimated reference directions."""
+        rot_t = np.swapaxes(quat_to_matrix(q), 1, 2)
+        gravity_est = rot_t[:, :, 2]
+        error = np.cross(acc, gravity_est)
+
+        if mag is not None and np.any(mag_valid):
+            bx, bz = self._earth_field(q, mag)
+            field_est = np.einsum('nij,nj->ni', rot_t, np.column_stack((bx, np.zeros_like(bx), bz)))
+            error += np.cross(mag, field_est) * mag_valid[:, None]
+
+        return error
@@ -0,0 +1,25 @@
+# Import management for epicallypowerful simulation modules. Classes are
+# loaded on first access to keep `import epicallypowerful` fast.
+from typing import TYPE_CHECKING
+from epicallypowerful._lazy import attach_lazy_loader
+
+if TYPE_CHECKING:
+    from .actuator_simulator import ActuatorSimulator
+    from .dynamics import RigidBodyDynamics
+    from .simulated_actuators import SimulatedCubeMars, SimulatedCubeMarsV3, SimulatedCubeMarsServo, SimulatedRobstride
+
+_LAZY_ATTRIBUTES = {
+    'ActuatorSimulator': '.actuator_simulator',
+    'RigidBodyDynamics': '.dynamics',
+    'SimulatedCubeMars': '.simulated_actuators',
+    'SimulatedCubeMarsV3': '.simulated_actuators',
+    'SimulatedCubeMarsServo': '.simulated_actuators',
+    'SimulatedRobstride': '.simulated_actuators',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES.keys())
+
+__getattr__, __dir__ = attach_lazy_loader(
+    __name__, globals(), _LAZY_ATTRIBUTES,
+    submodules=['actuator_simulator', 'dynamics', 'simulated_actuators'],
+)
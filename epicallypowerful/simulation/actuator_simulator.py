@@ -0,0 +1,209 @@
+"""epically-powerful module for simulating actuators.
+
+This module contains the ActuatorSimulator, which runs simulated actuators
+on a python-can ``virtual`` bus or a SocketCAN ``vcan`` device so that
+:py:class:`~epicallypowerful.actuation.ActuatorGroup` can be exercised and
+benchmarked without hardware.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import Optional
+
+import can
+
+from epicallypowerful.actuation.motor_data import cubemars, robstrides
+from epicallypowerful.toolbox.can_bus import CANRouter
+from epicallypowerful.simulation.simulated_actuators import (
+    SimulatedActuator,
+    SimulatedCubeMars,
+    SimulatedCubeMarsServo,
+    SimulatedCubeMarsV3,
+    SimulatedRobstride,
+)
+
+SIMULATION_CHANNEL = 'epically-powerful-sim'
+
+
+class ActuatorSimulator():
+    """Runs a set of simulated actuators on a virtual CAN bus. Commands sent by an :py:class:`~epicallypowerful.actuation.ActuatorGroup` on the same channel
+    are decoded by the simulated actuator they are addressed to, which moves its load and replies in its protocol. Replies are delayed by a configurable
+    latency and jitter, and can be randomly dropped, to emulate a loaded bus.
+
+    Example:
+        .. code-block:: python
+
+
+            from epicallypowerful.actuation import ActuatorGroup
+            from epicallypowerful.simulation import ActuatorSimulator
+
+            motors = {1: 'AK80-9', 2: 'AK80-9-V3', 3: 'RS02'}
+            with ActuatorSimulator.from_dict(motors, latency=0.0005, jitter=0.0002) as simulator:
+                actuators = ActuatorGroup.from_dict(motors, can_args=simulator.can_args)
+                actuators.set_position(1, 0.5, 5.0, 0.1)
+
+    Args:
+        actuators (list[SimulatedActuator]): The simulated actuators to run.
+        channel (str, optional): Channel of the virtual bus. Defaults to 'epically-powerful-sim'.
+        interface (str, optional): python-can interface, either 'virtual' for an in-process bus or 'socketcan' for a vcan device. Defaults to 'virtual'.
+        latency (float, optional): Minimum delay in seconds between receiving a command and sending its reply. Defaults to 0.0.
+        jitter (float, optional): Additional uniformly distributed delay in seconds added to each reply. Defaults to 0.0.
+        drop_rate (float, optional): Probability that a reply is not sent. Defaults to 0.0.
+        seed (Optional[int], optional): Seed for the latency and drop random number generator. Defaults to None.
+        start (bool, optional): Whether to start the simulator on creation. Defaults to True.
+
+    Attributes:
+        actuators (dict[int, SimulatedActuator]): The simulated actuators by CAN ID.
+        replies_sent (int): Number of replies sent.
+        replies_dropped (int): Number of replies dropped.
+    """
+    def __init__(
+        self,
+        actuators: list[SimulatedActuator],
+        channel: str=SIMULATION_CHANNEL,
+        interface: str='virtual',
+        latency: float=0.0,
+        jitter: float=0.0,
+        drop_rate: float=0.0,
+        seed: Optional[int]=None,
+        start: bool=True,
+    ) -> None:
+        if latency < 0 or jitter < 0:
+            raise ValueError('latency and jitter must be non-negative')
+        if not 0 <= drop_rate <= 1:
+            raise ValueError('drop_rate must be between 0 and 1')
+
+        self.actuators = {}
+        for actuator in actuators:
+            if actuator.can_id in self.actuators:
+                raise ValueError(f"Duplicate CAN ID: {actuator.can_id}")
+            self.actuators[actuator.can_id] = actuator
+
+        self.channel = channel
+        self.interface = interface
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self._rng = random.Random(seed)
+
+        self.replies_sent = 0
+        self.replies_dropped = 0
+        self._pending = [] # heap of (due time, sequence, message)
+        self._sequence = itertools.count()
+        self._pending_condition = threading.Condition()
+        self._running = False
+
+        self.bus = None
+        self.notifier = None
+        self._sender = None
+        self.router = CANRouter()
+        for actuator in self.actuators.values():
+            actuator._transmit = self._schedule_reply
+            actuator._router = self.router
+            self.router.subscribe(actuator, actuator._can_filters())
+
+        if start: self.start()
+
+    @classmethod
+    def from_dict(cls, actuators: dict[int, str], **kwargs) -> 'ActuatorSimulator':
+        """Creates an ActuatorSimulator from a dictionary of CAN IDs and actuator types, using the same type strings as
+        :py:meth:`~epicallypowerful.actuation.ActuatorGroup.from_dict`. Types containing 'V3' use the V3 protocol, and
+        types ending in '-servo' use servo mode.
+
+        Args:
+            actuators (dict[int, str]): A dictionary where the key is the CAN ID and the value is the actuator type.
+            **kwargs: Additional arguments passed to :py:class:`ActuatorSimulator`.
+
+        Raises:
+            ValueError: If the actuator type is not recognized or supported.
+
+        Returns:
+            ActuatorSimulator: An ActuatorSimulator with the simulated actuators from the dictionary.
+        """
+        cubemars_types = cubemars()
+        robstride_types = robstrides()
+        sim_list = []
+        for can_id, actuator_type in actuators.items():
+            servo_mode = actuator_type.lower().endswith('-servo')
+            if servo_mode: actuator_type = actuator_type[:-len('-servo')]
+
+            if actuator_type in cubemars_types:
+                if servo_mode: sim_list.append(SimulatedCubeMarsServo(can_id, actuator_type))
+                elif 'v3' in actuator_type.lower(): sim_list.append(SimulatedCubeMarsV3(can_id, actuator_type))
+                else: sim_list.append(SimulatedCubeMars(can_id, actuator_type))
+            elif actuator_type in robstride_types and not servo_mode:
+                sim_list.append(SimulatedRobstride(can_id, actuator_type))
+            else:
+                raise ValueError(f"Invalid actuator type: {actuators[can_id]}")
+
+        return cls(sim_list, **kwargs)
+
+    @property
+    def can_args(self) -> dict:
+        """Arguments for :py:class:`~epicallypowerful.actuation.ActuatorGroup` to connect to this simulator."""
+        return {'bustype': self.interface, 'channel': self.channel}
+
+    def start(self) -> None:
+        """Opens the virtual bus and starts simulating. Does nothing if the simulator is already running.
+        """
+        if self._running: return
+        self.bus = can.Bus(channel=self.channel, interface=self.interface)
+        self._running = True
+        self._sender = threading.Thread(target=self._send_replies, name='ActuatorSimulatorSender', daemon=True)
+        self._sender.start()
+        self.notifier = can.Notifier(self.bus, [self.router])
+
+    def stop(self) -> None:
+        """Stops simulating and closes the virtual bus. Pending replies are discarded.
+        """
+        if not self._running: return
+        self.notifier.stop()
+        with self._pending_condition:
+            self._running = False
+            self._pending.clear()
+            self._pending_condition.notify()
+        self._sender.join()
+        self.bus.shutdown()
+
+    def __enter__(self) -> 'ActuatorSimulator':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def __getitem__(self, can_id: int) -> SimulatedActuator:
+        return self.actuators[can_id]
+
+    def _schedule_reply(self, msg: can.Message) -> None:
+        if self.drop_rate > 0 and self._rng.random() < self.drop_rate:
+            self.replies_dropped += 1
+            return
+
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter > 0 else 0.0)
+        with self._pending_condition:
+            heapq.heappush(self._pending, (time.perf_counter() + delay, next(self._sequence), msg))
+            self._pending_condition.notify()
+
+    def _send_replies(self) -> None:
+        while True:
+            with self._pending_condition:
+                while self._running and not self._pending:
+                    self._pending_condition.wait()
+                if not self._running: return
+
+                due, _, msg = self._pending[0]
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    self._pending_condition.wait(wait)
+                    continue
+                heapq.heappop(self._pending)
+
+            try:
+                self.bus.send(msg)
+                self.replies_sent += 1
+            except can.CanError:
+                self.replies_dropped += 1
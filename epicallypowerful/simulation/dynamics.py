@@ -0,0 +1,82 @@
+"""epically-powerful module for simulating actuators.
+
+This module contains the single-axis rigid body model used to move the
+simulated actuators in response to their commanded torques.
+"""
+
+import math
+from typing import Callable
+
+
+class RigidBodyDynamics():
+    """Single rotational degree of freedom driven by a motor torque, with viscous damping and Coulomb friction at the output.
+    The state is integrated with semi-implicit Euler in sub-steps of at most ``max_step`` seconds, so stiff position gains remain stable
+    regardless of how often the simulated actuator is commanded.
+
+    Args:
+        inertia (float, optional): Reflected inertia at the output in kg*m^2. Defaults to 0.01.
+        damping (float, optional): Viscous damping at the output in Nm*s/rad. Defaults to 0.05.
+        coulomb_friction (float, optional): Coulomb friction at the output in Nm. Defaults to 0.02.
+        position (float, optional): Initial position in radians. Defaults to 0.0.
+        velocity (float, optional): Initial velocity in radians per second. Defaults to 0.0.
+        max_step (float, optional): Maximum integration step in seconds. Defaults to 0.001.
+        max_interval (float, optional): Longest interval in seconds integrated in one update. Longer gaps between commands
+            (e.g. while the program is paused) are truncated to this. Defaults to 0.1.
+
+    Attributes:
+        position (float): Current position in radians.
+        velocity (float): Current velocity in radians per second.
+        torque (float): Motor torque applied during the last integration step in Nm.
+    """
+    def __init__(
+        self,
+        inertia: float=0.01,
+        damping: float=0.05,
+        coulomb_friction: float=0.02,
+        position: float=0.0,
+        velocity: float=0.0,
+        max_step: float=0.001,
+        max_interval: float=0.1,
+    ) -> None:
+        if inertia <= 0:
+            raise ValueError('inertia must be positive')
+        self.inertia = inertia
+        self.damping = damping
+        self.coulomb_friction = coulomb_friction
+        self.position = position
+        self.velocity = velocity
+        self.max_step = max_step
+        self.max_interval = max_interval
+        self.torque = 0.0
+
+    def step(self, dt: float, torque_fn: Callable[[float, float], float]) -> None:
+        """Advances the state by ``dt`` seconds.
+
+        Args:
+            dt (float): Time to advance in seconds.
+            torque_fn (Callable[[float, float], float]): Motor torque in Nm as a function of position and velocity, evaluated every sub-step.
+        """
+        dt = min(dt, self.max_interval)
+        if dt <= 0: return
+
+        n_steps = max(1, math.ceil(dt / self.max_step))
+        h = dt / n_steps
+        for _ in range(n_steps):
+            torque = torque_fn(self.position, self.velocity)
+            net_torque = torque - self.damping * self.velocity
+
+            if self.velocity != 0.0:
+                net_torque -= math.copysign(self.coulomb_friction, self.velocity)
+            elif abs(net_torque) <= self.coulomb_friction: # stiction
+                net_torque = 0.0
+            else:
+                net_torque -= math.copysign(self.coulomb_friction, net_torque)
+
+            new_velocity = self.velocity + net_torque / self.inertia * h
+            # Friction can stop the output but not reverse it within a step
+            if self.velocity != 0.0 and (new_velocity * self.velocity < 0) and abs(torque) <= self.coulomb_friction:
+                new_velocity = 0.0
+            self.velocity = new_velocity
+            self.position += self.velocity * h
+
+        self.torque = torque
@@ -0,0 +1,411 @@
+"""epically-powerful module for simulating actuators.
+
+This module contains the simulated actuators, which decode the same CAN
+commands as the real hardware, move a :py:class:`RigidBodyDynamics` model,
+and encode replies in each actuator's protocol. They are run on a virtual
+bus by the :py:class:`ActuatorSimulator`.
+"""
+
+import math
+import struct
+import time
+from typing import Callable, Optional
+
+import can
+
+from epicallypowerful.actuation.motor_data import get_motor_details
+import epicallypowerful.actuation.cubemars.cubemars_driver as tmd
+import epicallypowerful.actuation.cubemars.cubemars_servo as servo
+import epicallypowerful.actuation.robstride.robstride_driver as rsd
+from epicallypowerful.actuation.cubemars.cubemars_v3 import MIT_MODE_ID, ORIGIN_SET_ID
+from epicallypowerful.simulation.dynamics import RigidBodyDynamics
+
+RAD2DEG = 180.0 / math.pi
+DEG2RAD = math.pi / 180.0
+RADPERSEC2RPM = 60.0 / (2 * math.pi)
+
+CUBEMARS_REPLY_ID = 0x29 # Mode bits of the V3 and servo mode reply frames
+CUBEMARS_TEMPERATURE_OFFSET = 40 # MIT mode replies report temperature + 40 C
+
+
+def _clamp(value: float, min_val: float, max_val: float) -> float:
+    return min(max_val, max(min_val, value))
+
+
+def _uint_to_float(x: int, x_min: float, x_max: float, num_bits: int) -> float:
+    return x * (x_max - x_min) / ((1 << num_bits) - 1) + x_min
+
+
+def _int16(value: float) -> int:
+    return int(_clamp(round(value), -32768, 32767))
+
+
+class SimulatedActuator(can.Listener):
+    """Base class for the simulated actuators. Each subclass decodes the commands of one protocol, and encodes the replies the real actuator
+    would send. All simulated actuators share the same impedance control law, ``torque = kp * (position_des - position) + kd * (velocity_des - velocity) + torque_ff``,
+    saturated at the torque limits of the motor type and applied only while the actuator is enabled.
+
+    :meta private:
+
+    Args:
+        can_id (int): CAN ID of the simulated actuator.
+        motor_type (str): A string representing the type of motor, as in :py:data:`MOTOR_PARAMS`.
+        dynamics (RigidBodyDynamics, optional): The load driven by the actuator. Defaults to a light load with default parameters.
+        temperature (float, optional): Reported temperature in degrees Celsius. Defaults to 30.0.
+    """
+    def __init__(self, can_id: int, motor_type: str, dynamics: Optional[RigidBodyDynamics]=None, temperature: float=30.0) -> None:
+        super().__init__()
+        self.can_id = can_id
+        self.motor_type = motor_type
+        self.params = get_motor_details(motor_type)
+        self.dynamics = dynamics if dynamics is not None else RigidBodyDynamics()
+        self.temperature = temperature
+        self.enabled = False
+        self.error_code = 0
+        self.position_offset = 0.0
+
+        self.position_des = 0.0
+        self.velocity_des = 0.0
+        self.torque_ff = 0.0
+        self.kp = 0.0
+        self.kd = 0.0
+
+        self.commands_received = 0
+        self._last_update = None
+        self._transmit: Optional[Callable[[can.Message], None]] = None
+        self._router = None
+
+    @property
+    def position(self) -> float:
+        """Output position in radians relative to the zero set by the host."""
+        return self.dynamics.position - self.position_offset
+
+    @property
+    def velocity(self) -> float:
+        """Output velocity in radians per second."""
+        return self.dynamics.velocity
+
+    @property
+    def torque(self) -> float:
+        """Motor torque in Nm applied during the last integration step."""
+        return self.dynamics.torque
+
+    def _control_torque(self, position: float, velocity: float) -> float:
+        if not self.enabled: return 0.0
+        torque = (
+            self.kp * (self.position_des - (position - self.position_offset))
+            + self.kd * (self.velocity_des - velocity)
+            + self.torque_ff
+        )
+        return _clamp(torque, self.params['torque_limits'][0], self.params['torque_limits'][1])
+
+    def _set_impedance(self, position: float, velocity: float, torque: float, kp: float, kd: float) -> None:
+        self.position_des = position
+        self.velocity_des = velocity
+        self.torque_ff = torque
+        self.kp = kp
+        self.kd = kd
+
+    def update(self, now: Optional[float]=None) -> None:
+        """Integrates the dynamics up to ``now``.
+
+        Args:
+            now (float, optional): Current ``time.perf_counter()`` time. Defaults to the current time.
+        """
+        if now is None: now = time.perf_counter()
+        if self._last_update is not None:
+            self.dynamics.step(now - self._last_update, self._control_torque)
+        self._last_update = now
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """Integrates the dynamics to the arrival of a command, applies it, and transmits the replies.
+
+        :meta private:
+
+        Args:
+            msg (can.Message): Command received on the bus
+        """
+        if msg.is_error_frame or msg.is_remote_frame: return
+        self.update()
+        replies = self.handle_command(msg)
+        if replies is None: return
+        self.commands_received += 1
+        if self._transmit is not None:
+            for reply in replies:
+                self._transmit(reply)
+
+    def _can_filters(self) -> list[dict]:
+        """Filters for the commands addressed to this actuator, in the format of the ``can_filters`` of :py:class:`can.Bus`."""
+        raise NotImplementedError
+
+    def handle_command(self, msg: can.Message) -> Optional[list[can.Message]]:
+        """Applies a command and returns the replies to it.
+
+        Args:
+            msg (can.Message): Command addressed to this actuator.
+
+        Returns:
+            Optional[list[can.Message]]: Replies to transmit, or None if the frame is not a command for this actuator.
+        """
+        raise NotImplementedError
+
+
+class SimulatedCubeMars(SimulatedActuator):
+    """Simulated CubeMars actuator in MIT mode, as controlled by :py:class:`~epicallypowerful.actuation.CubeMars`.
+    Every command, including entering and exiting motor mode, is answered with a status frame.
+    """
+    def _can_filters(self) -> list[dict]:
+        return [{'can_id': self.can_id, 'can_mask': 0x7FF, 'extended': False}]
+
+    def handle_command(self, msg: can.Message) -> Optional[list[can.Message]]:
+        if msg.is_extended_id or msg.arbitration_id != self.can_id or len(msg.data) != 8: return None
+        data = list(msg.data)
+
+        if data == tmd.ENTER_MOTOR_MODE:
+            self._set_impedance(0, 0, 0, 0, 0)
+            self.enabled = True
+        elif data == tmd.EXIT_MOTOR_MODE:
+            self.enabled = False
+        elif data == tmd.ZERO_MOTOR_POSITION:
+            self.position_offset = self.dynamics.position
+        else:
+            p = self.params
+            self._set_impedance(
+                _uint_to_float(data[0] << 8 | data[1], *p['position_limits'], 16),
+                _uint_to_float(data[2] << 4 | data[3] >> 4, *p['velocity_limits'], 12),
+                _uint_to_float((data[6] & 0x0F) << 8 | data[7], *p['torque_limits'], 12),
+                _uint_to_float((data[3] & 0x0F) << 8 | data[4], *p['kp_limits'], 12),
+                _uint_to_float(data[5] << 4 | data[6] >> 4, *p['kd_limits'], 12),
+            )
+        return [self._status_message()]
+
+    def _status_message(self) -> can.Message:
+        p = self.params
+        position_uint16 = tmd._float_to_uint(self.position, p['position_limits'][0], p['position_limits'][1], 16)
+        velocity_uint12 = tmd._float_to_uint(self.velocity, p['velocity_limits'][0], p['velocity_limits'][1], 12)
+        torque_uint12 = tmd._float_to_uint(self.torque, p['torque_limits'][0], p['torque_limits'][1], 12)
+        data = [
+            self.can_id,
+            position_uint16 >> 8,
+            position_uint16 & 0xFF,
+            velocity_uint12 >> 4,
+            ((velocity_uint12 & 0x0F) << 4) | (torque_uint12 >> 8),
+            torque_uint12 & 0xFF,
+            int(_clamp(self.temperature + CUBEMARS_TEMPERATURE_OFFSET, 0, 255)),
+            self.error_code,
+        ]
+        return can.Message(arbitration_id=0, data=data, is_extended_id=False)
+
+
+class _SimulatedCubeMarsStatus(SimulatedActuator):
+    """Shared status reply of the V3 and servo mode CubeMars protocols. Current is reported as torque divided by ``torque_constant``.
+
+    :meta private:
+    """
+    def __init__(self, can_id: int, motor_type: str, dynamics: Optional[RigidBodyDynamics]=None, temperature: float=30.0, torque_constant: float=1.0) -> None:
+        super().__init__(can_id, motor_type, dynamics, temperature)
+        self.torque_constant = torque_constant
+        if self.params.get('pole_pairs') is None or self.params.get('gear_ratio') is None:
+            self.erpm_to_rpm = 1
+        else:
+            self.erpm_to_rpm = 1 / (self.params['pole_pairs'] * self.params['gear_ratio'])
+
+    def _status_message(self) -> can.Message:
+        erpm = self.velocity * RADPERSEC2RPM / self.erpm_to_rpm
+        data = b''.join([
+            _int16(self.position * RAD2DEG * 10).to_bytes(2, 'big', signed=True), # [0.1 deg]
+            _int16(erpm / 10).to_bytes(2, 'big', signed=True), # [10 ERPM]
+            _int16(self.torque / self.torque_constant * 100).to_bytes(2, 'big', signed=True), # [0.01 A]
+            bytes([int(_clamp(self.temperature, -128, 127)) & 0xFF, self.error_code]),
+        ])
+        return can.Message(arbitration_id=(CUBEMARS_REPLY_ID << 8) | self.can_id, data=data, is_extended_id=True)
+
+
+class SimulatedCubeMarsV3(_SimulatedCubeMarsStatus):
+    """Simulated V3 CubeMars actuator in MIT mode, as controlled by :py:class:`~epicallypowerful.actuation.cubemars.CubeMarsV3`.
+    V3 actuators have no separate enter motor mode command, so the first MIT command enables the actuator.
+
+    Args:
+        torque_constant (float, optional): Torque per unit of reported current in Nm/A. The default of 1.0 reports torque directly,
+            matching how :py:class:`~epicallypowerful.actuation.cubemars.CubeMarsV3` reads the current field. Defaults to 1.0.
+    """
+    def _can_filters(self) -> list[dict]:
+        return [
+            {'can_id': (MIT_MODE_ID << 8) | self.can_id, 'can_mask': 0x1FFFFFFF, 'extended': True},
+            {'can_id': (ORIGIN_SET_ID << 8) | self.can_id, 'can_mask': 0x1FFFFFFF, 'extended': True},
+        ]
+
+    def handle_command(self, msg: can.Message) -> Optional[list[can.Message]]:
+        if (not msg.is_extended_id) or (msg.arbitration_id & 0xFF) != self.can_id: return None
+        mode = msg.arbitration_id >> 8
+        data = msg.data
+
+        if mode == MIT_MODE_ID and len(data) == 8:
+            p = self.params
+            self._set_impedance(
+                _uint_to_float(data[3] << 8 | data[4], *p['position_limits'], 16),
+                _uint_to_float(data[5] << 4 | data[6] >> 4, *p['velocity_limits'], 12),
+                _uint_to_float((data[6] & 0x0F) << 8 | data[7], *p['torque_limits'], 12),
+                _uint_to_float(data[0] << 4 | data[1] >> 4, *p['kp_limits'], 12),
+                _uint_to_float((data[1] & 0x0F) << 8 | data[2], *p['kd_limits'], 12),
+            )
+            self.enabled = True
+        elif mode == ORIGIN_SET_ID:
+            self.position_offset = self.dynamics.position
+        else:
+            return None
+        return [self._status_message()]
+
+
+class SimulatedCubeMarsServo(_SimulatedCubeMarsStatus):
+    """Simulated CubeMars actuator in servo mode, as controlled by :py:class:`~epicallypowerful.actuation.CubeMarsServo`.
+    The internal servo loops are approximated with the shared impedance law: current and duty cycle commands set a feedforward torque,
+    velocity commands set a damping loop with gain ``velocity_gain``, and position commands set a PD loop with ``position_gains``.
+
+    Args:
+        torque_constant (float, optional): Torque per Ampere of commanded current in Nm/A. Defaults to 1.0.
+        position_gains (tuple[float, float], optional): (kp, kd) of the simulated position loop. Defaults to (50.0, 1.0).
+        velocity_gain (float, optional): Gain of the simulated velocity loop in Nm*s/rad. Defaults to 1.0.
+    """
+    def __init__(
+        self,
+        can_id: int,
+        motor_type: str,
+        dynamics: Optional[RigidBodyDynamics]=None,
+        temperature: float=30.0,
+        torque_constant: float=1.0,
+        position_gains: tuple[float, float]=(50.0, 1.0),
+        velocity_gain: float=1.0,
+    ) -> None:
+        super().__init__(can_id, motor_type, dynamics, temperature, torque_constant)
+        self.position_gains = position_gains
+        self.velocity_gain = velocity_gain
+
+    def _can_filters(self) -> list[dict]:
+        return [
+            {'can_id': (mode << 8) | self.can_id, 'can_mask': 0x1FFFFFFF, 'extended': True}
+            for mode in range(servo.DUTY_CYCLE_MODE, servo.POSITION_VELOCITY_LOOP_MODE + 1)
+        ]
+
+    def handle_command(self, msg: can.Message) -> Optional[list[can.Message]]:
+        if (not msg.is_extended_id) or (msg.arbitration_id & 0xFF) != self.can_id or len(msg.data) < 4: return None
+        mode = msg.arbitration_id >> 8
+        value = int.from_bytes(msg.data[0:4], 'big', signed=True)
+
+        if mode == servo.DUTY_CYCLE_MODE:
+            self._set_impedance(0, 0, value / 100000 * self.params['torque_limits'][1], 0, 0)
+        elif mode == servo.CURRENT_LOOP_MODE:
+            self._set_impedance(0, 0, value / 1000 * self.torque_constant, 0, 0)
+        elif mode == servo.CURRENT_BRAKE_MODE:
+            self._set_impedance(0, 0, 0, 0, abs(value / 1000 * self.torque_constant))
+        elif mode == servo.VELOCITY_MODE:
+            self._set_impedance(0, value * self.erpm_to_rpm / RADPERSEC2RPM, 0, 0, self.velocity_gain)
+        elif mode in (servo.POSITION_MODE, servo.POSITION_VELOCITY_LOOP_MODE):
+            self._set_impedance(value / 10000 * DEG2RAD, 0, 0, *self.position_gains)
+        elif mode == servo.SET_ORIGIN_MODE:
+            self.position_offset = self.dynamics.position
+        else:
+            return None
+
+        self.enabled = True
+        return [self._status_message()]
+
+
+class SimulatedRobstride(SimulatedActuator):
+    """Simulated Robstride actuator, as controlled by :py:class:`~epicallypowerful.actuation.Robstride`. Supports motion control, enabling and disabling,
+    zeroing, device ID queries and changes, and parameter reads and writes. Parameters are encoded as little-endian floats, as on the hardware.
+
+    Args:
+        unique_id (int, optional): 64-bit hardware ID returned by device ID queries. Defaults to a value derived from the CAN ID.
+    """
+    def __init__(self, can_id: int, motor_type: str, dynamics: Optional[RigidBodyDynamics]=None, temperature: float=30.0, unique_id: Optional[int]=None) -> None:
+        super().__init__(can_id, motor_type, dynamics, temperature)
+        self.unique_id = unique_id if unique_id is not None else (0x5253000000000000 | can_id)
+        self.parameters = {
+            rsd.IDX_RUN: 0,
+            rsd.IDX_TRQ_LIM: rsd.T_MAX[motor_type],
+            rsd.IDX_SPD_LIM: rsd.V_MAX[motor_type],
+            rsd.IDX_BUS_VOLT: 48.0,
+        }
+
+    def _can_filters(self) -> list[dict]:
+        return [{'can_id': self.can_id, 'can_mask': 0xFF, 'extended': True}]
+
+    def handle_command(self, msg: can.Message) -> Optional[list[can.Message]]:
+        if (not msg.is_extended_id) or (msg.arbitration_id & 0xFF) != self.can_id: return None
+        command = (msg.arbitration_id >> 24) & 0x1F
+        data_field = (msg.arbitration_id >> 8) & 0xFFFF
+        data = msg.data
+
+        if command == rsd.CMD_GET_DEVICE_ID:
+            return [self._identity_message()]
+        elif command == rsd.CMD_SET_MOTION:
+            m = self.motor_type
+            self._set_impedance(
+                rsd.uint_to_float(data[0] << 8 | data[1], rsd.P_MIN[m], rsd.P_MAX[m], rsd.N_BITS),
+                rsd.uint_to_float(data[2] << 8 | data[3], rsd.V_MIN[m], rsd.V_MAX[m], rsd.N_BITS),
+                rsd.uint_to_float(data_field, rsd.T_MIN[m], rsd.T_MAX[m], rsd.N_BITS),
+                rsd.uint_to_float(data[4] << 8 | data[5], rsd.KP_MIN, rsd.KP_MAX, rsd.N_BITS),
+                rsd.uint_to_float(data[6] << 8 | data[7], rsd.KD_MIN, rsd.KD_MAX, rsd.N_BITS),
+            )
+        elif command == rsd.CMD_ENABLE_MOTION:
+            self.enabled = True
+        elif command == rsd.CMD_DISABLE_MOTION:
+            self.enabled = False
+            if data and data[0] == 1: self.error_code = 0
+        elif command == rsd.CMD_SET_ZERO:
+            self.position_offset = self.dynamics.position
+        elif command == rsd.CMD_CHANGE_DEVICE_ID:
+            self._change_id(data_field >> 8)
+            return [self._identity_message()]
+        elif command == rsd.CMD_READ_PARAM:
+            return [self._param_message((data[1] << 8) | data[0])]
+        elif command == rsd.CMD_WRITE_PARAM:
+            param_index = (data[1] << 8) | data[0]
+            if rsd.PARAM_NUM_BYTES.get(param_index) == 1: self.parameters[param_index] = data[4]
+            else: self.parameters[param_index] = struct.unpack('<f', bytes(data[4:8]))[0]
+        else:
+            return None
+
+        self.parameters[rsd.IDX_RUN] = int(self.enabled)
+        return [self._motion_message()]
+
+    def _change_id(self, new_id: int) -> None:
+        self.can_id = new_id
+        if self._router is not None:
+            self._router.subscribe(self, self._can_filters())
+
+    def _identity_message(self) -> can.Message:
+        return can.Message(
+            arbitration_id=rsd.build_arbitration_id(rsd.RESPONSE_IDENTITY_CHECK_FLAG, rsd.RESPONSE_IDENTITY, self.can_id),
+            data=self.unique_id.to_bytes(8, 'big'),
+            is_extended_id=True,
+        )
+
+    def _param_message(self, param_index: int) -> can.Message:
+        if param_index == rsd.IDX_MECH_POS: value = self.position
+        elif param_index == rsd.IDX_MECH_VEL: value = self.velocity
+        else: value = self.parameters.get(param_index, 0.0)
+
+        if rsd.PARAM_NUM_BYTES.get(param_index) == 1: payload = bytes([int(value), 0, 0, 0])
+        elif rsd.PARAM_NUM_BYTES.get(param_index) == 2: payload = int(value).to_bytes(2, 'little', signed=True) + bytes(2)
+        else: payload = struct.pack('<f', value)
+
+        return can.Message(
+            arbitration_id=rsd.build_arbitration_id(rsd.MASTER_CAN_ID, rsd.RESPONSE_PARAM, self.can_id),
+            data=bytes([param_index & 0xFF, param_index >> 8, 0, 0]) + payload,
+            is_extended_id=True,
+        )
+
+    def _motion_message(self) -> can.Message:
+        m = self.motor_type
+        mode = rsd.MODE_STATUS_RUN if self.enabled else rsd.MODE_STATUS_RESET
+        position = rsd.float_to_uint(self.position, rsd.P_MIN[m], rsd.P_MAX[m], rsd.N_BITS)
+        velocity = rsd.float_to_uint(self.velocity, rsd.V_MIN[m], rsd.V_MAX[m], rsd.N_BITS)
+        torque = rsd.float_to_uint(self.torque, rsd.T_MIN[m], rsd.T_MAX[m], rsd.N_BITS)
+        temperature = int(_clamp(self.temperature * 10, 0, 0xFFFF))
+        return can.Message(
+            arbitration_id=rsd.build_arbitration_id(rsd.MASTER_CAN_ID, rsd.RESPONSE_MOTION, (mode << 14) | self.can_id),
+            data=[position >> 8, position & 0xFF, velocity >> 8, velocity & 0xFF, torque >> 8, torque & 0xFF, temperature >> 8, temperature & 0xFF],
+            is_extended_id=True,
+        )
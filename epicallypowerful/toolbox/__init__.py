@@ -1,11 +1,45 @@
-# Import Management for epicallypowerful toolbox modules
-from epicallypowerful.toolbox.clocking import LoopTimer, TimedLoop
-from epicallypowerful.toolbox.data_recorder import DataRecorder
-from epicallypowerful.toolbox.jetson_performance import increase_jetson_performance
-from epicallypowerful.toolbox.visualization import PlotJugglerUDPClient
+# Import Management for epicallypowerful toolbox modules. Tools are loaded
+# on first access to keep `import epicallypowerful` fast.
+from typing import TYPE_CHECKING
+from epicallypowerful._lazy import attach_lazy_loader
 
+if TYPE_CHECKING:
+    from .can_bus import bring_up_can_interface, get_can_interface_state, acquire_can_bus, release_can_bus
+    from .can_capture import CANCapture, CANReplay, read_capture
+    from .clocking import LoopTimer, TimedLoop
+    from .data_recorder import DataRecorder
+    from .diagnostics import RateLimitedReporter, add_queued_handler
+    from .events import FreshStateTrigger
+    from .jetson_performance import increase_jetson_performance
+    from .shared_state import SharedStateRing, CommandMailbox
+    from .timebase import ClockMapper, can_receive_time
+    from .visualization import PlotJugglerUDPClient
 
-from .clocking import LoopTimer, TimedLoop
-from .data_recorder import DataRecorder
-from .jetson_performance import increase_jetson_performance
-from .visualization import PlotJugglerUDPClient
\ No newline at end of file
+_LAZY_ATTRIBUTES = {
+    'bring_up_can_interface': '.can_bus',
+    'get_can_interface_state': '.can_bus',
+    'acquire_can_bus': '.can_bus',
+    'release_can_bus': '.can_bus',
+    'CANCapture': '.can_capture',
+    'CANReplay': '.can_capture',
+    'read_capture': '.can_capture',
+    'LoopTimer': '.clocking',
+    'TimedLoop': '.clocking',
+    'DataRecorder': '.data_recorder',
+    'RateLimitedReporter': '.diagnostics',
+    'add_queued_handler': '.diagnostics',
+    'FreshStateTrigger': '.events',
+    'increase_jetson_performance': '.jetson_performance',
+    'SharedStateRing': '.shared_state',
+    'CommandMailbox': '.shared_state',
+    'ClockMapper': '.timebase',
+    'can_receive_time': '.timebase',
+    'PlotJugglerUDPClient': '.visualization',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES.keys())
+
+__getattr__, __dir__ = attach_lazy_loader(
+    __name__, globals(), _LAZY_ATTRIBUTES,
+    submodules=['can_bus', 'can_capture', 'cli', 'clocking', 'data_recorder', 'diagnostics', 'events', 'jetson_performance', 'robstride_setup', 'robstride_setup_gui', 'shared_state', 'timebase', 'visualization'],
+)
@@ -1,7 +1,16 @@
 # from libc.time cimport timespec, clock_gettime, CLOCK_MONOTONIC, clock_nanosleep, TIMER_ABSTIME
 from libc.stdint cimport int64_t
 from posix.time cimport timespec, clock_gettime, CLOCK_MONOTONIC, clock_nanosleep, TIMER_ABSTIME
-from libc.stdio cimport printf
+
+from epicallypowerful.toolbox.diagnostics import RateLimitedReporter
+
+cdef object _diagnostics = None
+
+cdef _report_slow(int64_t late_ns):
+    # Slow iterations tend to come in runs, so they are reported at most once per second from a background thread
+    global _diagnostics
+    if _diagnostics is None: _diagnostics = RateLimitedReporter()
+    _diagnostics.report('slow loop', f"WARNING: Loop slower than desired ({late_ns / 1e6:.3f} ms behind schedule)")
 
 cdef inline int64_t to_nsec(timespec ts):
     return (ts.tv_sec * 1_000_000_000) + ts.tv_nsec
@@ -57,7 +66,7 @@ cdef class TimedLoopC:
 
         if now_nsec > sched_nsec:
             if (now_nsec - sched_nsec) > self.tol_ns: # If we're behind by more than the tolerance, we are slow
-                if self.verbose: printf("WARNING: Loop slower than desired\n")
+                if self.verbose: _report_slow(now_nsec - sched_nsec)
                 self.slow = True
 
             if (now_nsec > (sched_nsec + self.period_ns)):  # If we're are ahead by a full period, reset the schedule
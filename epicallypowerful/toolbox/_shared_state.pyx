@@ -0,0 +1,93 @@
+# Compiled seqlock for epicallypowerful.toolbox.shared_state, with the same interface as its Python _PyRingMemory.
+# The sequence numbers and the record count are read and written with acquire/release atomics, so that on weakly ordered
+# CPUs (e.g. the ARM cores of a Raspberry Pi or Jetson) a reader never sees a sequence number or count before the record
+# it guards. The record itself is copied with plain loads and stores, as usual for a seqlock.
+from libc.stdint cimport uint64_t, uintptr_t
+from libc.string cimport memcpy
+
+import numpy as np
+
+cdef extern from *:
+    """
+    #include <stdint.h>
+    static inline uint64_t ep_load_acquire(const uint64_t* p) { return __atomic_load_n(p, __ATOMIC_ACQUIRE); }
+    static inline uint64_t ep_load_relaxed(const uint64_t* p) { return __atomic_load_n(p, __ATOMIC_RELAXED); }
+    static inline void ep_store_release(uint64_t* p, uint64_t v) { __atomic_store_n(p, v, __ATOMIC_RELEASE); }
+    static inline void ep_store_relaxed(uint64_t* p, uint64_t v) { __atomic_store_n(p, v, __ATOMIC_RELAXED); }
+    static inline void ep_fence_release(void) { __atomic_thread_fence(__ATOMIC_RELEASE); }
+    static inline void ep_fence_acquire(void) { __atomic_thread_fence(__ATOMIC_ACQUIRE); }
+    """
+    uint64_t ep_load_acquire(const uint64_t* p) nogil
+    uint64_t ep_load_relaxed(const uint64_t* p) nogil
+    void ep_store_release(uint64_t* p, uint64_t v) nogil
+    void ep_store_relaxed(uint64_t* p, uint64_t v) nogil
+    void ep_fence_release() nogil
+    void ep_fence_acquire() nogil
+
+
+cdef class RingMemory:
+    cdef unsigned char[::1] _buf # keeps the shared memory exported while the pointers below are in use
+    cdef uint64_t* head
+    cdef uint64_t* seqs
+    cdef double* records
+    cdef readonly Py_ssize_t capacity
+    cdef readonly Py_ssize_t n_fields
+
+    def __init__(self, buf, Py_ssize_t offset, Py_ssize_t capacity, Py_ssize_t n_fields):
+        self._buf = buf
+        cdef unsigned char* base = &self._buf[0]
+        if (<uintptr_t>(base + offset)) % 8: raise ValueError('ring memory must be 8 byte aligned')
+        self.head = <uint64_t*>(base + offset)
+        self.seqs = self.head + 1
+        self.records = <double*>(self.seqs + capacity)
+        self.capacity = capacity
+        self.n_fields = n_fields
+
+    cpdef uint64_t count(self):
+        return ep_load_acquire(self.head)
+
+    cpdef void publish(self, const double[::1] values) except *:
+        if values.shape[0] != self.n_fields: raise ValueError(f'expected {self.n_fields} values, got {values.shape[0]}')
+        cdef uint64_t n = ep_load_relaxed(self.head) # only this process writes the count
+        cdef Py_ssize_t slot = n % self.capacity
+        ep_store_relaxed(&self.seqs[slot], 2 * n + 1) # odd while being written
+        ep_fence_release() # the odd sequence number becomes visible before any of the record
+        memcpy(&self.records[slot * self.n_fields], &values[0], self.n_fields * sizeof(double))
+        ep_store_release(&self.seqs[slot], 2 * n + 2) # the record becomes visible before the even sequence number
+        ep_store_release(self.head, n + 1)
+
+    cdef bint _copy(self, uint64_t n, double* out):
+        # Copies record number n, returning False if it was overwritten or is being written
+        cdef Py_ssize_t slot = n % self.capacity
+        cdef uint64_t expected = 2 * n + 2
+        if ep_load_acquire(&self.seqs[slot]) != expected: return False
+        memcpy(out, &self.records[slot * self.n_fields], self.n_fields * sizeof(double))
+        ep_fence_acquire() # the copy completes before the sequence number is checked again
+        return ep_load_relaxed(&self.seqs[slot]) == expected
+
+    cpdef uint64_t read_latest(self, double[::1] out, int retries) except? 0:
+        if out.shape[0] != self.n_fields: raise ValueError(f'expected an array of {self.n_fields} values, got {out.shape[0]}')
+        cdef uint64_t count
+        for _ in range(retries):
+            count = ep_load_acquire(self.head)
+            if count == 0: return 0
+            if self._copy(count - 1, &out[0]): return count
+        return 0
+
+    def read_since(self, uint64_t count):
+        cdef uint64_t head = ep_load_acquire(self.head)
+        cdef uint64_t start = count
+        if head >= <uint64_t>self.capacity and head - self.capacity + 1 > start: start = head - self.capacity + 1 # the slot after the newest record may be being written
+        if start >= head: return np.empty((0, self.n_fields)), head
+        out = np.empty((head - start, self.n_fields))
+        cdef double[:, ::1] view = out
+        cdef Py_ssize_t valid = 0
+        cdef uint64_t n
+        for n in range(start, head):
+            if self._copy(n, &view[valid, 0]): valid += 1
+        return out[:valid], head
+
+    def release(self):
+        self.head = self.seqs = NULL
+        self.records = NULL
+        self._buf = None
@@ -0,0 +1,346 @@
+"""epically-powerful module for managing CAN interfaces.
+
+This module contains the commands for bringing up the SocketCAN interface
+shared by the actuators and the OpenIMUs. Instead of unloading and reloading
+the CAN kernel modules every time a device group is created, the interface
+state is read from sysfs and netlink and the interface is only reset when it
+is down, misconfigured, or in an error state. This means an ``ActuatorGroup``
+and an ``OpenIMUs`` instance can both be created without tearing down the
+interface the other is already using.
+
+It also contains the process-wide bus registry. Every consumer of a channel
+shares one :py:class:`can.Bus`, one receive thread, and one routing table
+that dispatches each frame only to the listeners subscribed to its ID.
+"""
+
+import os
+import json
+import subprocess
+import threading
+from typing import Optional
+
+import can
+
+from epicallypowerful.toolbox.jetson_performance import _rpi_or_jetson
+
+DEFAULT_CHANNEL = 'can0'
+DEFAULT_BITRATE = 1000000 # [bit/s]
+DEFAULT_TXQUEUELEN = 1000
+
+# Kernel modules needed for the Jetson's built-in CAN controller
+JETSON_CAN_MODULES = ('can', 'can_raw', 'mttcan')
+
+# Controller states which require the interface to be restarted before it can be used again
+CAN_RESET_STATES = ('BUS-OFF', 'ERROR-PASSIVE', 'STOPPED')
+
+# Error counter level at which the controller leaves ERROR-ACTIVE (ISO 11898 error warning limit is 96, error passive is 128)
+ERROR_COUNTER_RESET_LEVEL = 128
+
+_SYSFS_NET = '/sys/class/net'
+_SYSFS_MODULES = '/sys/module'
+_IFF_UP = 0x1
+
+_interface_lock = threading.Lock()
+
+
+def _read_sysfs(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _run(command: list[str], verbose: bool=False) -> bool:
+    if verbose:
+        print(' '.join(command))
+    try:
+        return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5.0).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def get_can_interface_state(channel: str=DEFAULT_CHANNEL) -> Optional[dict]:
+    """Reads the current state of a CAN interface without modifying it. Link flags and queue length are read from sysfs,
+    while the CAN-specific state (controller state, bitrate, and error counters) is read from netlink through ``ip -details -json``.
+
+    Args:
+        channel (str, optional): Name of the CAN interface. Defaults to 'can0'.
+
+    Returns:
+        Optional[dict]: None if the interface does not exist. Otherwise a dictionary with keys ``up`` (bool), ``txqueuelen`` (int),
+            ``state`` (str, e.g. 'ERROR-ACTIVE' or 'BUS-OFF'), ``bitrate`` (int), ``tx_errors`` (int), and ``rx_errors`` (int).
+            CAN-specific values are None if they could not be read.
+    """
+    sysfs_path = os.path.join(_SYSFS_NET, channel)
+    if not os.path.isdir(sysfs_path):
+        return None
+
+    flags = _read_sysfs(os.path.join(sysfs_path, 'flags'))
+    txqueuelen = _read_sysfs(os.path.join(sysfs_path, 'tx_queue_len'))
+    state = {
+        'up': bool(int(flags, 16) & _IFF_UP) if flags else False,
+        'txqueuelen': int(txqueuelen) if txqueuelen else None,
+        'state': None,
+        'bitrate': None,
+        'tx_errors': None,
+        'rx_errors': None,
+    }
+
+    try:
+        result = subprocess.run(
+            ['ip', '-details', '-json', 'link', 'show', channel],
+            capture_output=True, text=True, timeout=1.0,
+        )
+        link_info = json.loads(result.stdout)[0].get('linkinfo', {}).get('info_data', {})
+    except (OSError, subprocess.TimeoutExpired, ValueError, IndexError):
+        return state
+
+    state['state'] = link_info.get('state')
+    state['bitrate'] = link_info.get('bittiming', {}).get('bitrate')
+    state['tx_errors'] = link_info.get('berr_counter', {}).get('tx')
+    state['rx_errors'] = link_info.get('berr_counter', {}).get('rx')
+    return state
+
+
+def _needs_reset(state: dict, bitrate: int, txqueuelen: int) -> bool:
+    if not state['up']:
+        return True
+    if state['state'] in CAN_RESET_STATES:
+        return True
+    if (state['tx_errors'] or 0) >= ERROR_COUNTER_RESET_LEVEL or (state['rx_errors'] or 0) >= ERROR_COUNTER_RESET_LEVEL:
+        return True
+    if state['bitrate'] is not None and state['bitrate'] != bitrate:
+        return True
+    if state['txqueuelen'] is not None and state['txqueuelen'] != txqueuelen:
+        return True
+    return False
+
+
+def _reload_jetson_modules(verbose: bool=False) -> None:
+    for module in reversed(JETSON_CAN_MODULES):
+        _run(['sudo', 'rmmod', module], verbose)
+    for module in JETSON_CAN_MODULES:
+        _run(['sudo', 'modprobe', module], verbose)
+
+
+def bring_up_can_interface(
+    channel: str=DEFAULT_CHANNEL,
+    bitrate: int=DEFAULT_BITRATE,
+    txqueuelen: int=DEFAULT_TXQUEUELEN,
+    force_reset: bool=False,
+    verbose: bool=False,
+) -> bool:
+    """Makes sure a SocketCAN interface is up and healthy, resetting it only if required. This is safe to call from every CAN
+    consumer; if the interface is already up with the right settings and the controller is error-active, nothing is changed.
+
+    The interface is restarted (down, then up) if it is down, in a bus-off or error-passive state, has high error counters, or has
+    a different bitrate or queue length than requested. On a Jetson, missing CAN kernel modules are loaded, and ``force_reset``
+    additionally reloads the kernel modules to clear a stuck driver. Note, this is only applicable for Jetson and Raspberry Pi devices,
+    and will pass and return False otherwise.
+
+    Args:
+        channel (str, optional): Name of the CAN interface. Defaults to 'can0'.
+        bitrate (int, optional): Bitrate of the bus in bits per second. Defaults to 1000000.
+        txqueuelen (int, optional): Transmit queue length of the interface. Defaults to 1000.
+        force_reset (bool, optional): Whether to reset the interface even if it is healthy. Defaults to False.
+        verbose (bool, optional): If True, print the commands that are run. Defaults to False.
+
+    Returns:
+        bool: True if the interface is up and error-active after this call, False otherwise.
+    """
+    device = _rpi_or_jetson()
+    if device is None:
+        if verbose:
+            print("Not running on a Jetson or Raspberry Pi device, skipping CAN interface bring-up")
+        return False
+
+    with _interface_lock:
+        if device == 'jetson':
+            if force_reset:
+                _run(['sudo', 'ip', 'link', 'set', channel, 'down'], verbose)
+                _reload_jetson_modules(verbose)
+            else:
+                for module in JETSON_CAN_MODULES:
+                    if not os.path.isdir(os.path.join(_SYSFS_MODULES, module)):
+                        _run(['sudo', 'modprobe', module], verbose)
+
+        state = get_can_interface_state(channel)
+        if state is None:
+            if verbose:
+                print(f"CAN interface {channel} does not exist")
+            return False
+
+        if force_reset or _needs_reset(state, bitrate, txqueuelen):
+            _run(['sudo', 'ip', 'link', 'set', channel, 'down'], verbose)
+            _run(['sudo', 'ip', 'link', 'set', channel, 'txqueuelen', str(txqueuelen), 'up', 'type', 'can', 'bitrate', str(bitrate)], verbose)
+            state = get_can_interface_state(channel)
+        elif verbose:
+            print(f"CAN interface {channel} is already up, skipping reset")
+
+        return state is not None and not _needs_reset(state, bitrate, txqueuelen)
+
+
+def _filter_key(can_filter: dict) -> tuple:
+    extended = can_filter.get('extended', False)
+    mask = can_filter.get('can_mask', 0x1FFFFFFF if extended else 0x7FF)
+    return (mask, extended), can_filter['can_id'] & mask
+
+
+class CANRouter(can.Listener):
+    """Dispatches frames received on a shared bus to the listeners subscribed to them. Subscriptions use python-can style filters,
+    and are grouped by mask so each frame is routed with one dictionary lookup per distinct mask rather than one call per listener.
+    Listeners subscribed without filters receive every frame.
+
+    :meta private:
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        # (routes, catch_all) is rebuilt on every change and swapped in whole, so the receive thread never sees a partial table
+        self._table = ([], ())
+
+    def subscribe(self, listener: can.Listener, filters: Optional[list[dict]]=None) -> None:
+        """Subscribes a listener to the frames matching any of the filters.
+
+        Args:
+            listener (can.Listener): Listener whose ``on_message_received`` is called for matching frames.
+            filters (Optional[list[dict]], optional): Filters as dictionaries with keys ``can_id``, ``can_mask``, and ``extended``,
+                like the ``can_filters`` of :py:class:`can.Bus`. None receives every frame. Defaults to None.
+        """
+        with self._lock:
+            self._subscriptions[listener] = None if filters is None else list(filters)
+            self._rebuild()
+
+    def unsubscribe(self, listener: can.Listener) -> None:
+        """Removes a listener from the routing table.
+
+        Args:
+            listener (can.Listener): Listener to remove.
+        """
+        with self._lock:
+            self._subscriptions.pop(listener, None)
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        routes = {}
+        catch_all = []
+        for listener, filters in self._subscriptions.items():
+            if filters is None:
+                catch_all.append(listener)
+                continue
+            for can_filter in filters:
+                group, masked_id = _filter_key(can_filter)
+                matches = routes.setdefault(group, {}).setdefault(masked_id, [])
+                if listener not in matches:
+                    matches.append(listener)
+        self._table = ([(mask, extended, ids) for (mask, extended), ids in routes.items()], tuple(catch_all))
+
+    def on_message_received(self, msg: can.Message) -> None:
+        routes, catch_all = self._table
+        for listener in catch_all:
+            listener.on_message_received(msg)
+        if msg.is_error_frame: return
+
+        matched = None
+        for mask, extended, ids in routes:
+            if msg.is_extended_id != extended: continue
+            listeners = ids.get(msg.arbitration_id & mask)
+            if listeners is None: continue
+            if matched is None: matched = listeners
+            else: matched = list(dict.fromkeys(matched + listeners))
+
+        if matched is not None:
+            for listener in matched:
+                listener.on_message_received(msg)
+
+
+class SharedCANBus():
+    """A CAN bus shared by every consumer of one channel in the process, with a single receive thread and routing table.
+    These should be created with :py:func:`acquire_can_bus` rather than directly.
+
+    Attributes:
+        bus (can.Bus): The underlying bus, used for sending.
+        notifier (can.Notifier): The notifier running the receive thread.
+        router (CANRouter): The routing table dispatching received frames.
+    """
+    def __init__(self, channel: str, interface: str, **kwargs) -> None:
+        self.channel = channel
+        self.interface = interface
+        self.bus = can.Bus(channel=channel, interface=interface, **kwargs)
+        self.router = CANRouter()
+        self.notifier = can.Notifier(self.bus, [self.router])
+        self._users = 0
+
+    def subscribe(self, listener: can.Listener, filters: Optional[list[dict]]=None) -> None:
+        """Subscribes a listener to frames on this bus, see :py:meth:`CANRouter.subscribe`.
+
+        Args:
+            listener (can.Listener): Listener whose ``on_message_received`` is called for matching frames.
+            filters (Optional[list[dict]], optional): Filters for the frames to receive. None receives every frame. Defaults to None.
+        """
+        self.router.subscribe(listener, filters)
+
+    def unsubscribe(self, listener: can.Listener) -> None:
+        """Removes a listener from this bus.
+
+        Args:
+            listener (can.Listener): Listener to remove.
+        """
+        self.router.unsubscribe(listener)
+
+    def _shutdown(self) -> None:
+        self.notifier.stop()
+        self.bus.shutdown()
+
+
+_bus_registry_lock = threading.Lock()
+_bus_registry = {}
+
+
+def acquire_can_bus(channel: str=DEFAULT_CHANNEL, interface: str='socketcan', **kwargs) -> SharedCANBus:
+    """Returns the bus for a channel, opening it if this is the first user in the process. Each call should be paired
+    with a call to :py:func:`release_can_bus` once the bus is no longer needed.
+
+    Example:
+        .. code-block:: python
+
+
+            from epicallypowerful.toolbox.can_bus import acquire_can_bus, release_can_bus
+
+            shared_bus = acquire_can_bus('can0')
+            shared_bus.subscribe(listener, [{'can_id': 0x12, 'can_mask': 0x7FF, 'extended': False}])
+            shared_bus.bus.send(msg)
+            release_can_bus(shared_bus)
+
+    Args:
+        channel (str, optional): Name of the CAN interface. Defaults to 'can0'.
+        interface (str, optional): python-can interface to use. Defaults to 'socketcan'.
+        **kwargs: Additional arguments passed to :py:class:`can.Bus` when the bus is first opened.
+
+    Returns:
+        SharedCANBus: The shared bus for the channel.
+    """
+    with _bus_registry_lock:
+        shared_bus = _bus_registry.get((interface, channel))
+        if shared_bus is None:
+            shared_bus = SharedCANBus(channel, interface, **kwargs)
+            _bus_registry[(interface, channel)] = shared_bus
+        shared_bus._users += 1
+        return shared_bus
+
+
+def release_can_bus(shared_bus: SharedCANBus) -> None:
+    """Releases a bus returned by :py:func:`acquire_can_bus`. The receive thread is stopped and the bus is shut down once its last user releases it.
+
+    Args:
+        shared_bus (SharedCANBus): The bus to release.
+    """
+    with _bus_registry_lock:
+        if shared_bus._users <= 0: return
+        shared_bus._users -= 1
+        if shared_bus._users > 0: return
+        if _bus_registry.get((shared_bus.interface, shared_bus.channel)) is shared_bus:
+            del _bus_registry[(shared_bus.interface, shared_bus.channel)]
+    shared_bus._shutdown()
@@ -0,0 +1,307 @@
+"""epically-powerful module for capturing and replaying CAN traffic.
+
+This module contains the classes for recording every frame seen on a CAN
+channel to a compact binary file, and for replaying a recording into the
+existing listeners (actuators, OpenIMUs, or a shared bus router) at real
+time, at a multiple of real time, or as fast as possible.
+
+Capture file format (little-endian):
+    header: 8 byte magic ``b'EPCANCAP'``, uint16 format version, uint16 record size
+    record: float64 timestamp [s], uint32 arbitration ID, uint8 flags, uint8 DLC, 8 data bytes
+
+The timestamp is the one assigned to the frame by the interface, which is the
+kernel receive time for SocketCAN.
+"""
+
+import os
+import struct
+import threading
+import time
+from typing import Iterator, Optional, Union
+
+import can
+
+from epicallypowerful.toolbox.can_bus import SharedCANBus, acquire_can_bus, release_can_bus
+
+CAPTURE_MAGIC = b'EPCANCAP'
+CAPTURE_VERSION = 1
+_HEADER = struct.Struct('<8sHH')
+_RECORD = struct.Struct('<dIBB8s')
+
+FLAG_EXTENDED_ID = 0x01
+FLAG_REMOTE_FRAME = 0x02
+FLAG_ERROR_FRAME = 0x04
+FLAG_RX = 0x08
+
+_READ_CHUNK_RECORDS = 4096
+
+
+def read_capture(file: str) -> Iterator[can.Message]:
+    """Reads the frames of a capture file in order.
+
+    Args:
+        file (str): Path of the capture file.
+
+    Raises:
+        ValueError: If the file is not a capture file or has an unsupported version.
+
+    Yields:
+        can.Message: The captured frames, with their captured timestamps.
+    """
+    with open(file, 'rb') as f:
+        magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f'{file} is not a CAN capture file')
+        if version != CAPTURE_VERSION or record_size != _RECORD.size:
+            raise ValueError(f'Unsupported CAN capture version {version} with record size {record_size}')
+
+        while True:
+            chunk = f.read(_RECORD.size * _READ_CHUNK_RECORDS)
+            if not chunk: return
+            chunk = chunk[:len(chunk) - len(chunk) % _RECORD.size] # ignore a partially written last record
+            for timestamp, arbitration_id, flags, dlc, data in _RECORD.iter_unpack(chunk):
+                yield can.Message(
+                    timestamp=timestamp,
+                    arbitration_id=arbitration_id,
+                    is_extended_id=bool(flags & FLAG_EXTENDED_ID),
+                    is_remote_frame=bool(flags & FLAG_REMOTE_FRAME),
+                    is_error_frame=bool(flags & FLAG_ERROR_FRAME),
+                    is_rx=bool(flags & FLAG_RX),
+                    dlc=dlc,
+                    data=data[:dlc],
+                    check=False,
+                )
+
+
+class CANCapture(can.Listener):
+    """Records every frame on a CAN channel to a capture file. By default this subscribes to the shared bus for the channel
+    (see :py:func:`~epicallypowerful.toolbox.can_bus.acquire_can_bus`), so it sees exactly the traffic that an
+    :py:class:`~epicallypowerful.actuation.ActuatorGroup` or :py:class:`~epicallypowerful.sensing.OpenIMUs` on the same channel receives,
+    without opening another socket. Frames are packed and buffered on the receive thread, and written to disk in large blocks.
+
+    SocketCAN does not deliver a socket's own frames back to it, so the shared bus only sees received traffic. To also record the commands
+    sent by this process, set ``include_sent``, which captures on a separate socket instead.
+
+    Example:
+        .. code-block:: python
+
+
+            from epicallypowerful.actuation import ActuatorGroup
+            from epicallypowerful.toolbox.can_capture import CANCapture
+
+            actuators = ActuatorGroup.from_dict({1: 'AK80-9'})
+            capture = CANCapture('session.epcan')
+            # ... run the control loop ...
+            capture.stop()
+
+    Args:
+        file (str): Path of the capture file to write. An existing file is overwritten.
+        channel (str, optional): CAN channel to capture. Defaults to 'can0'.
+        interface (str, optional): python-can interface of the channel. Defaults to 'socketcan'.
+        shared_bus (Optional[SharedCANBus], optional): Bus to capture from instead of acquiring the one for ``channel``. Defaults to None.
+        include_sent (bool, optional): Whether to capture on a separate socket, which also sees the frames sent by this process. Defaults to False.
+        start (bool, optional): Whether to start capturing immediately. Defaults to True.
+
+    Attributes:
+        frames_captured (int): Number of frames written.
+        frames_skipped (int): Number of CAN FD frames longer than 8 bytes, which are not recorded.
+    """
+    def __init__(
+        self,
+        file: str,
+        channel: str='can0',
+        interface: str='socketcan',
+        shared_bus: Optional[SharedCANBus]=None,
+        include_sent: bool=False,
+        start: bool=True,
+    ) -> None:
+        super().__init__()
+        self.file = os.path.abspath(file)
+        self.channel = channel
+        self.interface = interface
+        self.frames_captured = 0
+        self.frames_skipped = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._shared_bus = shared_bus
+        self._owns_bus = shared_bus is None
+        self.include_sent = include_sent
+        self._bus = None
+        self._notifier = None
+        if start: self.start()
+
+    def start(self) -> None:
+        """Opens the capture file and starts recording. Does nothing if already recording.
+        """
+        with self._lock:
+            if self._file is not None: return
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            self._file = open(self.file, 'wb', buffering=1 << 20)
+            self._file.write(_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, _RECORD.size))
+
+        if self.include_sent:
+            self._bus = can.Bus(channel=self.channel, interface=self.interface)
+            self._notifier = can.Notifier(self._bus, [self])
+            return
+
+        if self._owns_bus:
+            self._shared_bus = acquire_can_bus(self.channel, interface=self.interface)
+        self._shared_bus.subscribe(self) # no filters, receives every frame
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """Packs a frame into the capture file.
+
+        :meta private:
+
+        Args:
+            msg (can.Message): the most recent message received on the bus
+        """
+        if msg.dlc > 8:
+            self.frames_skipped += 1
+            return
+        flags = (
+            (FLAG_EXTENDED_ID if msg.is_extended_id else 0)
+            | (FLAG_REMOTE_FRAME if msg.is_remote_frame else 0)
+            | (FLAG_ERROR_FRAME if msg.is_error_frame else 0)
+            | (FLAG_RX if msg.is_rx else 0)
+        )
+        record = _RECORD.pack(msg.timestamp, msg.arbitration_id, flags, msg.dlc, bytes(msg.data))
+        with self._lock:
+            if self._file is None: return
+            self._file.write(record)
+            self.frames_captured += 1
+
+    def stop(self) -> None:
+        """Stops recording, and flushes and closes the capture file.
+        """
+        if self._notifier is not None:
+            notifier, bus = self._notifier, self._bus
+            self._notifier = None # the notifier calls stop() on its listeners
+            self._bus = None
+            notifier.stop()
+            bus.shutdown()
+        elif self._shared_bus is not None:
+            self._shared_bus.unsubscribe(self)
+            if self._owns_bus:
+                release_can_bus(self._shared_bus)
+                self._shared_bus = None
+
+        with self._lock:
+            if self._file is None: return
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'CANCapture':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+class CANReplay():
+    """Replays a capture file into listeners, preserving the captured frame timing. Listeners can be actuators, an
+    :py:class:`~epicallypowerful.sensing.OpenIMUs` instance, or the ``router`` of a shared bus, which dispatches each frame to its subscribers
+    as it would for live traffic. Frames are delivered on the thread calling :py:meth:`run`, or on a background thread with :py:meth:`start`.
+
+    Example:
+        .. code-block:: python
+
+
+            from epicallypowerful.actuation import CubeMars
+            from epicallypowerful.toolbox.can_capture import CANReplay
+
+            motor = CubeMars(1, 'AK80-9')
+            replay = CANReplay('session.epcan', [motor], speed=4.0)
+            stats = replay.run()
+            print(stats['frames'], stats['max_lateness'])
+
+    Args:
+        file (str): Path of the capture file to replay.
+        listeners (Union[can.Listener, list[can.Listener]]): Listeners to deliver the frames to.
+        speed (Optional[float], optional): Playback speed as a multiple of real time, or None to replay as fast as possible. Defaults to 1.0.
+        include_error_frames (bool, optional): Whether to deliver captured error frames. Defaults to False.
+    """
+    def __init__(
+        self,
+        file: str,
+        listeners: Union[can.Listener, list[can.Listener]],
+        speed: Optional[float]=1.0,
+        include_error_frames: bool=False,
+    ) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be positive, or None to replay as fast as possible')
+        self.file = file
+        self.listeners = listeners if isinstance(listeners, (list, tuple)) else [listeners]
+        self.speed = speed
+        self.include_error_frames = include_error_frames
+        self.stats = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run(self) -> dict:
+        """Replays the whole file, returning when it is finished or :py:meth:`stop` is called.
+
+        Returns:
+            dict: Replay statistics: ``frames`` delivered, ``duration`` [s], ``frame_rate`` [frames/s], and the ``mean_lateness`` and
+            ``max_lateness`` [s] of frame delivery relative to its scheduled time (always 0 when replaying as fast as possible).
+        """
+        if threading.current_thread() is not self._thread: self._stop_event.clear()
+        callbacks = [listener.on_message_received for listener in self.listeners]
+        n_frames = 0
+        total_lateness = 0.0
+        max_lateness = 0.0
+        first_timestamp = None
+        t0 = time.perf_counter()
+
+        for msg in read_capture(self.file):
+            if self._stop_event.is_set(): break
+            if msg.is_error_frame and not self.include_error_frames: continue
+
+            if self.speed is not None:
+                if first_timestamp is None: first_timestamp = msg.timestamp
+                scheduled = t0 + (msg.timestamp - first_timestamp) / self.speed
+                remaining = scheduled - time.perf_counter()
+                if remaining > 0.002: time.sleep(remaining - 0.001) # sleep coarsely, then spin to the scheduled time
+                while time.perf_counter() < scheduled: pass
+                lateness = time.perf_counter() - scheduled
+                total_lateness += lateness
+                if lateness > max_lateness: max_lateness = lateness
+
+            for callback in callbacks:
+                callback(msg)
+            n_frames += 1
+
+        duration = time.perf_counter() - t0
+        self.stats = {
+            'frames': n_frames,
+            'duration': duration,
+            'frame_rate': n_frames / duration if duration > 0 else 0.0,
+            'mean_lateness': total_lateness / n_frames if n_frames else 0.0,
+            'max_lateness': max_lateness,
+        }
+        return self.stats
+
+    def start(self) -> None:
+        """Replays the file on a background thread. Statistics are available in ``stats`` once it finishes.
+        """
+        if self._thread is not None and self._thread.is_alive(): return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='CANReplay', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops a replay running on a background thread and waits for it to finish.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_running(self) -> bool:
+        """Whether a background replay is in progress.
+
+        Returns:
+            bool: True if the replay thread is running.
+        """
+        return self._thread is not None and self._thread.is_alive()
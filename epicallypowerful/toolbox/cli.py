@@ -46,6 +46,11 @@ def _collect_microstrain_imu_data_parser():
         action="append",
         help="GPIO pins to use for remote sync channels. Use this argument multiple times to specify multiple channels",
     )
+    parser.add_argument(
+        "--full-rate",
+        action="store_true",
+        help="Record every IMU sample at the IMU rate, with its IMU timestamp, to one file per IMU (OUTPUT_<serial id>), instead of one row for all IMUs at 200 Hz",
+    )
     return parser
 
 def collect_microstrain_imu_data():
@@ -57,12 +62,13 @@ def collect_microstrain_imu_data():
     print(f"Duration of trial: {args.duration} seconds")
     print(f"IMU channels: {args.channels}")
     print(f"Remote sync GPIO pin channel: {args.remote_sync_channel}")
+    print(f"Full rate: {args.full_rate}")
 
     outfile = args.output
     duration = args.duration
     serial_ids = args.imu_serial_id
     channels = args.channels
-    remote_sync_channels = args.remote_sync_channel
+    remote_sync_channels = args.remote_sync_channel or []
 
     from epicallypowerful.sensing.microstrain.microstrain_imu import MicroStrainIMUs
     from epicallypowerful.toolbox.clocking import timed_loop
@@ -90,21 +96,21 @@ def collect_microstrain_imu_data():
                 f"{serial_id}_mag_y",
                 f"{serial_id}_mag_z",
             ])
-        if "orient" in channels:
+        if "quat" in channels:
             headers.extend([
                 f"{serial_id}_quat_w",
                 f"{serial_id}_quat_x",
                 f"{serial_id}_quat_y",
                 f"{serial_id}_quat_z",
             ])
-        if "euler" in channels:
+        if "eul" in channels:
             headers.extend([
                 f"{serial_id}_eul_x",
                 f"{serial_id}_eul_y",
                 f"{serial_id}_eul_z",
             ])
 
-    if remote_sync_channels != []:
+    if remote_sync_channels:
         if _rpi_or_jetson() == "rpi":
             import RPi.GPIO as GPIO
             GPIO.setmode(GPIO.BOARD)
@@ -117,6 +123,9 @@ def collect_microstrain_imu_data():
             headers.append(f"sync_{c}")
             GPIO.setup(c, GPIO.IN)
 
+    if args.full_rate:
+        return _collect_microstrain_imu_data_full_rate(imus, outfile, duration, serial_ids, channels, remote_sync_channels, GPIO if remote_sync_channels else None)
+
     recorder = DataRecorder(
         outfile, headers,
         delimiter=",",
@@ -160,7 +169,7 @@ def collect_microstrain_imu_data():
                     data.eul_y,
                     data.eul_z,
                 ])
-        if remote_sync_channels != []:
+        if remote_sync_channels:
             for c in remote_sync_channels:
                 row_data.append(GPIO.input(c))
         recorder.save(row_data)
@@ -171,6 +180,49 @@ def collect_microstrain_imu_data():
     print(f'Data saved to {outfile}')
     return 1
 
+def _collect_microstrain_imu_data_full_rate(imus, outfile, duration, serial_ids, channels, remote_sync_channels, GPIO):
+    """Record every sample of each IMU to its own file, retrieving them in batches."""
+    import os
+    import time
+    from epicallypowerful.sensing.microstrain.microstrain_imu import BATCH_FIELDS
+    from epicallypowerful.toolbox.data_recorder import DataRecorder
+
+    channel_fields = {
+        "acc": ["acc_x", "acc_y", "acc_z"],
+        "gyro": ["gyro_x", "gyro_y", "gyro_z"],
+        "mag": ["mag_x", "mag_y", "mag_z"],
+        "quat": ["quat_w", "quat_x", "quat_y", "quat_z"],
+        "eul": ["eul_x", "eul_y", "eul_z"],
+    }
+    fields = ["timestamp", "device_time"] + [field for c in channels for field in channel_fields[c]]
+    columns = [BATCH_FIELDS.index(field) for field in fields]
+    headers = fields + [f"sync_{c}" for c in remote_sync_channels]
+
+    base, ext = os.path.splitext(outfile)
+    recorders = {
+        serial_id: DataRecorder(f"{base}_{serial_id}{ext}", headers, delimiter=",", overwrite=False, buffer_limit=1000)
+        for serial_id in serial_ids
+    }
+    for serial_id in serial_ids:
+        imus.get_batch(serial_id) # discard samples from before the recording
+
+    print(f"\nCollecting data for {duration} seconds...")
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duration:
+        # Sleep rather than spin between batches, to leave the CPU to the IMU reader threads
+        time.sleep(0.02)
+        sync = [GPIO.input(c) for c in remote_sync_channels]
+        for serial_id in serial_ids:
+            for sample in imus.get_batch(serial_id)[:, columns].tolist():
+                recorders[serial_id].save(sample + sync)
+
+    print("Saving data, do not power off device...")
+    for serial_id, recorder in recorders.items():
+        recorder.finalize()
+        print(f"Data saved to {recorder.fullpath} ({imus.dropped_samples[serial_id]} samples dropped)")
+    imus.close()
+    return 1
+
 def _visualize_dummy_data_parser():
     parser = argparse.ArgumentParser(
         description="Run dummy visualizer",
@@ -950,6 +1002,53 @@ def imu_control_actuator():
         # Print out updated results
         print(f'| {int(actuator_id):^8} | {act_data.current_torque:^11.2f} | {serial_id[0]:^9} | {imu_data.gyro_x:^16.2f} |')
 
+def _capture_can_traffic_parser():
+    parser = argparse.ArgumentParser(
+        description="Capture CAN traffic to a binary file for replay",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--output", '-o',
+        default="capture.epcan",
+        help="Output capture file",
+    )
+    parser.add_argument(
+        "--channel", '-c',
+        default="can0",
+        type=str,
+        help="CAN channel to capture",
+    )
+    parser.add_argument(
+        "--duration", '-d',
+        default=None,
+        type=float,
+        help="Duration in seconds. Captures until Ctrl+C if not set",
+    )
+    return parser
+
+def capture_can_traffic():
+    """Run with command-line shortcut `ep-capture-can [ARGS]`."""
+    parser = _capture_can_traffic_parser()
+    args = parser.parse_args()
+
+    import time
+    from epicallypowerful.toolbox.can_bus import bring_up_can_interface
+    from epicallypowerful.toolbox.can_capture import CANCapture
+
+    bring_up_can_interface(args.channel)
+    capture = CANCapture(args.output, channel=args.channel)
+    print(f"Capturing {args.channel} to {capture.file}")
+    t0 = time.perf_counter()
+    try:
+        while args.duration is None or time.perf_counter() - t0 < args.duration:
+            time.sleep(0.5)
+            print(f"\r{capture.frames_captured} frames captured", end="")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.stop()
+    print(f"\nCaptured {capture.frames_captured} frames in {time.perf_counter() - t0:.1f} s")
+
 def _install_mscl_python_parser():
     parser = argparse.ArgumentParser(
         description="Install MSCL Python package",
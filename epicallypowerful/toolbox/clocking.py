@@ -8,11 +8,20 @@ frequency clock within the main while loop of your top level script.
 """
 
 import time
+from epicallypowerful.toolbox.diagnostics import RateLimitedReporter
 try:
     from epicallypowerful.toolbox._clocking import TimedLoopC
 except ImportError:
     print("WARNING: TimedLoopC not found, using fallback implementation. This may not be as efficient.")
 
+_diagnostics = None
+
+def _report_slow_step(message):
+    # Slow steps tend to come in runs, so they are reported at most once per second from a background thread
+    global _diagnostics
+    if _diagnostics is None: _diagnostics = RateLimitedReporter()
+    _diagnostics.report('slow time step', message)
+
 def TimedLoop(rate, tolerance=0.1, verbose=True):
     """Creates a TimedLoop object, which can be used to enforce a set loop frequency. This uses a "scheduled" sleep method to reduce busy looping, and will adjust the 
     sleep time based on the actual time taken for each loop iteration to ensure average frequency is maintained. This means over time, the number of iterations will
@@ -73,7 +82,7 @@ class LoopTimer:
             self.recent_time_step = current_time - self.previous_time
 
             if (self.recent_time_step) >= self.time_step_error_tolerance:
-                if self.verbose: print(f"TIME STEP WARNING: Expected {self.desired_time_step*1000:^.3f} ms, operating at {(self.recent_time_step)*1000:^.3f} ms")
+                if self.verbose: _report_slow_step(f"TIME STEP WARNING: Expected {self.desired_time_step*1000:^.3f} ms, operating at {(self.recent_time_step)*1000:^.3f} ms")
             
             self.previous_time = current_time  # reset previous time to current time
             return True
@@ -0,0 +1,180 @@
+"""epically-powerful module for reporting diagnostics off the control hot path.
+
+This module contains the helpers used by the library to log and print
+diagnostics without blocking the control loop. Records are put on a queue
+and formatted and written by a background thread, and recurring events
+(e.g. an actuator over its torque limit on every control call) are rate
+limited and aggregated into periodic summaries.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Optional
+
+CONSOLE_LOGGER = 'epicallypowerful'
+
+_listeners = []
+_listeners_lock = threading.Lock()
+_console_configured = False
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves formatting to the background writer. The records stay in this process, so they do not need to be
+    made picklable as :py:class:`logging.handlers.QueueHandler` does by formatting them in the calling thread.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_listeners() -> None:
+    with _listeners_lock:
+        for listener in _listeners:
+            listener.stop() # writes out the records still queued
+        _listeners.clear()
+
+
+def add_queued_handler(logger: logging.Logger, handler: logging.Handler) -> logging.Handler:
+    """Attaches a handler to a logger through a queue, so that records are formatted and written by a background thread instead of
+    the thread that logs them. Queued records are written out when the program exits.
+
+    Args:
+        logger (logging.Logger): Logger to attach the handler to.
+        handler (logging.Handler): Handler that formats and writes the records, e.g. a :py:class:`logging.FileHandler`.
+
+    Returns:
+        logging.Handler: The queue handler added to the logger.
+    """
+    records = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(records)
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    with _listeners_lock:
+        if not _listeners: atexit.register(_stop_listeners)
+        _listeners.append(listener)
+    listener.start()
+    logger.addHandler(queue_handler)
+    return queue_handler
+
+
+def get_console_logger() -> logging.Logger:
+    """Returns the logger for diagnostics printed to the terminal. Messages are written to standard output as they would be by
+    ``print()``, but from a background thread.
+
+    Returns:
+        logging.Logger: The ``'epicallypowerful'`` logger.
+    """
+    global _console_configured
+    console = logging.getLogger(CONSOLE_LOGGER)
+    with _listeners_lock:
+        configured = _console_configured
+        _console_configured = True
+    if not configured:
+        console.setLevel(logging.INFO)
+        console.propagate = False
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter('%(message)s'))
+        add_queued_handler(console, stream_handler)
+    return console
+
+
+class RateLimitedReporter():
+    """Reports recurring diagnostic events at a bounded rate. The first occurrence of an event is reported right away. Further occurrences
+    within ``interval`` seconds are only counted, and are reported as one summary per interval, such as
+    "250 actuator 3 over torque limit events in the last 1.0 s", for as long as the event keeps occurring. Reports are queued and written by
+    background threads (see :py:func:`add_queued_handler`), so reporting from a control loop only costs a counter update.
+
+    Example:
+        .. code-block:: python
+
+
+            import logging
+            from epicallypowerful.toolbox.diagnostics import RateLimitedReporter
+
+            reporter = RateLimitedReporter(logging.getLogger('my_controller'))
+            while True:
+                if joint_angle > limit:
+                    reporter.report('joint limit', f'Joint angle {joint_angle:.2f} is over the limit')
+
+    Args:
+        logger (Optional[logging.Logger], optional): Logger to report to, in addition to the terminal. Defaults to None.
+        interval (float, optional): Minimum time in seconds between reports of the same event. Defaults to 1.0.
+        echo (bool, optional): Whether to print the reports to the terminal. Defaults to True.
+
+    Attributes:
+        counts (dict[str, int]): Total number of occurrences of each event.
+    """
+    def __init__(self, logger: Optional[logging.Logger]=None, interval: float=1.0, echo: bool=True) -> None:
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        self.logger = logger
+        self.interval = interval
+        self.echo = echo
+        self.counts = {}
+        self._windows = {} # event -> [window start, occurrences suppressed in the window, latest message, level]
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._console = get_console_logger() if echo else None
+
+    def report(self, event: str, message: str, level: int=logging.WARNING) -> None:
+        """Reports an occurrence of an event.
+
+        Args:
+            event (str): Name of the event, used to rate limit it and in its summaries. Use a distinct name per source, e.g. per actuator.
+            message (str): Message reported for this occurrence.
+            level (int, optional): Logging level of the report. Defaults to logging.WARNING.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.counts[event] = self.counts.get(event, 0) + 1
+            window = self._windows.get(event)
+            if window is not None and now - window[0] < self.interval:
+                window[1] += 1
+                window[2] = message
+                window[3] = level
+                if self._flusher is None: self._start_flusher()
+                return
+            suppressed = window[1] if window is not None else 0
+            self._windows[event] = [now, 0, message, level]
+
+        if suppressed: self._emit(level, self._summary(event, suppressed + 1, now - window[0], message))
+        else: self._emit(level, message)
+
+    def flush(self) -> None:
+        """Reports the summaries of all events that occurred since they were last reported.
+        """
+        self._flush(force=True)
+
+    def _summary(self, event: str, count: int, elapsed: float, message: str) -> str:
+        return f'{count} {event} events in the last {elapsed:.1f} s (latest: {message})'
+
+    def _emit(self, level: int, message: str) -> None:
+        if self.logger is not None: self.logger.log(level, message)
+        if self._console is not None: self._console.log(level, message)
+
+    def _flush(self, force: bool=False) -> None:
+        now = time.perf_counter()
+        summaries = []
+        with self._lock:
+            for event, window in self._windows.items():
+                if window[1] and (force or now - window[0] >= self.interval):
+                    summaries.append((window[3], self._summary(event, window[1], now - window[0], window[2])))
+                    window[0] = now
+                    window[1] = 0
+        for level, summary in summaries:
+            self._emit(level, summary)
+
+    def _start_flusher(self) -> None:
+        # Called with the lock held. Reports summaries for events that stop occurring before their window ends, and the
+        # remaining counts at exit (registered after the writers are, so it runs before they are stopped).
+        self._flusher = threading.Thread(target=self._run_flusher, name='RateLimitedReporter', daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run_flusher(self) -> None:
+        while True:
+            time.sleep(self.interval / 2)
+            self._flush()
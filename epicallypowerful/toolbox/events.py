@@ -0,0 +1,119 @@
+"""epically-powerful module for event-driven control.
+
+This module contains the trigger behind :py:meth:`ActuatorGroup.on_state <epicallypowerful.actuation.ActuatorGroup.on_state>`
+and :py:meth:`IMU.on_data <epicallypowerful.sensing.imu_abc.IMU.on_data>`, which calls a
+function as soon as every device in a set has new data, instead of waiting for
+the next iteration of a polling loop. The function runs either on the thread
+that received the data, or on a dedicated worker thread.
+"""
+
+import threading
+from typing import Any, Callable, Hashable, Iterable, Optional
+from epicallypowerful.toolbox.diagnostics import RateLimitedReporter
+
+_diagnostics = None
+
+def _report_callback_error(message):
+    # A failing callback usually fails on every call, so errors are reported at most once per second
+    global _diagnostics
+    if _diagnostics is None: _diagnostics = RateLimitedReporter()
+    _diagnostics.report('state callback error', message)
+
+
+class FreshStateTrigger():
+    """Calls a function once every device in a set has new state since the previous call, i.e. once the full set of replies for a
+    control tick has arrived. Whether a device has new state is judged by a change in the ``timestamp`` of its state. Drivers call
+    :py:meth:`check` whenever they have decoded new state, and the call that completes the set invokes the function. These are created
+    with :py:meth:`ActuatorGroup.on_state <epicallypowerful.actuation.ActuatorGroup.on_state>` or
+    :py:meth:`IMU.on_data <epicallypowerful.sensing.imu_abc.IMU.on_data>` rather than directly.
+
+    With ``worker=False``, the function runs on the receiving thread, which gives the lowest latency but delays receiving further data
+    until it returns, so it should be short. With ``worker=True``, it runs on a dedicated thread, and if it takes longer than a tick only
+    the most recent set of states is passed to the next call.
+
+    Args:
+        ids (Iterable[Hashable]): IDs of the devices to wait for.
+        get_state (Callable[[Hashable], Any]): Returns the current state of a device from its ID, with a ``timestamp`` attribute.
+        callback (Callable[[dict], None]): Function called with a dictionary of the state of each device by ID.
+        worker (bool, optional): Whether to call ``callback`` on a dedicated worker thread instead of the receiving thread. Defaults to False.
+        on_cancel (Optional[Callable[[FreshStateTrigger], None]], optional): Called by :py:meth:`cancel`, to detach the trigger from its
+            drivers. Defaults to None.
+
+    Attributes:
+        calls (int): Number of times ``callback`` has been called.
+        skipped (int): Number of complete sets that were superseded before the worker thread could pass them to ``callback``.
+    """
+    def __init__(
+        self,
+        ids: Iterable[Hashable],
+        get_state: Callable[[Hashable], Any],
+        callback: Callable[[dict], None],
+        worker: bool=False,
+        on_cancel: Optional[Callable[['FreshStateTrigger'], None]]=None,
+    ) -> None:
+        self.ids = tuple(ids)
+        if not self.ids:
+            raise ValueError('ids must contain at least one device')
+        self.get_state = get_state
+        self.callback = callback
+        self.on_cancel = on_cancel
+        self.calls = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._last_stamps = {device_id: get_state(device_id).timestamp for device_id in self.ids}
+        self._pending = list(self.ids)
+        self._cancelled = False
+        self._worker = None
+        if worker:
+            self._ready = None
+            self._wakeup = threading.Event()
+            self._worker = threading.Thread(target=self._run_worker, name='FreshStateTrigger', daemon=True)
+            self._worker.start()
+
+    def check(self) -> None:
+        """Checks for new state, and calls the function if every device has new state. Called by the drivers after decoding new state.
+        """
+        with self._lock:
+            if self._cancelled: return
+            get_state = self.get_state
+            last_stamps = self._last_stamps
+            self._pending = pending = [device_id for device_id in self._pending if get_state(device_id).timestamp == last_stamps[device_id]]
+            if pending: return
+            states = {device_id: get_state(device_id) for device_id in self.ids}
+            for device_id, state in states.items():
+                last_stamps[device_id] = state.timestamp
+            self._pending = list(self.ids)
+            if self._worker is not None:
+                if self._ready is not None: self.skipped += 1
+                self._ready = states
+                self._wakeup.set()
+                return
+
+        self._call(states)
+
+    def _call(self, states: dict) -> None:
+        self.calls += 1
+        try:
+            self.callback(states)
+        except Exception as e: # keep the receiving thread alive
+            _report_callback_error(f'WARNING: State callback {getattr(self.callback, "__name__", self.callback)} raised {e!r}')
+
+    def _run_worker(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                self._wakeup.clear()
+                if self._cancelled: return
+                states, self._ready = self._ready, None
+            if states is not None: self._call(states)
+
+    def cancel(self) -> None:
+        """Stops calling the function, and stops the worker thread if there is one.
+        """
+        with self._lock:
+            if self._cancelled: return
+            self._cancelled = True
+        if self._worker is not None:
+            self._wakeup.set()
+            if self._worker is not threading.current_thread(): self._worker.join()
+        if self.on_cancel is not None: self.on_cancel(self)
@@ -1,40 +1,145 @@
 import can
 import time
 import sys
+import threading
 import numpy as np
+from dataclasses import dataclass, field
+from typing import Optional
 from epicallypowerful.actuation.robstride.robstride_driver import *
-from epicallypowerful.actuation.actuator_group import _load_can_drivers
+from epicallypowerful.toolbox.can_bus import bring_up_can_interface
 import atexit
 
+
+@dataclass
+class RobstrideDeviceInfo:
+    """Information about a device found by :py:meth:`RobstrideConfigure.scan`.
+
+    Attributes:
+        can_id (int): CAN ID of the device.
+        unique_ids (list[int]): 64 bit hardware IDs that replied on this CAN ID. More than one means several devices share the ID.
+        torque_limit (Optional[float]): Torque limit parameter of the device in Nm, or None if it did not reply.
+        model_hints (tuple[str, ...]): Models whose maximum torque matches the torque limit. The limit is configurable, so this is only a hint.
+    """
+    can_id: int
+    unique_ids: list = field(default_factory=list)
+    torque_limit: Optional[float] = None
+    model_hints: tuple = ()
+
+    @property
+    def conflict(self) -> bool:
+        """Whether more than one device replied on this CAN ID."""
+        return len(self.unique_ids) > 1
+
+
+def model_hints_from_torque_limit(torque_limit: float, tolerance: float=0.05) -> tuple:
+    """Lists the models whose maximum torque matches a torque limit read from a device. Devices ship with the torque
+    limit set to the model's maximum, so this identifies the model unless the limit has been changed.
+
+    Args:
+        torque_limit (float): Torque limit parameter read from the device in Nm.
+        tolerance (float, optional): Accepted difference in Nm. Defaults to 0.05.
+
+    Returns:
+        tuple[str, ...]: The matching models, which may be empty.
+    """
+    return tuple(model for model, t_max in T_MAX.items() if abs(t_max - torque_limit) <= tolerance)
+
+
 class RobstrideScanningListener(can.Listener):
+    """Collects the identity and parameter replies of a scan, keyed by the CAN ID in each reply rather than by the last request sent.
+    """
     def __init__(self) -> None:
         super().__init__()
+        self.unique_ids = {} # CAN ID -> list of unique hardware IDs
+        self.params = {} # (CAN ID, parameter index) -> value
+        self.last_reply_time = 0.0
+        self._lock = threading.Lock()
 
     def on_message_received(self, msg):
-        print(msg)
+        if msg.is_error_frame or not msg.is_extended_id: return
+        communication_type = (msg.arbitration_id >> 24) & 0x3F
+        target_id = msg.arbitration_id & 0xFF
+        motor_id = (msg.arbitration_id >> 8) & 0xFF
+        with self._lock:
+            if communication_type == RESPONSE_IDENTITY and target_id == RESPONSE_IDENTITY_CHECK_FLAG:
+                unique_id = int.from_bytes(msg.data, byteorder='big')
+                ids = self.unique_ids.setdefault(motor_id, [])
+                if unique_id not in ids: ids.append(unique_id)
+                self.last_reply_time = time.perf_counter()
+            elif communication_type == RESPONSE_PARAM and target_id == MASTER_CAN_ID:
+                param_index = (msg.data[1] << 8) | msg.data[0]
+                if param_index not in PARAM_NUM_BYTES: return
+                _, value, _ = parse_param_response(msg)
+                self.params[(motor_id, param_index)] = value
+                self.last_reply_time = time.perf_counter()
 
 
 
 class RobstrideConfigure():
-    def __init__(self, max_can_id=127):
-        _load_can_drivers()
-        self._bus = can.Bus(channel='can0', bustype='socketcan', receive_own_messages=False)
+    def __init__(self, max_can_id=127, channel='can0', interface='socketcan'):
+        if interface == 'socketcan': bring_up_can_interface(channel)
+        self._bus = can.Bus(channel=channel, interface=interface, receive_own_messages=False)
         self.max_can_id = max_can_id
         self.available_devices = set()
+        self.devices = {}
         atexit.register(self._bus.shutdown)
 
-    def scan(self):
+    def scan(self, timeout: float=0.1, identify_models: bool=True) -> dict:
+        """Finds the devices on the bus. Identity requests for every ID from 1 to ``max_can_id`` are sent back-to-back, and the replies are
+        collected until none has arrived for ``timeout`` seconds after the last request, so a full scan takes about ``timeout`` rather than
+        a wait per ID. Each reply is attributed to the CAN ID it carries. The torque limit of each device found is then read the same way to
+        hint at its model.
+
+        Args:
+            timeout (float, optional): Time in seconds to wait for further replies. Defaults to 0.1.
+            identify_models (bool, optional): Whether to read the torque limit of each device for model hints. Defaults to True.
+
+        Returns:
+            dict[int, RobstrideDeviceInfo]: The devices found, by CAN ID in ascending order.
+        """
         print(f"Starting scan from 1 up to id {self.max_can_id}")
-        for i in range(1, self.max_can_id + 1):
-            read_id_msg = create_read_device_id_message(i)
-            self._bus.send(read_id_msg)
-            msg = self._bus.recv(.01)
-            if (msg is not None) and (not msg.is_error_frame):
-                    unique_id, motor_id = parse_identity_response(msg)
-                    # print(f"Found device with CAN ID {motor_id}, Unique ID {unique_id}")
-                    self.available_devices.add(motor_id)
+        listener = RobstrideScanningListener()
+        while self._bus.recv(0) is not None: pass # discard stale replies
+        notifier = can.Notifier(self._bus, [listener], timeout=0.01)
+        try:
+            self._send_all([create_read_device_id_message(i) for i in range(1, self.max_can_id + 1)])
+            self._wait_for_replies(listener, timeout)
+            found = sorted(listener.unique_ids)
+            if identify_models and found:
+                self._send_all([create_read_param_message(i, IDX_TRQ_LIM) for i in found])
+                self._wait_for_replies(listener, timeout, lambda: all((i, IDX_TRQ_LIM) in listener.params for i in found))
+        finally:
+            notifier.stop()
+
+        self.devices = {}
+        for can_id in found:
+            torque_limit = listener.params.get((can_id, IDX_TRQ_LIM))
+            self.devices[can_id] = RobstrideDeviceInfo(
+                can_id=can_id,
+                unique_ids=list(listener.unique_ids[can_id]),
+                torque_limit=torque_limit,
+                model_hints=model_hints_from_torque_limit(torque_limit) if torque_limit is not None else (),
+            )
+            if self.devices[can_id].conflict:
+                print(f"WARNING: {len(self.devices[can_id].unique_ids)} devices share CAN ID {can_id}")
+        self.available_devices = set(self.devices)
         print(f"Scan complete. Found {len(self.available_devices)} devices.")
-        return list(self.available_devices)
+        return self.devices
+
+    def _send_all(self, messages: list) -> None:
+        for msg in messages:
+            try:
+                self._bus.send(msg, timeout=0.1)
+            except can.CanError: # transmit queue full, let it drain and retry once
+                time.sleep(0.01)
+                self._bus.send(msg, timeout=0.1)
+
+    def _wait_for_replies(self, listener: RobstrideScanningListener, timeout: float, done=None) -> None:
+        start = time.perf_counter()
+        while True:
+            time.sleep(0.002)
+            if done is not None and done(): return
+            if time.perf_counter() - max(start, listener.last_reply_time) > timeout: return
    
     def change_id(self, target_id, goal_id):
         print(f"Changing ID From {target_id} to {goal_id}")
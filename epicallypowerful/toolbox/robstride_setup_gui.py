@@ -1,6 +1,6 @@
 from nicegui import ui, app
 import random
-from nicegui import ui, events
+from nicegui import ui, events, run
 import time
 import math
 from collections import deque
@@ -46,21 +46,28 @@ async def update_dropdown_options():
     loading_spinner.classes(remove='hidden')
     loading_label.classes(remove='hidden')
 
-    new_options = rs_config_tool.scan()
-    #await asyncio.sleep(2)  # Simulate a delay for scanning
-    new_options = [str(opt) for opt in new_options]
-    #new_options = [f'{random.randint(1, 6)}' for _ in range(5)]  # Simulated options for testing
+    # Scan on a worker thread so the UI stays responsive
+    devices = await run.io_bound(rs_config_tool.scan)
+    new_options = {}
+    for can_id, device in devices.items():
+        label = f'{can_id}'
+        if device.model_hints: label += f" ({'/'.join(device.model_hints)})"
+        if device.conflict: label += f' - {len(device.unique_ids)} devices share this ID'
+        new_options[str(can_id)] = label
 
     loading_spinner.classes(add='hidden')
     loading_label.classes(add='hidden')
     dropdown.classes(remove='hidden')
+    if not new_options: new_options = {dropdown_options[0]: dropdown_options[0]}
     dropdown.options = new_options
-    dropdown.value = new_options[0]
+    dropdown.value = next(iter(new_options))
     dropdown.update()
     scan_button.enable()
     con_button.enable()
     n = ui.notification(timeout=10)
-    n.message = "Scan Complete"
+    n.message = f"Scan Complete. Found {len(devices)} devices."
+    if any(device.conflict for device in devices.values()):
+        ui.notification("Several devices share a CAN ID. Connect them one at a time to change their IDs.", type='warning', timeout=20)
 
 
 def update_id(init_id, target_id):
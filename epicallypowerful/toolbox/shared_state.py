@@ -0,0 +1,394 @@
+"""epically-powerful module for sharing state and commands between processes.
+
+This module contains shared memory channels for splitting a controller into
+several processes, so that logging, visualization, and GUIs do not compete
+with the control loop for the GIL. A real-time I/O process owns the CAN bus
+and publishes device state to a :py:class:`SharedStateRing`, which other
+processes read without any locks or copies through a pipe, and takes
+setpoints from a :py:class:`CommandMailbox` written by a controller process.
+
+Both channels are seqlocks: the single writer marks a slot as being written
+by making its sequence number odd, writes it, and makes it even again, and
+readers retry if the sequence number changed while they copied the slot. The
+writer never waits for readers. The sequence numbers are accessed with
+acquire/release atomics by the compiled ``_shared_state`` extension, which is
+needed on weakly ordered CPUs such as the ARM cores of a Raspberry Pi or
+Jetson. Without the extension, the pure Python fallback relies on the stores
+becoming visible in program order, which only x86 CPUs guarantee.
+
+Shared memory layout (native byte order):
+    header: 8 byte magic ``b'EPSTATE1'``, uint32 number of fields, uint32 capacity, uint32 length of the field names, field names as JSON (padded to 8 bytes)
+    uint64 number of records written
+    capacity x uint64 sequence number of each slot
+    capacity x number of fields float64 records
+"""
+
+import json
+import platform
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+from typing import Any, Iterable, Optional, Sequence
+import numpy as np
+
+STATE_MAGIC = b'EPSTATE1'
+_HEADER = struct.Struct('=8sIII')
+
+ACTUATOR_STATE_ATTRIBUTES = ('current_position', 'current_velocity', 'current_torque', 'current_temperature', 'timestamp')
+IMU_STATE_ATTRIBUTES = (
+    'acc_x', 'acc_y', 'acc_z', 'gyro_x', 'gyro_y', 'gyro_z',
+    'quat_x', 'quat_y', 'quat_z', 'quat_w', 'timestamp',
+)
+
+
+def state_fields(device_ids: Iterable, attributes: Sequence[str]) -> list[str]:
+    """Builds the field names for publishing the state of several devices with :py:meth:`SharedStateRing.publish_states`.
+
+    Example:
+        .. code-block:: python
+
+
+            state_fields([1, 2], ('current_position', 'timestamp'))
+            # ['1.current_position', '1.timestamp', '2.current_position', '2.timestamp']
+
+    Args:
+        device_ids (Iterable): IDs of the devices, e.g. CAN IDs or IMU serial numbers.
+        attributes (Sequence[str]): Attributes of each device's state to include, e.g. ``ACTUATOR_STATE_ATTRIBUTES``.
+
+    Returns:
+        list[str]: Field names of the form ``'<device ID>.<attribute>'``.
+    """
+    return [f'{device_id}.{attribute}' for device_id in device_ids for attribute in attributes]
+
+
+def _open_shared_memory(name: str, create: bool, size: int) -> shared_memory.SharedMemory:
+    if create:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before Python 3.13 attaching registers the block with the resource tracker, which would unlink it when this process exits
+    shm = shared_memory.SharedMemory(name=name)
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _unlink_shared_memory(shm: shared_memory.SharedMemory) -> None:
+    if sys.version_info < (3, 13):
+        # A process started by multiprocessing shares the creator's resource tracker, so an attach in it may have unregistered the
+        # block already. Registering it again first keeps the unregistration done by unlink() from failing in the tracker.
+        from multiprocessing import resource_tracker
+        resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
+
+
+class _PyRingMemory():
+    """Pure Python version of the compiled ``RingMemory`` of the ``_shared_state`` extension, which reads and writes the sequence
+    numbers, count, and records of a ring. It relies on the stores to the shared memory becoming visible to other processes in program
+    order, which holds on x86 CPUs but not on weakly ordered ones such as ARM.
+    """
+    def __init__(self, buf: memoryview, offset: int, capacity: int, n_fields: int) -> None:
+        self.capacity = capacity
+        self.n_fields = n_fields
+        self._head = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=offset)
+        self._seqs = np.ndarray((capacity,), dtype=np.uint64, buffer=buf, offset=offset + 8)
+        self._records = np.ndarray((capacity, n_fields), dtype=np.float64, buffer=buf, offset=offset + 8 + 8 * capacity)
+
+    def count(self) -> int:
+        return int(self._head[0])
+
+    def publish(self, values: np.ndarray) -> None:
+        n = int(self._head[0])
+        slot = n % self.capacity
+        self._seqs[slot] = 2 * n + 1 # odd while being written
+        self._records[slot] = values
+        self._seqs[slot] = 2 * n + 2
+        self._head[0] = n + 1
+
+    def read_latest(self, out: np.ndarray, retries: int) -> int:
+        for _ in range(retries):
+            count = int(self._head[0])
+            if count == 0: return 0
+            n = count - 1
+            slot = n % self.capacity
+            expected = 2 * n + 2
+            if self._seqs[slot] != expected: continue
+            out[:] = self._records[slot]
+            if self._seqs[slot] == expected: return count
+        return 0
+
+    def read_since(self, count: int) -> tuple[np.ndarray, int]:
+        head = int(self._head[0])
+        start = max(count, head - self.capacity + 1) # the slot after the newest record may be being written
+        if start >= head: return np.empty((0, self.n_fields)), head
+        numbers = np.arange(start, head, dtype=np.uint64)
+        slots = numbers % self.capacity
+        records = self._records[slots] # fancy indexing copies
+        valid = self._seqs[slots] == 2 * numbers + 2
+        return records[valid], head
+
+    def release(self) -> None:
+        self._head = self._seqs = self._records = None
+
+
+# Bound to the compiled version, with memory fences, when the extension is built
+try:
+    from epicallypowerful.toolbox._shared_state import RingMemory
+    FENCED = True
+except ImportError:
+    RingMemory = _PyRingMemory
+    FENCED = False
+    if platform.machine().lower() not in ('x86_64', 'amd64', 'i386', 'i686'):
+        print("WARNING: _shared_state extension not found, shared state rings have no memory fences and may return torn records on this CPU.")
+
+
+class SharedStateRing():
+    """A ring of the most recent records of a fixed set of float fields in shared memory, written by one process and read by any
+    number of others. Each record is published with a single call, and readers either get the latest record or every record since
+    they last read, as long as it has not been overwritten yet. Create the ring in the writing process with :py:meth:`create`, and
+    open it in reading processes with :py:meth:`attach`.
+
+    Example:
+        .. code-block:: python
+
+
+            # I/O process, owning the CAN bus
+            from epicallypowerful.actuation import ActuatorGroup
+            from epicallypowerful.toolbox.shared_state import SharedStateRing, state_fields, ACTUATOR_STATE_ATTRIBUTES
+
+            actuators = ActuatorGroup.from_dict({1: 'AK80-9', 2: 'AK80-9'})
+            ring = SharedStateRing.create('ep_actuators', state_fields(actuators.actuators, ACTUATOR_STATE_ATTRIBUTES))
+            actuators.on_state(ring.publish_states) # publish every complete set of replies
+
+            # Logging or GUI process
+            ring = SharedStateRing.attach('ep_actuators')
+            count = 0
+            while True:
+                records, count = ring.read_since(count)
+
+    Args:
+        shm (shared_memory.SharedMemory): Shared memory block holding the ring.
+        owner (bool): Whether this process created the block.
+
+    Attributes:
+        fields (list[str]): Names of the fields of each record.
+        capacity (int): Number of records kept.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self.owner = owner
+        magic, n_fields, capacity, names_length = _HEADER.unpack_from(shm.buf, 0)
+        if magic != STATE_MAGIC:
+            raise ValueError(f'Shared memory {shm.name} does not hold a shared state ring')
+        names_end = _HEADER.size + names_length
+        self.fields = json.loads(bytes(shm.buf[_HEADER.size:names_end]).decode())
+        self.capacity = capacity
+        self._memory = RingMemory(shm.buf, (names_end + 7) // 8 * 8, capacity, n_fields)
+        self._state_plan = None
+        self._row = np.zeros(n_fields)
+
+    @classmethod
+    def create(cls, name: str, fields: Sequence[str], capacity: int=1024) -> 'SharedStateRing':
+        """Creates a ring in a new shared memory block. Only the creating process can publish to it.
+
+        Args:
+            name (str): Name of the shared memory block, used by other processes to attach to it.
+            fields (Sequence[str]): Names of the fields of each record, e.g. from :py:func:`state_fields`.
+            capacity (int, optional): Number of records kept. Defaults to 1024.
+
+        Raises:
+            ValueError: If there are no fields or the capacity is less than 2.
+
+        Returns:
+            SharedStateRing: The new ring.
+        """
+        fields = list(fields)
+        if not fields: raise ValueError('fields must contain at least one field')
+        if capacity < 2: raise ValueError('capacity must be at least 2')
+        names = json.dumps(fields).encode()
+        names_end = _HEADER.size + len(names)
+        size = (names_end + 7) // 8 * 8 + 8 + 8 * capacity + 8 * capacity * len(fields)
+        shm = _open_shared_memory(name, True, size)
+        shm.buf[_HEADER.size:names_end] = names
+        _HEADER.pack_into(shm.buf, 0, STATE_MAGIC, len(fields), capacity, len(names)) # the magic marks the header complete for attach()
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, timeout: float=0.0) -> 'SharedStateRing':
+        """Opens a ring created by another process, for reading.
+
+        Args:
+            name (str): Name the ring was created with.
+            timeout (float, optional): Time in seconds to wait for the ring to be created. Defaults to 0.0.
+
+        Raises:
+            FileNotFoundError: If there is no ring with this name after ``timeout`` seconds.
+            ValueError: If the shared memory block with this name still does not hold a ring after ``timeout`` seconds.
+
+        Returns:
+            SharedStateRing: The ring.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                return cls(_open_shared_memory(name, False, 0), owner=False)
+            except (FileNotFoundError, ValueError):
+                # The block may exist before its creator has sized it or written the header
+                if time.perf_counter() >= deadline: raise
+                time.sleep(0.01)
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._shm.name
+
+    @property
+    def count(self) -> int:
+        """Number of records published so far."""
+        return self._memory.count()
+
+    def publish(self, values: Sequence[float]) -> None:
+        """Publishes a record. Only called by the process that created the ring.
+
+        Args:
+            values (Sequence[float]): Value of each field, in the order of ``fields``.
+        """
+        if type(values) is not np.ndarray or values.dtype != np.float64: values = np.asarray(values, dtype=np.float64)
+        self._memory.publish(values)
+
+    def publish_states(self, states: dict[Any, Any]) -> None:
+        """Publishes a record from the states of several devices, filling each ``'<device ID>.<attribute>'`` field from the attribute
+        of that device's state. This has the signature of the callbacks of :py:meth:`ActuatorGroup.on_state
+        <epicallypowerful.actuation.ActuatorGroup.on_state>` and :py:meth:`IMU.on_data <epicallypowerful.sensing.imu_abc.IMU.on_data>`.
+        Fields of devices missing from ``states`` are left at their previous values.
+
+        Args:
+            states (dict[Any, Any]): State of each device by ID, such as :py:class:`MotorData` or :py:class:`IMUData`.
+        """
+        keys = tuple(states)
+        if self._state_plan is None or self._state_plan[0] != keys:
+            ids = {str(key): key for key in keys}
+            plan = []
+            for column, field in enumerate(self.fields):
+                device_id, _, attribute = field.rpartition('.')
+                if device_id in ids: plan.append((column, ids[device_id], attribute))
+            self._state_plan = (keys, plan)
+
+        row = self._row
+        for column, key, attribute in self._state_plan[1]:
+            row[column] = getattr(states[key], attribute)
+        self.publish(row)
+
+    def read_latest(self, out: Optional[np.ndarray]=None, retries: int=100) -> Optional[np.ndarray]:
+        """Copies the most recent record.
+
+        Args:
+            out (Optional[np.ndarray], optional): Array of ``len(fields)`` floats to copy the record into, to avoid allocating one per call. Defaults to None.
+            retries (int, optional): Number of times to retry if the writer keeps overwriting the record while it is copied. Defaults to 100.
+
+        Returns:
+            Optional[np.ndarray]: The record, or None if nothing has been published yet.
+        """
+        return self._read_latest(out, retries)[0]
+
+    def _read_latest(self, out: Optional[np.ndarray], retries: int) -> tuple[Optional[np.ndarray], int]:
+        # Returns the record and the count including it
+        if out is None: out = np.empty(len(self.fields))
+        count = self._memory.read_latest(out, retries)
+        return (out, count) if count else (None, 0)
+
+    def read_since(self, count: int) -> tuple[np.ndarray, int]:
+        """Copies every record published since a given count, oldest first. Records that were already overwritten are skipped.
+
+        Args:
+            count (int): Number of records published when last read, i.e. the count returned by the previous call, or 0.
+
+        Returns:
+            tuple[np.ndarray, int]: (n_records, len(fields)) array of the records, and the count to pass to the next call.
+        """
+        return self._memory.read_since(count)
+
+    def close(self) -> None:
+        """Closes this process's view of the ring. The creating process should also call :py:meth:`unlink` once it is no longer needed.
+        """
+        self._memory.release()
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Removes the shared memory block, once every process has closed it.
+        """
+        _unlink_shared_memory(self._shm)
+
+    def __enter__(self) -> 'SharedStateRing':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+        if self.owner: self.unlink()
+
+
+class CommandMailbox(SharedStateRing):
+    """A shared memory mailbox for commands from another process, such as torque setpoints from a controller process to the I/O
+    process owning the CAN bus. The controller posts a complete set of setpoints at once, and the I/O process takes the most recent set.
+    Sets that were superseded before they were taken are dropped, so the I/O process never acts on stale commands. Unlike
+    :py:class:`SharedStateRing`, the mailbox is written by the process that attaches to it.
+
+    Example:
+        .. code-block:: python
+
+
+            # I/O process
+            from epicallypowerful.toolbox.shared_state import CommandMailbox
+            mailbox = CommandMailbox.create('ep_commands', ['1.torque', '2.torque'])
+            while True:
+                command = mailbox.take()
+                if command is not None:
+                    actuators.set_torque(1, command[0])
+                    actuators.set_torque(2, command[1])
+
+            # Controller process
+            mailbox = CommandMailbox.attach('ep_commands')
+            mailbox.post([0.5, -0.5])
+
+    Args:
+        shm (shared_memory.SharedMemory): Shared memory block holding the mailbox.
+        owner (bool): Whether this process created the block.
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        super().__init__(shm, owner)
+        self._taken = self.count
+        self._command = np.empty(len(self.fields))
+
+    @classmethod
+    def create(cls, name: str, fields: Sequence[str], capacity: int=2) -> 'CommandMailbox':
+        """Creates a mailbox in a new shared memory block, in the process that takes the commands.
+
+        Args:
+            name (str): Name of the shared memory block, used by the posting process to attach to it.
+            fields (Sequence[str]): Names of the values of each command.
+            capacity (int, optional): Number of commands kept. Defaults to 2.
+
+        Returns:
+            CommandMailbox: The new mailbox.
+        """
+        return super().create(name, fields, capacity)
+
+    def post(self, values: Sequence[float]) -> None:
+        """Posts a command. Only one process should post to a mailbox.
+
+        Args:
+            values (Sequence[float]): Value of each field, in the order of ``fields``.
+        """
+        self.publish(values)
+
+    def take(self) -> Optional[np.ndarray]:
+        """Takes the most recent command, if one was posted since the previous call.
+
+        Returns:
+            Optional[np.ndarray]: The command, valid until the next call, or None if there is no new command.
+        """
+        if self.count == self._taken: return None
+        command, count = self._read_latest(self._command, 100)
+        if command is not None: self._taken = count
+        return command
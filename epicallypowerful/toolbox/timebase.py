@@ -0,0 +1,187 @@
+"""epically-powerful module for putting device timestamps on one clock.
+
+This module contains the helpers that map the timestamps of the different
+devices onto the ``time.perf_counter()`` clock (``CLOCK_MONOTONIC`` on Linux),
+which is the time base of every :py:class:`~epicallypowerful.actuation.motor_data.MotorData`
+and :py:class:`~epicallypowerful.sensing.IMUData` timestamp:
+
+- CAN frames are stamped by the kernel on the wall clock when they are received.
+  :py:func:`can_receive_time` moves these onto the time base, so that the
+  timestamp of a reply does not include the time it spent queued before it was
+  decoded.
+- Device clocks, such as the internal clock of a MicroStrain IMU, run at a
+  slightly different rate from the host and are only seen through a
+  transport delay. :py:class:`ClockMapper` estimates their offset and drift
+  online.
+"""
+
+import math
+import time
+from collections import deque
+
+# Kernel receive times older than this [s] are not trusted, e.g. the captured times of replayed frames
+MAX_RECEIVE_AGE = 0.5
+# Interval [s] at which the offset between the wall clock and the time base is remeasured, which follows NTP adjustments
+WALL_CLOCK_REFRESH_INTERVAL = 0.5
+
+_wall_clock_offset = 0.0
+_wall_clock_checked = -math.inf
+
+
+def _measure_wall_clock_offset() -> float:
+    # Read the wall clock between two reads of the time base, keeping the tightest of a few tries
+    best_offset, best_span = 0.0, math.inf
+    for _ in range(3):
+        before = time.perf_counter()
+        wall = time.time()
+        after = time.perf_counter()
+        if after - before < best_span:
+            best_offset, best_span = (before + after) / 2 - wall, after - before
+    return best_offset
+
+
+def wall_to_monotonic(wall_time: float) -> float:
+    """Converts a ``time.time()`` wall clock timestamp to the ``time.perf_counter()`` time base.
+
+    Args:
+        wall_time (float): Wall clock time in seconds since the epoch.
+
+    Returns:
+        float: The same instant on the ``time.perf_counter()`` clock.
+    """
+    global _wall_clock_offset, _wall_clock_checked
+    now = time.perf_counter()
+    if now - _wall_clock_checked > WALL_CLOCK_REFRESH_INTERVAL:
+        _wall_clock_offset = _measure_wall_clock_offset()
+        _wall_clock_checked = now
+    return wall_time + _wall_clock_offset
+
+
+def can_receive_time(msg) -> float:
+    """Returns the time a CAN frame was received on the ``time.perf_counter()`` time base. This is the kernel receive timestamp of
+    the frame for SocketCAN. The current time is returned instead if the frame has no timestamp, or if it is in the future or more
+    than ``MAX_RECEIVE_AGE`` seconds old, as are the captured timestamps of frames replayed from a file.
+
+    Args:
+        msg (can.Message): Received frame.
+
+    Returns:
+        float: Receive time of the frame on the ``time.perf_counter()`` clock.
+    """
+    now = time.perf_counter()
+    if not msg.timestamp: return now
+    receive_time = wall_to_monotonic(msg.timestamp)
+    if receive_time > now or now - receive_time > MAX_RECEIVE_AGE: return now
+    return receive_time
+
+
+class ClockMapper():
+    """Maps the timestamps of a device clock onto the ``time.perf_counter()`` time base, from pairs of a device timestamp and the
+    local time at which it was received. The drift of the device clock (the rate error relative to the host) is estimated with an
+    exponentially weighted linear fit over the last ``window`` seconds, and the offset from the lower envelope of the pairs over the
+    same window, i.e. the pair with the smallest transport delay. Mapped times are therefore free of transport jitter and of the
+    bunching of samples that arrive together, and are at most the receive time, less the minimum transport delay.
+
+    The mapping restarts if the device clock jumps backwards or by more than ``window``, e.g. when the device is reset.
+
+    Example:
+        .. code-block:: python
+
+
+            from epicallypowerful.toolbox.timebase import ClockMapper
+
+            clock = ClockMapper()
+            for device_time, receive_time in samples:
+                timestamp = clock.update(device_time, receive_time)
+
+    Args:
+        window (float, optional): Length of device time in seconds over which the offset and drift are estimated. Defaults to 10.0.
+
+    Attributes:
+        drift (float): Estimated rate error of the device clock, e.g. 1e-5 for a device clock that runs 10 ppm slow.
+        offset (float): Estimated time base time when the device clock read 0.
+        n_samples (int): Number of pairs used since the mapping last restarted.
+    """
+    def __init__(self, window: float=10.0) -> None:
+        if window <= 0:
+            raise ValueError('window must be positive')
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        """Discards the estimate, so that the next pair starts a new mapping.
+        """
+        self.drift = 0.0
+        self.offset = 0.0
+        self.n_samples = 0
+        self._device_origin = 0.0
+        self._local_origin = 0.0
+        self._last_x = 0.0
+        self._slope = 1.0
+        self._weight = 0.0
+        self._mean_x = 0.0
+        self._mean_y = 0.0
+        self._cov_xx = 0.0
+        self._cov_xy = 0.0
+        self._envelope = deque() # (x, y) pairs with increasing residuals from the fit, the first being the window's minimum
+
+    def update(self, device_time: float, local_time: float) -> float:
+        """Adds a pair of a device timestamp and the ``time.perf_counter()`` time at which it was received, and maps the device timestamp.
+
+        Args:
+            device_time (float): Timestamp from the device clock in seconds.
+            local_time (float): ``time.perf_counter()`` time at which the timestamp was received.
+
+        Returns:
+            float: The device timestamp on the ``time.perf_counter()`` clock.
+        """
+        if self.n_samples == 0:
+            self._device_origin = device_time
+            self._local_origin = local_time
+        x = device_time - self._device_origin
+        dx = x - self._last_x
+        if dx < 0 or dx > self.window:
+            self.reset()
+            return self.update(device_time, local_time)
+        y = local_time - self._local_origin
+        self._last_x = x
+        self.n_samples += 1
+
+        # Exponentially weighted least squares fit of y = slope * x + intercept
+        decay = math.exp(-dx / self.window)
+        self._weight = self._weight * decay + 1.0
+        dx_mean = x - self._mean_x
+        self._mean_x += dx_mean / self._weight
+        self._mean_y += (y - self._mean_y) / self._weight
+        self._cov_xx = self._cov_xx * decay + dx_mean * (x - self._mean_x)
+        self._cov_xy = self._cov_xy * decay + dx_mean * (y - self._mean_y)
+        if self._cov_xx > 0.0 and self.n_samples > 2:
+            self._slope = self._cov_xy / self._cov_xx
+
+        # Lower envelope of the residuals over the window. The residuals are recomputed with the current slope, since the slope
+        # changes too little over a window to reorder them
+        slope = self._slope
+        envelope = self._envelope
+        while envelope and envelope[-1][1] - slope * envelope[-1][0] >= y - slope * x:
+            envelope.pop()
+        envelope.append((x, y))
+        while x - envelope[0][0] > self.window:
+            envelope.popleft()
+
+        intercept = envelope[0][1] - slope * envelope[0][0]
+        self.drift = slope - 1.0
+        self.offset = self._local_origin + intercept - slope * self._device_origin
+        return self._local_origin + slope * x + intercept
+
+    def to_local(self, device_time: float) -> float:
+        """Maps a device timestamp with the current estimate, without updating it.
+
+        Args:
+            device_time (float): Timestamp from the device clock in seconds.
+
+        Returns:
+            float: The device timestamp on the ``time.perf_counter()`` clock, or NaN if no pairs have been added.
+        """
+        if self.n_samples == 0: return math.nan
+        x, y = self._envelope[0]
+        return self._local_origin + y + self._slope * (device_time - self._device_origin - x)
@@ -0,0 +1,96 @@
+"""Tests that the compiled decoders and torque monitor of the ``_decoding`` extension match their pure Python versions."""
+
+import random
+import pytest
+from epicallypowerful.actuation import decoding, torque_monitor
+from epicallypowerful.actuation.motor_data import MotorData
+import epicallypowerful.actuation.robstride.robstride_driver as rsd
+
+try:
+    from epicallypowerful.actuation import _decoding
+except ImportError:
+    _decoding = None
+
+requires_compiled = pytest.mark.skipif(_decoding is None, reason='the _decoding extension is not built')
+
+DECODED_FIELDS = ('current_position', 'current_velocity', 'current_torque', 'current_temperature', 'error_code', 'motor_mode', 'timestamp')
+
+
+def _data(motor_id, motor_type):
+    data = MotorData(motor_id=motor_id, motor_type=motor_type)
+    if data.erpm_to_rpm is None: data.erpm_to_rpm = 1.0 / 21.0
+    return data
+
+
+def _random_frames(rng, n, arbitration_ids, motor_id):
+    frames = []
+    for _ in range(n):
+        payload = bytearray(rng.getrandbits(8) for _ in range(rng.choice((5, 6, 8, 8, 8))))
+        if payload and rng.random() < 0.8: payload[0] = motor_id
+        frames.append((rng.choice(arbitration_ids), payload))
+    return frames
+
+
+def _robstride_reply_id(motor_id, response=rsd.RESPONSE_MOTION, mode=2):
+    return (response << 24) | (mode << 22) | (motor_id << 8)
+
+
+@requires_compiled
+@pytest.mark.parametrize('name, motor_type, arbitration_ids', [
+    ('MITReplyDecoder', 'AK80-9', (0x000, 0x001)),
+    ('StatusReplyDecoder', 'AK80-9-V3', (0x2901,)),
+    ('RobstrideMotionDecoder', 'RS02', (_robstride_reply_id(3), _robstride_reply_id(4), _robstride_reply_id(3, response=rsd.RESPONSE_MOTION + 1))),
+])
+@pytest.mark.parametrize('invert', (1, -1))
+def test_compiled_decoder_matches_python(name, motor_type, arbitration_ids, invert):
+    python_data, compiled_data = _data(3, motor_type), _data(3, motor_type)
+    python_decoder = getattr(decoding, f'_Py{name}')(python_data, invert)
+    compiled_decoder = getattr(_decoding, name)(compiled_data, invert)
+
+    rng = random.Random(name)
+    for arbitration_id, payload in _random_frames(rng, 2000, arbitration_ids, 3):
+        timestamp = rng.uniform(0.0, 1000.0)
+        assert python_decoder.decode(arbitration_id, payload, timestamp) == compiled_decoder.decode(arbitration_id, bytes(payload), timestamp)
+        for field in DECODED_FIELDS:
+            assert getattr(python_data, field) == pytest.approx(getattr(compiled_data, field), rel=1e-12, abs=1e-12), field
+
+
+@requires_compiled
+def test_compiled_torque_monitor_matches_python():
+    python_monitor = torque_monitor._PyRMSTorqueMonitor(limit=2.0, window=20.0)
+    compiled_monitor = _decoding.RMSTorqueMonitor(limit=2.0, window=20.0)
+    assert python_monitor.over_limit() == compiled_monitor.over_limit() == False
+
+    rng = random.Random(0)
+    for _ in range(5000): # more samples than the initial capacity of the compiled ring buffer
+        value = rng.uniform(-5.0, 5.0)
+        python_rms, python_over = python_monitor.update(value)
+        compiled_rms, compiled_over = compiled_monitor.update(value)
+        assert python_rms == pytest.approx(compiled_rms, rel=1e-9)
+        assert python_over == compiled_over
+    assert python_monitor.over_limit() == compiled_monitor.over_limit()
+
+    public = lambda obj: {name for name in dir(obj) if not name.startswith('_')}
+    assert public(python_monitor) == public(compiled_monitor)
+    assert [sq for sq, _ in python_monitor.vals] == pytest.approx([sq for sq, _ in compiled_monitor.vals])
+
+
+def test_public_names_use_compiled_versions_when_built():
+    if _decoding is None:
+        assert not decoding.COMPILED
+        assert decoding.MITReplyDecoder is decoding._PyMITReplyDecoder
+        assert torque_monitor.RMSTorqueMonitor is torque_monitor._PyRMSTorqueMonitor
+    else:
+        assert decoding.COMPILED
+        assert decoding.MITReplyDecoder is _decoding.MITReplyDecoder
+        assert torque_monitor.RMSTorqueMonitor is _decoding.RMSTorqueMonitor
+
+
+def test_python_torque_monitor_window():
+    monitor = torque_monitor._PyRMSTorqueMonitor(limit=1.0, window=20.0)
+    assert not monitor.over_limit()
+    for value in (3.0, -4.0):
+        rms, over = monitor.update(value)
+    assert rms == pytest.approx(((9.0 + 16.0) / 2) ** 0.5)
+    assert over
+    assert not monitor.over_limit() # fewer than 80% of a window of samples
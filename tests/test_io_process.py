@@ -0,0 +1,113 @@
+"""Tests that run the actuator I/O process against simulated actuators. The virtual CAN bus of the simulator only connects devices
+in the same process, so the simulator is started in the I/O process, next to the bus it opens.
+"""
+
+import json
+import os
+import signal
+import sys
+import time
+import can
+import pytest
+from epicallypowerful.actuation import ActuatorGroup
+from epicallypowerful.actuation import io_process
+from epicallypowerful.actuation.cubemars import CubeMars
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='the I/O process uses POSIX shared memory and pipes')
+
+MOTORS = {1: 'AK80-9', 2: 'AK80-9-V3', 3: 'RS02'}
+
+SIMULATED_IO_PROCESS = '''
+import json, sys
+from epicallypowerful.simulation import ActuatorSimulator
+from epicallypowerful.actuation.io_process import _run_io_process
+config = json.loads(sys.argv[1])
+simulator = ActuatorSimulator.from_dict({spec['can_id']: spec['motor_type'] for spec in config['actuators']}, channel=config['can_args']['channel'])
+_run_io_process(config, sys.stdin.fileno())
+simulator.stop()
+'''
+
+
+@pytest.fixture
+def simulated_io_process(monkeypatch):
+    monkeypatch.setattr(io_process, '_io_process_command', lambda config: [sys.executable, '-c', SIMULATED_IO_PROCESS, json.dumps(config)])
+    return {'bustype': 'virtual', 'channel': f'ep-io-test-{os.getpid()}'}
+
+
+def _shared_memory_names():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+def test_control_through_io_process(simulated_io_process):
+    shared_memory_before = _shared_memory_names()
+    actuators = ActuatorGroup.from_dict(dict(MOTORS), can_args=simulated_io_process, exit_manually=True, io_process=True)
+    io = actuators._io
+    try:
+        assert all(actuators.is_connected(can_id) for can_id in MOTORS)
+        with pytest.raises(NotImplementedError):
+            actuators.on_state(lambda states: None)
+
+        deadline = time.perf_counter() + 3.0
+        while time.perf_counter() < deadline:
+            for can_id in MOTORS:
+                actuators.set_position(can_id, 0.5, 5.0, 0.2)
+            if all(abs(actuators.get_position(can_id) - 0.5) < 0.01 for can_id in MOTORS): break
+            time.sleep(0.002)
+        for can_id in MOTORS:
+            assert actuators.get_position(can_id) == pytest.approx(0.5, abs=0.01)
+
+        before = actuators.get_data(1).timestamp
+        actuators.set_torque(1, 0.0)
+        deadline = time.perf_counter() + 1.0
+        while actuators.get_data(1).timestamp <= before and time.perf_counter() < deadline:
+            time.sleep(0.0005)
+        assert actuators.get_data(1).timestamp > before
+        assert io.send_errors == 0
+        assert io.commands_sent == io.commands.count
+
+        assert actuators.disable_actuators()
+    finally:
+        actuators._release_bus()
+    assert io.process.returncode == 0
+    assert _shared_memory_names() <= shared_memory_before
+
+
+def test_full_command_ring_fails_instead_of_dropping_frames(simulated_io_process, monkeypatch):
+    monkeypatch.setattr(io_process, 'COMMAND_FULL_TIMEOUT', 0.05)
+    actuator = CubeMars(1, 'AK80-9')
+    io = io_process.ActuatorIOProcess([actuator], simulated_io_process)
+    try:
+        os.kill(io.process.pid, signal.SIGSTOP)
+        with pytest.raises(can.CanOperationError):
+            for _ in range(io_process.COMMAND_CAPACITY):
+                actuator.set_torque(0.0)
+        assert io.commands.count == io_process.COMMAND_CAPACITY - 1 # nothing written over frames that were not sent
+
+        os.kill(io.process.pid, signal.SIGCONT)
+        monkeypatch.setattr(io_process, 'COMMAND_FULL_TIMEOUT', 2.0) # the resumed child needs time to make room
+        actuator.set_torque(0.0)
+        deadline = time.perf_counter() + 2.0
+        while io.commands_sent < io.commands.count and time.perf_counter() < deadline:
+            io.sync()
+            time.sleep(0.001)
+        assert io.commands_sent == io.commands.count
+    finally:
+        os.kill(io.process.pid, signal.SIGCONT)
+        io.stop()
+    assert io.process.returncode == 0
+
+
+def test_io_process_disables_actuators_if_main_process_exits(simulated_io_process):
+    actuator = CubeMars(1, 'AK80-9')
+    io = io_process.ActuatorIOProcess([actuator], simulated_io_process)
+    try:
+        actuator._enable()
+        actuator.set_torque(1.0)
+        os.close(io._wake_fd) # as when the main process dies
+        io.process.wait(5.0)
+        assert io.process.returncode == 0
+        io.sync()
+        assert actuator.get_torque() == pytest.approx(0.0, abs=0.01)
+    finally:
+        io._wake_fd = os.open(os.devnull, os.O_WRONLY)
+        io.stop()
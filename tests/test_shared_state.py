@@ -0,0 +1,101 @@
+"""Tests for the shared memory state ring and command mailbox, with both the compiled and the pure Python ring memory."""
+
+import multiprocessing
+import os
+import numpy as np
+import pytest
+from epicallypowerful.toolbox import shared_state
+from epicallypowerful.toolbox.shared_state import SharedStateRing, CommandMailbox, state_fields
+
+IMPLEMENTATIONS = [shared_state._PyRingMemory]
+try:
+    from epicallypowerful.toolbox._shared_state import RingMemory as _CompiledRingMemory
+    IMPLEMENTATIONS.append(_CompiledRingMemory)
+except ImportError:
+    IMPLEMENTATIONS.append(pytest.param(None, marks=pytest.mark.skip(reason='the _shared_state extension is not built')))
+
+
+@pytest.fixture(params=IMPLEMENTATIONS, ids=lambda memory: 'compiled' if memory is not shared_state._PyRingMemory else 'python')
+def ring_memory(request, monkeypatch):
+    monkeypatch.setattr(shared_state, 'RingMemory', request.param)
+    return request.param
+
+
+@pytest.fixture
+def ring_name():
+    return f'ep_test_{os.getpid()}_{np.random.randint(1 << 30)}'
+
+
+def test_publish_and_read(ring_memory, ring_name):
+    with SharedStateRing.create(ring_name, ['a', 'b'], capacity=4) as ring:
+        assert ring.count == 0
+        assert ring.read_latest() is None
+        records, count = ring.read_since(0)
+        assert records.shape == (0, 2) and count == 0
+
+        for i in range(10):
+            ring.publish([i, -i])
+        assert ring.count == 10
+        np.testing.assert_array_equal(ring.read_latest(), [9, -9])
+        records, count = ring.read_since(0) # the oldest records were overwritten, and the slot after the newest is skipped
+        np.testing.assert_array_equal(records, [[7, -7], [8, -8], [9, -9]])
+        assert count == 10
+        records, count = ring.read_since(count)
+        assert len(records) == 0 and count == 10
+
+        reader = SharedStateRing.attach(ring_name)
+        assert reader.fields == ['a', 'b']
+        np.testing.assert_array_equal(reader.read_latest(), [9, -9])
+        reader.close()
+
+
+def test_publish_states(ring_memory, ring_name):
+    class State:
+        def __init__(self, position, timestamp):
+            self.current_position = position
+            self.timestamp = timestamp
+
+    with SharedStateRing.create(ring_name, state_fields([1, 2], ('current_position', 'timestamp'))) as ring:
+        ring.publish_states({1: State(0.5, 10.0), 2: State(-0.5, 11.0)})
+        np.testing.assert_array_equal(ring.read_latest(), [0.5, 10.0, -0.5, 11.0])
+
+
+def test_mailbox_takes_latest(ring_memory, ring_name):
+    with CommandMailbox.create(ring_name, ['torque']) as mailbox:
+        assert mailbox.take() is None
+        poster = CommandMailbox.attach(ring_name)
+        poster.post([1.0])
+        poster.post([2.0])
+        np.testing.assert_array_equal(mailbox.take(), [2.0])
+        assert mailbox.take() is None
+        poster.close()
+
+
+def _write_constant_records(name, n_fields, n_records):
+    with SharedStateRing.create(name, [str(i) for i in range(n_fields)], capacity=8) as ring:
+        ready = SharedStateRing.attach(name + '_ready', timeout=5.0)
+        for i in range(n_records):
+            ring.publish(np.full(n_fields, float(i)))
+        ready.close()
+
+
+def test_no_torn_records_across_processes(ring_memory, ring_name):
+    # Every record holds one value in all its fields, so a torn record has differing fields
+    n_fields = 64
+    context = multiprocessing.get_context('fork') # keeps the ring memory implementation chosen by the fixture
+    with SharedStateRing.create(ring_name + '_ready', ['ready']):
+        writer = context.Process(target=_write_constant_records, args=(ring_name, n_fields, 200_000))
+        writer.start()
+        ring = SharedStateRing.attach(ring_name, timeout=5.0)
+        count, checked = 0, 0
+        out = np.empty(n_fields)
+        while writer.is_alive() or count < ring.count:
+            records, count = ring.read_since(count)
+            assert np.all(records == records[:, :1])
+            latest = ring.read_latest(out)
+            if latest is not None: assert np.all(latest == latest[0])
+            checked += len(records)
+        writer.join()
+        ring.close()
+    assert writer.exitcode == 0
+    assert checked > 0